@@ -0,0 +1,35 @@
+from django.db.models import Q
+
+# (name, lower, upper) with both bounds exclusive, None leaves that side open.
+# Ages 12 and 19 fall in no bracket, as they always have on the dashboard.
+AGE_BRACKETS = (
+    ('youths', 19, None),
+    ('teens', 12, 19),
+    ('children', None, 12),
+)
+
+
+def born_by(today, years):
+    """Latest birth date of someone at least years old on today"""
+    try:
+        return today.replace(year=today.year - years)
+    except ValueError:
+        # today is 29 February and that year has none, birthdays up to the 28th have passed
+        return today.replace(year=today.year - years, day=28)
+
+
+def bracket_filters(field, today, brackets=AGE_BRACKETS):
+    """
+    The brackets as Q filters on the birth date column field, {name: Q}, so
+    the database can count them: age > n is a birth date on or before
+    born_by(n + 1), age < n one after born_by(n).
+    """
+    filters = {}
+    for name, lower, upper in brackets:
+        q = Q()
+        if lower is not None:
+            q &= Q(**{f'{field}__lte': born_by(today, lower + 1)})
+        if upper is not None:
+            q &= Q(**{f'{field}__gt': born_by(today, upper)})
+        filters[name] = q
+    return filters
@@ -0,0 +1,120 @@
+from datetime import date, datetime, timedelta
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from apis.refcache import ReferenceCache
+from attendance.models import Attendance, AttendanceArchive
+from church.models import Church
+from services.models import Services
+from services.schedule import church_zone
+from .trends import period_start
+
+ARRIVALS_KEY = 'analytics:arrivals:{church}:{service}:{day}:{weeks}:{bucket}'
+BUCKET_MINUTES = (1, 5)
+DEFAULT_WEEKS = 8
+MAX_WEEKS = 52
+CHUNK_SIZE = 5000
+
+
+def check_ins(services, since):
+    """(servicesId, date ordinal, check-in epoch seconds) arrays of the services' check-ins from since on"""
+    service_ids, days, stamps = [], [], []
+    for model in (Attendance, AttendanceArchive):
+        rows = (model.objects.filter(servicesId__in=[service.id for service in services], attendanceDate__gte=since)
+                .values_list('servicesId_id', 'attendanceDate', 'checkInTimestamp').iterator(chunk_size=CHUNK_SIZE))
+        for services_id, day, moment in rows:
+            service_ids.append(services_id)
+            days.append(day.toordinal())
+            stamps.append(moment.timestamp())
+    return (np.array(service_ids, dtype=np.int64), np.array(days, dtype=np.int64),
+            np.array(stamps, dtype=float))
+
+
+def start_times(service_ids, days, services):
+    """Epoch seconds each row's service started, eventTime on its date in the church's time zone"""
+    if not len(service_ids):
+        return np.zeros(0, dtype=float)
+    pairs, inverse = np.unique(np.stack([service_ids, days]), axis=1, return_inverse=True)
+    by_id = {service.id: service for service in services}
+    zones = {church.id: church_zone(church.timezone) for church in ReferenceCache.all(Church)}
+    starts = np.empty(pairs.shape[1], dtype=float)
+    # one conversion per service day, DST is applied per date
+    for position, (services_id, ordinal) in enumerate(pairs.T):
+        service = by_id[int(services_id)]
+        zone = zones.get(service.churchId_id, church_zone(settings.TIME_ZONE))
+        starts[position] = datetime.combine(date.fromordinal(int(ordinal)), service.eventTime,
+                                            tzinfo=zone).timestamp()
+    return starts[inverse.reshape(-1)]
+
+
+def arrival_heatmaps(services, today, weeks, bucket, before, after):
+    """
+    Check-ins of each service binned by minutes from its start (eventTime) in
+    bucket-minute buckets from before minutes ahead to after minutes past,
+    one row per week of the last weeks weeks. Arrivals outside that range
+    are counted as early or late. Each service also gets its arrival curve
+    (the buckets summed over the weeks), its busiest bucket with the average
+    check-ins per service day in it, and the median arrival.
+    """
+    first_week = period_start(today, 'week') - timedelta(weeks=weeks - 1)
+    service_ids, days, stamps = check_ins(services, first_week)
+    offsets = (stamps - start_times(service_ids, days, services)) / 60
+    edges = np.arange(-before, after + bucket, bucket)
+    width = len(edges) - 1
+    week = (days - first_week.toordinal()) // 7
+    column = np.floor((offsets + before) / bucket).astype(np.int64)
+    inside = (column >= 0) & (column < width) & (week < weeks)
+
+    results = []
+    for service in services:
+        rows = service_ids == service.id
+        if not rows.any():
+            continue
+        hit = rows & inside
+        heatmap = np.bincount(week[hit] * width + column[hit], minlength=weeks * width).reshape(weeks, width)
+        curve = heatmap.sum(axis=0)
+        service_days = len(np.unique(days[rows]))
+        peak = int(curve.argmax())
+        results.append({
+            "servicesId": service.id,
+            "eventName": service.eventName,
+            "eventTime": service.eventTime,
+            "checkIns": int(rows.sum()),
+            "serviceDays": service_days,
+            "early": int((rows & (column < 0)).sum()),
+            "late": int((rows & (column >= width)).sum()),
+            "medianArrival": round(float(np.median(offsets[rows])), 1),
+            "peak": {"from": int(edges[peak]), "to": int(edges[peak + 1]), "checkIns": int(curve[peak]),
+                     "perServiceDay": round(float(curve[peak]) / service_days, 2)},
+            "curve": curve.tolist(),
+            "heatmap": heatmap.tolist(),
+        })
+
+    return {"bucketMinutes": bucket, "before": before, "after": after,
+            "buckets": edges[:-1].tolist(),
+            "weeks": [first_week + timedelta(weeks=offset) for offset in range(weeks)],
+            "services": results}
+
+
+def cached_heatmaps(church_id, services_id, weeks, bucket):
+    """
+    arrival_heatmaps() of one service or of every service of a church (every
+    church for None), over the check-in window of SERVICE_CHECKIN_OPENS_BEFORE
+    and SERVICE_CHECKIN_CLOSES_AFTER. Cached ANALYTICS_ARRIVALS_TIMEOUT
+    seconds per day and parameters.
+    """
+    today = timezone.localdate()
+    key = ARRIVALS_KEY.format(church=church_id or 'all', service=services_id or 'all',
+                              day=today.isoformat(), weeks=weeks, bucket=bucket)
+    heatmaps = cache.get(key)
+    if heatmaps is None:
+        services = sorted(ReferenceCache.all(Services), key=lambda service: (service.eventTime, service.id))
+        if church_id is not None:
+            services = [service for service in services if service.churchId_id == church_id]
+        if services_id is not None:
+            services = [service for service in services if service.id == services_id]
+        heatmaps = arrival_heatmaps(services, today, weeks, bucket,
+                                    settings.SERVICE_CHECKIN_OPENS_BEFORE, settings.SERVICE_CHECKIN_CLOSES_AFTER)
+        cache.set(key, heatmaps, settings.ANALYTICS_ARRIVALS_TIMEOUT)
+    return heatmaps
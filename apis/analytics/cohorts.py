@@ -0,0 +1,159 @@
+from datetime import datetime, time
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from attendance.models import Attendance, AttendanceArchive
+from person.models import Person
+from .trends import shift
+
+COHORT_KEY = 'analytics:cohort:{church}:{month}'
+# week 0 starts on this Monday, weeks are Monday to Sunday like the trends
+EPOCH = np.datetime64('1970-01-05')
+# weeks after entering covered by the retention curve
+CURVE_WEEKS = 52
+# months after entering a member is checked for, and the weeks after that point a check-in counts in
+MILESTONES = (3, 6, 12)
+MILESTONE_WINDOW = 4
+# most cohorts one request may ask for
+MAX_COHORTS = 60
+# a cohort whose every member is past the last milestone no longer changes
+SETTLED_TIMEOUT = 7 * 24 * 3600
+CHUNK_SIZE = 5000
+
+
+def week_numbers(days):
+    """Week index of datetime64[D] values"""
+    return (days - EPOCH).astype(np.int64) // 7
+
+
+def milestone_week(months):
+    return int(round(months * 52 / 12))
+
+
+def cohort_months(first, last):
+    months = [first]
+    while months[-1] < last:
+        months.append(shift(months[-1], 'month', -1))
+    return months
+
+
+def aware(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def activity(persons, ids, since):
+    """
+    Sparse persons x weeks matrix with a 1 where the person checked in that
+    week (live and archived attendance), returned as its (row, week) arrays.
+    ids is the sorted array of the ids of the persons queryset giving the
+    rows, weeks are week_numbers().
+    """
+    from scipy import sparse
+    first_week = week_numbers(np.datetime64(since, 'D'))
+    person_ids, days = [], []
+    for model in (Attendance, AttendanceArchive):
+        rows = (model.objects.filter(personId__in=persons.values('id'), attendanceDate__gte=since)
+                .values_list('personId_id', 'attendanceDate').iterator(chunk_size=CHUNK_SIZE))
+        for person_id, day in rows:
+            person_ids.append(person_id)
+            days.append(day)
+    rows = np.searchsorted(ids, np.array(person_ids, dtype=np.int64))
+    weeks = week_numbers(np.array(days, dtype='datetime64[D]')) - first_week
+    shape = (len(ids), int(weeks.max()) + 1 if len(weeks) else 1)
+    matrix = sparse.coo_matrix((np.ones(len(rows), dtype=np.int8), (rows, weeks)), shape=shape).tocsr()
+    # several check-ins in one week count once
+    matrix.sum_duplicates()
+    matrix = matrix.tocoo()
+    return matrix.row, matrix.col + first_week
+
+
+def compute_cohorts(months, church_id, today):
+    """
+    Retention of the persons who entered in each month of months: the share
+    still checking in 3, 6 and 12 months on, and a weekly curve of the share
+    active k weeks after entering. Shares only count members long enough in
+    to be measured, None where nobody is yet.
+    """
+    persons = Person.objects.filter(entranceDate__gte=aware(months[0]),
+                                    entranceDate__lt=aware(shift(months[-1], 'month', -1)))
+    if church_id is not None:
+        persons = persons.filter(churchId=church_id)
+    entered = sorted((person_id, timezone.localtime(moment).date())
+                     for person_id, moment in persons.values_list('id', 'entranceDate'))
+    ids = np.array([person_id for person_id, _ in entered], dtype=np.int64)
+    first_month = months[0].year * 12 + months[0].month
+    cohort = np.array([day.year * 12 + day.month - first_month for _, day in entered], dtype=np.int64)
+    entry_week = week_numbers(np.array([day for _, day in entered], dtype='datetime64[D]'))
+    weeks_in = week_numbers(np.datetime64(today, 'D')) - entry_week
+    sizes = np.bincount(cohort, minlength=len(months))
+
+    if len(ids):
+        row, week = activity(persons, ids, months[0])
+    else:
+        row, week = np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    # weeks between entering and each check-in
+    offset = week - entry_week[row]
+
+    # weekly curve: members active k weeks in over members at least k weeks in
+    span = CURVE_WEEKS + 1
+    cells = len(months) * span
+    keep = (offset >= 0) & (offset < span)
+    active = np.bincount(cohort[row[keep]] * span + offset[keep], minlength=cells).reshape(len(months), span)
+    present = weeks_in >= 0
+    reached = np.bincount(cohort[present] * span + np.minimum(weeks_in[present], CURVE_WEEKS),
+                          minlength=cells).reshape(len(months), span)
+    measured = np.cumsum(reached[:, ::-1], axis=1)[:, ::-1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        curve = np.where(measured > 0, active / measured, np.nan)
+
+    milestones = {}
+    for months_on in MILESTONES:
+        start = milestone_week(months_on)
+        hit = (offset >= start) & (offset < start + MILESTONE_WINDOW)
+        retained = np.zeros(len(ids), dtype=bool)
+        retained[row[hit]] = True
+        eligible = weeks_in >= start + MILESTONE_WINDOW
+        kept = np.bincount(cohort[retained & eligible], minlength=len(months))
+        counted = np.bincount(cohort[eligible], minlength=len(months))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            milestones[months_on] = np.where(counted > 0, kept / counted, np.nan)
+
+    last_milestone = milestone_week(MILESTONES[-1]) + MILESTONE_WINDOW
+    results = {}
+    for position, month in enumerate(months):
+        members = cohort == position
+        results[month] = {
+            "cohort": month.strftime('%Y-%m'),
+            "size": int(sizes[position]),
+            "retention": {f'{months_on}m': share(milestones[months_on][position]) for months_on in MILESTONES},
+            "curve": [share(value) for value in curve[position]],
+            "settled": bool(shift(month, 'month', -1) <= today and (weeks_in[members] >= last_milestone).all()),
+        }
+    return results
+
+
+def share(value):
+    return None if np.isnan(value) else round(float(value), 4)
+
+
+def retention_cohorts(first, last, church_id=None):
+    """
+    Cohorts from month first to month last, cached per church and cohort.
+    Only the cohorts missing from the cache are computed, together in one pass.
+    Settled cohorts are kept SETTLED_TIMEOUT seconds, the others
+    ANALYTICS_COHORT_TIMEOUT.
+    """
+    months = cohort_months(first, last)
+    keys = {month: COHORT_KEY.format(church=church_id or 'all', month=month.strftime('%Y-%m')) for month in months}
+    cached = cache.get_many(keys.values())
+    results = {month: cached[keys[month]] for month in months if keys[month] in cached}
+    missing = [month for month in months if month not in results]
+    if missing:
+        computed = compute_cohorts(cohort_months(missing[0], missing[-1]), church_id, timezone.localdate())
+        for month in missing:
+            result = computed[month]
+            timeout = SETTLED_TIMEOUT if result['settled'] else settings.ANALYTICS_COHORT_TIMEOUT
+            cache.set(keys[month], result, timeout)
+            results[month] = result
+    return [results[month] for month in months]
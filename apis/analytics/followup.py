@@ -0,0 +1,57 @@
+from datetime import timedelta
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from apis.refcache import ReferenceCache
+from attendance.models import Attendance
+from membership.models import Membership
+from person.models import Person
+from person.util import birthday_filter, upcoming_birthday_order
+
+# persons with no check-in for this many days are absentees
+ABSENCE_DAYS = 30
+# longest window of upcoming birthdays, a whole year
+MAX_BIRTHDAY_DAYS = 366
+# membership statuses (lower case) that mark a person as a visitor
+VISITOR_SYNONYMS = frozenset([
+    "guest", "caller", "company", "visitant", "houseguest", "drop-in", "invitee",
+    "friend", "companion", "plus-one", "hanger-on", "tourist", "traveler", "sightseer",
+    "holidaymaker", "vacationer", "voyager", "tripper", "day-tripper", "globetrotter",
+    "backpacker", "explorer", "out-of-towner", "wanderer", "wayfarer", "pilgrim", "stranger",
+    "outsider", "newcomer", "alien", "foreigner", "offcomer", "incomer", "interloper", "arrival",
+    "newbie", "greenhorn", "blow-in", "new kid on the block", "attendee", "participant",
+    "spectator", "audience", "listener", "patron", "customer", "client", "new user", "prospect",
+    "crasher", "gatecrasher", "walk-in", "punter", "rubberneck", "drifter",
+    "bum", 'visitor', 'visitors', 'new member', 'new believer', 'new visitor', 'fresher',
+])
+
+
+def church_persons(church_id=None):
+    persons = Person.objects.all()
+    if church_id is not None:
+        persons = persons.filter(churchId=church_id)
+    return persons
+
+
+def visitor_membership_ids():
+    """Ids of the memberships whose status is a visitor synonym, read off the cached Membership table"""
+    return [membership.id for membership in ReferenceCache.all(Membership)
+            if membership.status.lower() in VISITOR_SYNONYMS]
+
+
+def visitors(church_id=None):
+    """Persons holding a visitor membership, one query"""
+    return church_persons(church_id).filter(membershipId__in=visitor_membership_ids())
+
+
+def absentees(church_id=None, days=ABSENCE_DAYS):
+    """Persons without a check-in in the last days, an anti-join on Attendance in one query"""
+    since = timezone.now() - timedelta(days=days)
+    checked_in = Attendance.objects.filter(personId=OuterRef('pk'), checkInTimestamp__gte=since)
+    return church_persons(church_id).filter(~Exists(checked_in))
+
+
+def celebrants(church_id=None, start=None, days=1):
+    """Persons whose birthday falls in the days days from start (today) on, soonest first"""
+    start = start or timezone.localdate()
+    return (church_persons(church_id).filter(birthday_filter(start, days))
+            .order_by(*upcoming_birthday_order(start)))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from analytics.snapshots import AnalyticsSnapshot
+
+
+class Command(BaseCommand):
+    """
+    Build the cached dashboard payloads (analytics/snapshots.py) of every
+    church, so the first dashboard reads of a day find the day's payload.
+    Only useful with a cache shared by the workers (CACHE_BACKEND), run it
+    right after midnight, e.g.
+        python manage.py warm_analytics_snapshots --church 3
+    """
+    help = 'Build the cached analytics dashboards ahead of the first reads'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--church', type=int, help='only warm this church id')
+
+    def handle(self, *args, **options):
+        church_ids = [options['church']] if options['church'] else None
+        built = AnalyticsSnapshot.warm(church_ids)
+        self.stdout.write(self.style.SUCCESS(f'Built {built} analytics snapshots'))
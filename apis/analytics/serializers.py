@@ -0,0 +1,28 @@
+from rest_framework import serializers
+from person.models import Person
+
+
+class FollowupPersonSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Person
+        fields = ('id', 'firstName', 'lastName', 'email', 'phone', 'entranceDate')
+
+
+class CelebrantSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Person
+        fields = ('id', 'firstName', 'lastName', 'email', 'phone', 'dob')
+
+
+class AttendanceStatsSerializer(serializers.ModelSerializer):
+    """A person with their attendance/bitmaps.py stats, passed in context['stats'] by person id"""
+    class Meta:
+        model = Person
+        fields = ('id', 'firstName', 'lastName', 'email', 'phone')
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        stats = dict(self.context['stats'][instance.id])
+        stats.pop('personId')
+        data.update(stats)
+        return data
@@ -0,0 +1,71 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from apis.refcache import ReferenceCache
+from attendance.models import Attendance
+from attendance.signals import attendance_bulk_created
+from contact.models import Contact
+from household.models import HouseHold
+from leadership.models import Leadership
+from person.models import Person
+from services.models import Services
+from .snapshots import AnalyticsSnapshot
+
+
+def church_of_service(services_id):
+    try:
+        return ReferenceCache.get(Services, id=services_id).churchId_id
+    except Services.DoesNotExist:
+        return None
+
+
+def changed(church_id, kwargs):
+    """
+    A created or deleted row only touches its own church. An edited one may
+    have moved between churches, those rebuild every church's snapshot.
+    """
+    if kwargs.get('raw'):
+        return
+    if kwargs.get('created') is False:
+        AnalyticsSnapshot.invalidate_all()
+    else:
+        AnalyticsSnapshot.invalidate([church_id])
+
+
+@receiver(post_save, sender=Person)
+@receiver(post_delete, sender=Person)
+def person_changed(sender, instance, **kwargs):
+    changed(instance.churchId_id, kwargs)
+
+
+@receiver(post_save, sender=Contact)
+@receiver(post_delete, sender=Contact)
+def contact_changed(sender, instance, **kwargs):
+    church_id = Person.objects.filter(pk=instance.personId_id).values_list('churchId_id', flat=True).first()
+    changed(church_id, kwargs)
+
+
+@receiver(post_save, sender=Leadership)
+@receiver(post_delete, sender=Leadership)
+def leadership_changed(sender, instance, **kwargs):
+    changed(instance.churchId_id, kwargs)
+
+
+@receiver(post_save, sender=HouseHold)
+@receiver(post_delete, sender=HouseHold)
+def household_changed(sender, instance, raw=False, **kwargs):
+    # households belong to no church
+    if not raw:
+        AnalyticsSnapshot.invalidate_all()
+
+
+@receiver(post_save, sender=Attendance)
+@receiver(post_delete, sender=Attendance)
+def attendance_changed(sender, instance, raw=False, **kwargs):
+    # check-outs and comments stay with the service's church
+    if not raw:
+        AnalyticsSnapshot.invalidate([church_of_service(instance.servicesId_id)])
+
+
+@receiver(attendance_bulk_created, sender=Attendance)
+def attendance_bulk_changed(sender, buckets, **kwargs):
+    AnalyticsSnapshot.invalidate({church_of_service(services_id) for services_id, _ in buckets})
@@ -0,0 +1,140 @@
+import logging
+import threading
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from apis.refcache import ReferenceCache
+from church.models import Church
+from services.schedule import church_date
+
+logger = logging.getLogger(__name__)
+
+
+class AnalyticsSnapshot:
+    """
+    Dashboard payloads cached per church, so loading a dashboard is a cache
+    read.
+
+    A payload is served for ANALYTICS_SNAPSHOT_MAX_AGE seconds after it was
+    built. Past that, or once the church's day has moved on, the reader
+    still gets it while a rebuild runs on the background executor. Payloads
+    are kept until they are replaced, only a cache holding none at all (a
+    fresh per-process cache, a failed rebuild) builds one in the request.
+    `manage.py warm_analytics_snapshots` builds every church's payloads
+    ahead of the first reads, e.g. right after midnight.
+
+    Changes to the tables a payload reads (analytics/signals.py) only mark
+    the church's payloads dirty once committed, writes never queue work. A
+    read of a dirty payload queues its rebuild once the payload is
+    ANALYTICS_SNAPSHOT_DEBOUNCE seconds old, so a busy check-in period costs
+    one rebuild per interval at most. Rebuilds queued while one is waiting
+    are coalesced.
+    """
+    # {'built': time.time() before the build, 'day': the church's day it was built for, 'payload': ...}
+    KEY = 'analytics:{name}:{church}'
+    # time.time() of the last committed change to a church's data
+    DIRTY_KEY = 'analytics:dirty:{church}'
+    # payload name -> view class with build(church_id, day) returning the payload, None when there is no data
+    BUILDERS = {
+        'analytics': 'analytics.views.Analytics',
+        'followup': 'analytics.views.FollowupAnalytics',
+    }
+    ALL_CHURCHES = 'all'
+
+    _pending = set()
+    _lock = threading.Lock()
+
+    @classmethod
+    def key(cls, name, church_id):
+        return cls.KEY.format(name=name, church=church_id or cls.ALL_CHURCHES)
+
+    @classmethod
+    def dirty_key(cls, church_id):
+        return cls.DIRTY_KEY.format(church=church_id or cls.ALL_CHURCHES)
+
+    @staticmethod
+    def today(church_id):
+        """The church's calendar day, the server's for the all-churches payloads"""
+        return church_date(church_id) if church_id else timezone.localdate()
+
+    @classmethod
+    def timeout(cls):
+        return 2 * settings.ANALYTICS_SNAPSHOT_MAX_AGE
+
+    @classmethod
+    def get(cls, name, church_id=None):
+        day = cls.today(church_id)
+        entry = cache.get(cls.key(name, church_id))
+        if entry is None:
+            return cls.build(name, church_id, day)
+        age = time.time() - entry['built']
+        changed = cache.get(cls.dirty_key(church_id))
+        if (entry['day'] != day or age >= settings.ANALYTICS_SNAPSHOT_MAX_AGE or
+                (changed is not None and changed >= entry['built'] and age >= settings.ANALYTICS_SNAPSHOT_DEBOUNCE)):
+            cls._enqueue(name, church_id)
+        return entry['payload']
+
+    @classmethod
+    def build(cls, name, church_id, day):
+        # stamped before reading, a change committed meanwhile leaves the payload dirty
+        built = time.time()
+        payload = import_string(cls.BUILDERS[name]).build(church_id, day)
+        if payload is not None:
+            cache.set(cls.key(name, church_id), {'built': built, 'day': day, 'payload': payload}, None)
+        return payload
+
+    @classmethod
+    def warm(cls, church_ids=None):
+        """Build every payload of these churches (default all of them and the all-churches one), returns the count"""
+        if church_ids is None:
+            church_ids = [None, *(church.id for church in ReferenceCache.all(Church))]
+        for church_id in church_ids:
+            for name in cls.BUILDERS:
+                cls.build(name, church_id, cls.today(church_id))
+        return len(church_ids) * len(cls.BUILDERS)
+
+    @classmethod
+    def invalidate(cls, church_ids):
+        """Mark the payloads of these churches and the all-churches ones dirty once committed"""
+        keys = [cls.dirty_key(church_id) for church_id in {*church_ids, None}]
+        transaction.on_commit(lambda: cache.set_many({key: time.time() for key in keys}, cls.timeout()))
+
+    @classmethod
+    def invalidate_all(cls):
+        cls.invalidate([church.id for church in ReferenceCache.all(Church)])
+
+    @classmethod
+    def _enqueue(cls, name, church_id):
+        with cls._lock:
+            if (name, church_id) in cls._pending:
+                return
+            cls._pending.add((name, church_id))
+
+        # executor is created in UserConfig.ready(), look it up at call time
+        from user.apps import executor
+        if executor is None:
+            cls.refresh(name, church_id)
+        else:
+            executor.submit(cls._refresh_in_worker, name, church_id)
+
+    @classmethod
+    def refresh(cls, name, church_id):
+        with cls._lock:
+            # a read from here on may queue the next rebuild
+            cls._pending.discard((name, church_id))
+        try:
+            cls.build(name, church_id, cls.today(church_id))
+        except Exception:
+            logger.exception("Rebuilding the %s analytics of church %s failed", name, church_id)
+            # never keep serving a payload that missed a change, the next read builds it
+            cache.delete(cls.key(name, church_id))
+
+    @classmethod
+    def _refresh_in_worker(cls, name, church_id):
+        try:
+            cls.refresh(name, church_id)
+        finally:
+            close_old_connections()
@@ -1,3 +1,318 @@
-from django.test import TestCase
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from unittest import mock
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils import timezone
+from attendance.models import Attendance, AttendanceArchive, AttendanceRollup
+from church.models import Church
+from contact.models import Contact
+from membership.models import Membership
+from person.models import Person
+from apis.testing import ApiTestCase
+from .ages import born_by, bracket_filters
+from . import followup
+from .arrivals import arrival_heatmaps
+from .cohorts import aware, compute_cohorts, retention_cohorts
+from .snapshots import AnalyticsSnapshot
+from .views import (Analytics, ArrivalHeatmaps, AttendanceTrends, FollowupAbsentees, FollowupAnalytics, FollowupVisitors,
+                    RetentionCohorts)
 
-# Create your tests here.
+
+class AgeBracketTests(ApiTestCase):
+
+    def test_born_by(self):
+        self.assertEqual(born_by(date(2025, 6, 15), 19), date(2006, 6, 15))
+        # no 29 February in 2007
+        self.assertEqual(born_by(date(2024, 2, 29), 17), date(2007, 2, 28))
+
+    def test_brackets_leave_out_12_and_19(self):
+        today = date(2025, 6, 15)
+        for name, dob in (('Twenty', date(2005, 6, 15)), ('Nineteen', date(2005, 6, 16)),
+                          ('Eighteen', date(2007, 1, 1)), ('Thirteen', date(2012, 6, 15)),
+                          ('Twelve', date(2012, 6, 16)), ('Eleven', date(2013, 6, 16))):
+            self.create_person(self.church, name, 'Age', dob=dob)
+        persons = Person.objects.filter(lastName='Age')
+        counts = {name: sorted(persons.filter(q).values_list('firstName', flat=True))
+                  for name, q in bracket_filters('dob', today).items()}
+        self.assertEqual(counts, {'youths': ['Twenty'], 'teens': ['Eighteen', 'Thirteen'], 'children': ['Eleven']})
+
+
+class AnalyticsViewTests(ApiTestCase):
+
+    def test_no_contacts_is_404(self):
+        self.assertEqual(self.call(Analytics).status_code, 404)
+
+    def test_statistics(self):
+        Contact.objects.create(personId=self.user.personId, phone='0800000000', email='a@example.com',
+                               address='1 Main St', state='Lagos', country='Nigeria', ethnicity='Yoruba',
+                               marital_status='SINGLE')
+        response = self.call(Analytics, data={'churchId': self.church.id})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['statistics']['total_persons'], 1)
+        self.assertEqual(response.data['membership_status'], {'member': 1})
+
+    def test_errors_are_not_reported_as_no_data(self):
+        with mock.patch.object(Analytics, 'build', side_effect=RuntimeError('database down')):
+            with self.assertRaises(RuntimeError):
+                self.call(Analytics)
+        with mock.patch.object(FollowupAnalytics, 'build', side_effect=RuntimeError('database down')):
+            with self.assertRaises(RuntimeError):
+                self.call(FollowupAnalytics)
+
+
+class AnalyticsSnapshotTests(ApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        # rebuilds a test queued with refresh() mocked never left the queue
+        AnalyticsSnapshot._pending.clear()
+        self.person = self.create_person(self.church, 'Ada', 'Obi')
+
+    def absentees(self):
+        return [row['id'] for row in AnalyticsSnapshot.get('followup', self.church.id)['absentees']['results']]
+
+    def check_in(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Attendance.objects.create(personId=self.person, servicesId=self.service, captureMethodId=self.form)
+
+    def test_payload_is_cached(self):
+        self.assertIn(self.person.id, self.absentees())
+        with self.assertNumQueries(0):
+            self.assertIn(self.person.id, self.absentees())
+
+    def test_writes_queue_no_rebuild(self):
+        self.absentees()
+        with mock.patch.object(AnalyticsSnapshot, 'refresh') as refresh:
+            self.check_in()
+        refresh.assert_not_called()
+
+    def test_change_is_picked_up_after_the_debounce(self):
+        self.absentees()
+        self.check_in()
+        # within the interval the cached payload is served as is
+        self.assertIn(self.person.id, self.absentees())
+        with override_settings(ANALYTICS_SNAPSHOT_DEBOUNCE=0):
+            # answered from the old payload while it is rebuilt
+            self.assertIn(self.person.id, self.absentees())
+        self.assertNotIn(self.person.id, self.absentees())
+
+    def test_payload_is_rebuilt_after_max_age(self):
+        self.absentees()
+        with mock.patch.object(AnalyticsSnapshot, 'refresh') as refresh:
+            self.absentees()
+            refresh.assert_not_called()
+            with override_settings(ANALYTICS_SNAPSHOT_MAX_AGE=0):
+                self.absentees()
+            refresh.assert_called_once_with('followup', self.church.id)
+
+    def test_previous_day_is_served_while_rebuilt(self):
+        self.absentees()
+        tomorrow = AnalyticsSnapshot.today(self.church.id) + timedelta(days=1)
+        with mock.patch.object(AnalyticsSnapshot, 'today', return_value=tomorrow), \
+                mock.patch.object(AnalyticsSnapshot, 'refresh') as refresh, self.assertNumQueries(0):
+            self.assertIn(self.person.id, self.absentees())
+        refresh.assert_called_once_with('followup', self.church.id)
+
+    def test_warm_builds_every_church_ahead_of_reads(self):
+        call_command('warm_analytics_snapshots', stdout=mock.Mock())
+        with self.assertNumQueries(0):
+            self.assertIn(self.person.id, self.absentees())
+            AnalyticsSnapshot.get('followup')
+
+
+class FollowupTests(ApiTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.visitor = Membership.objects.create(status='New Visitor', description='v')
+        cls.guest = cls.create_person(cls.church, 'Guest', 'One', membershipId=cls.visitor)
+        cls.regular = cls.create_person(cls.church, 'Regular', 'Two')
+        cls.lapsed = cls.create_person(cls.church, 'Lapsed', 'Three')
+
+    def ids(self, view):
+        response = self.call(view, data={'churchId': self.church.id})
+        self.assertEqual(response.status_code, 200)
+        return sorted(row['id'] for row in response.data['results'])
+
+    def test_dashboard_holds_the_first_page_of_each_list(self):
+        for n in range(12):
+            self.create_person(self.church, f'Absent{n:02}', 'Person')
+        response = self.call(FollowupAnalytics, data={'churchId': self.church.id})
+        absentees, visitors = response.data['absentees'], response.data['visitors']
+        # the fixture user's person and the three of the class are absent too
+        self.assertEqual((absentees['count'], len(absentees['results'])), (16, 10))
+        self.assertTrue(absentees['next'].endswith(f'/followup-absentees/?page=2&churchId={self.church.id}'))
+        first_page = self.call(FollowupAbsentees, data={'churchId': self.church.id})
+        self.assertEqual([row['id'] for row in absentees['results']],
+                         [row['id'] for row in first_page.data['results']])
+        self.assertEqual((visitors['count'], visitors['next']), (1, None))
+        self.assertEqual(visitors['results'][0]['id'], self.guest.id)
+
+    def test_visitors_match_the_status_case_insensitively(self):
+        self.assertEqual(self.ids(FollowupVisitors), [self.guest.id])
+
+    def test_absentees_have_no_recent_check_in(self):
+        Attendance.objects.create(personId=self.regular, servicesId=self.service, captureMethodId=self.form)
+        Attendance.objects.create(personId=self.lapsed, servicesId=self.service, captureMethodId=self.form,
+                                  checkInTimestamp=timezone.now() - timedelta(days=45))
+        self.assertEqual(self.ids(FollowupAbsentees),
+                         sorted([self.user.personId_id, self.guest.id, self.lapsed.id]))
+
+    def test_absentees_of_another_church_are_left_out(self):
+        other = Church.objects.create(name='Hope', address='2 Main St', description='d')
+        self.create_person(other, 'Far', 'Away')
+        self.assertNotIn('Far', [row['firstName'] for row in
+                                 self.call(FollowupAbsentees, data={'churchId': self.church.id}).data['results']])
+
+    def test_lists_are_one_query_each(self):
+        with self.assertNumQueries(1):
+            list(followup.absentees(self.church.id))
+        # the visitor memberships come from the reference cache
+        followup.visitor_membership_ids()
+        with self.assertNumQueries(1):
+            list(followup.visitors(self.church.id))
+
+
+class AttendanceTrendsTests(ApiTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        for day, status, count in ((date(2024, 6, 3), 'member', 5), (date(2025, 6, 1), 'member', 4),
+                                   (date(2025, 6, 4), 'member', 10), (date(2025, 6, 10), 'visitor', 20)):
+            AttendanceRollup.objects.create(churchId=cls.church, servicesId=cls.service, date=day,
+                                            membershipStatus=status, captureMethod='FORM', count=count)
+
+    def trends(self, **params):
+        params = {'churchId': self.church.id, 'dateFrom': '2025-06-02', 'dateTo': '2025-06-15',
+                  'window': 2, **params}
+        return self.call(AttendanceTrends, data=params)
+
+    def test_weekly_series(self):
+        response = self.trends()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['periods'], [date(2025, 6, 2), date(2025, 6, 9)])
+        # the rolling average and the deltas reach back before dateFrom
+        self.assertEqual(response.data['total'], {'counts': [10, 20], 'rolling_average': [7.0, 15.0],
+                                                  'yoy_delta': [5, 20], 'yoy_percent': [100.0, None]})
+        self.assertEqual({row['membershipStatus']: row['counts'] for row in response.data['by_membership']},
+                         {'member': [10, 0], 'visitor': [0, 20]})
+        self.assertEqual([(row['eventName'], row['counts']) for row in response.data['by_service']],
+                         [(self.service.eventName, [10, 20])])
+
+    def test_monthly_series(self):
+        response = self.trends(interval='month', dateFrom='2025-05-01', dateTo='2025-06-30', window=1)
+        self.assertEqual(response.data['total']['counts'], [0, 34])
+        self.assertEqual(response.data['total']['yoy_delta'], [0, 29])
+
+    def test_cached_per_range(self):
+        self.trends()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.trends().status_code, 200)
+
+    def test_invalid_parameters(self):
+        for params in ({'interval': 'day'}, {'window': 0}, {'window': 53}, {'dateFrom': '2025-13-01'},
+                       {'dateFrom': '2025-07-01'}, {'dateFrom': '2000-01-01'}):
+            self.assertEqual(self.trends(**params).status_code, 400, params)
+
+
+class RetentionCohortTests(ApiTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.january = [cls.create_person(cls.church, name, 'Cohort', entranceDate=aware(date(2024, 1, 8)))
+                       for name in ('Ada', 'Bola')]
+        cls.create_person(cls.church, 'Chidi', 'Cohort', entranceDate=aware(date(2024, 2, 5)))
+        ada, bola = cls.january
+        for person, day in ((ada, date(2024, 1, 8)), (ada, date(2024, 1, 10)), (bola, date(2024, 1, 9))):
+            Attendance.objects.create(personId=person, servicesId=cls.service, captureMethodId=cls.form,
+                                      checkInTimestamp=aware(day))
+        # 14 weeks in, inside the 3 month window, already archived
+        AttendanceArchive.objects.create(id=1000, personId=ada, servicesId=cls.service, captureMethodId=cls.form,
+                                         checkInTimestamp=aware(date(2024, 4, 15)), attendanceDate=date(2024, 4, 15))
+
+    def test_settled_cohorts(self):
+        january, february = compute_cohorts([date(2024, 1, 1), date(2024, 2, 1)], self.church.id,
+                                            date(2025, 6, 1)).values()
+        self.assertEqual((january['size'], january['retention']), (2, {'3m': 0.5, '6m': 0.0, '12m': 0.0}))
+        # two check-ins in one week count once
+        self.assertEqual(january['curve'][:2], [1.0, 0.0])
+        self.assertEqual(january['curve'][14], 0.5)
+        self.assertTrue(january['settled'])
+        self.assertEqual((february['size'], february['retention']['3m'], february['curve'][0]), (1, 0.0, 0.0))
+
+    def test_members_not_in_long_enough_are_not_measured(self):
+        january = compute_cohorts([date(2024, 1, 1)], self.church.id, date(2024, 2, 12))[date(2024, 1, 1)]
+        self.assertEqual(january['retention'], {'3m': None, '6m': None, '12m': None})
+        self.assertEqual(january['curve'][5], 0.0)
+        self.assertIsNone(january['curve'][6])
+        self.assertFalse(january['settled'])
+
+    def test_only_missing_cohorts_are_computed(self):
+        retention_cohorts(date(2024, 1, 1), date(2024, 1, 1), self.church.id)
+        with mock.patch('analytics.cohorts.compute_cohorts', wraps=compute_cohorts) as compute:
+            cohorts = retention_cohorts(date(2024, 1, 1), date(2024, 2, 1), self.church.id)
+        self.assertEqual([cohort['size'] for cohort in cohorts], [2, 1])
+        self.assertEqual(list(compute.call_args.args[0]), [date(2024, 2, 1)])
+
+    def test_view(self):
+        response = self.call(RetentionCohorts, data={'churchId': self.church.id,
+                                                     'cohortFrom': '2024-01', 'cohortTo': '2024-03'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([cohort['cohort'] for cohort in response.data['cohorts']], ['2024-01', '2024-02', '2024-03'])
+        self.assertEqual(response.data['milestones'], ['3m', '6m', '12m'])
+        for params in ({'cohortFrom': '2024-13'}, {'cohortFrom': '2024-04', 'cohortTo': '2024-03'},
+                       {'cohortFrom': '2010-01', 'cohortTo': '2024-03'}):
+            self.assertEqual(self.call(RetentionCohorts, data=params).status_code, 400, params)
+
+
+class ArrivalHeatmapTests(ApiTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.lagos = Church.objects.create(name='Lagos', address='3 Main St', description='d', timezone='Africa/Lagos')
+        cls.lagos_service = cls.create_service(cls.lagos, eventTime=time(10))
+        persons = [cls.create_person(cls.church, name, 'Arrival') for name in ('Ada', 'Bola', 'Chidi', 'Dayo')]
+        for person, day, moment in ((0, 15, time(8, 52)), (1, 15, time(8, 57)), (2, 15, time(8, 58)),
+                                    (3, 15, time(7)), (0, 17, time(8, 56)), (1, 17, time(11))):
+            cls.check_in(persons[person], cls.service, datetime.combine(date(2025, 6, day), moment))
+        # 10:05 in Lagos
+        cls.check_in(persons[0], cls.lagos_service, datetime(2025, 6, 15, 9, 5))
+
+    @classmethod
+    def check_in(cls, person, service, moment):
+        Attendance.objects.create(personId=person, servicesId=service, captureMethodId=cls.form,
+                                  checkInTimestamp=moment.replace(tzinfo=dt_timezone.utc))
+
+    def heatmaps(self):
+        return arrival_heatmaps([self.service, self.lagos_service], date(2025, 6, 18), 2, 5, 30, 60)
+
+    def test_buckets(self):
+        heatmaps = self.heatmaps()
+        self.assertEqual(heatmaps['weeks'], [date(2025, 6, 9), date(2025, 6, 16)])
+        self.assertEqual(heatmaps['buckets'][:3], [-30, -25, -20])
+        service = heatmaps['services'][0]
+        self.assertEqual({key: service[key] for key in ('checkIns', 'serviceDays', 'early', 'late', 'medianArrival')},
+                         {'checkIns': 6, 'serviceDays': 2, 'early': 1, 'late': 1, 'medianArrival': -3.5})
+        self.assertEqual(service['heatmap'][0][4:6], [1, 2])
+        self.assertEqual(service['heatmap'][1][4:6], [0, 1])
+        self.assertEqual(sum(service['curve']), 4)
+        self.assertEqual(service['peak'], {'from': -5, 'to': 0, 'checkIns': 3, 'perServiceDay': 1.5})
+
+    def test_start_is_in_the_church_time_zone(self):
+        lagos = self.heatmaps()['services'][1]
+        self.assertEqual((lagos['servicesId'], lagos['medianArrival']), (self.lagos_service.id, 5.0))
+        self.assertEqual(lagos['peak']['from'], 5)
+
+    def test_view(self):
+        response = self.call(ArrivalHeatmaps, data={'servicesId': self.service.id, 'bucket': 1, 'weeks': 52})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['bucketMinutes'], 1)
+        self.assertEqual(len(response.data['weeks']), 52)
+        with self.assertNumQueries(0):
+            self.call(ArrivalHeatmaps, data={'servicesId': self.service.id, 'bucket': 1, 'weeks': 52})
+        for params in ({'bucket': 2}, {'weeks': 0}, {'weeks': 53}, {'servicesId': 'x'}):
+            self.assertEqual(self.call(ArrivalHeatmaps, data=params).status_code, 400, params)
@@ -0,0 +1,145 @@
+from datetime import timedelta
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Sum
+from django.db.models.functions import TruncMonth, TruncWeek
+from django.utils import timezone
+from apis.refcache import ReferenceCache
+from attendance.models import AttendanceRollup
+from services.models import Services
+
+TRENDS_KEY = 'analytics:trends:{church}:{interval}:{start}:{end}:{window}'
+# interval -> (truncation of the rollup date, periods in a year, default rolling window, default span)
+INTERVALS = {
+    'week': (TruncWeek, 52, 4, 52),
+    'month': (TruncMonth, 12, 3, 12),
+}
+# longest range one request may cover, in periods
+MAX_PERIODS = {'week': 260, 'month': 120}
+# rollup columns the series are broken down by
+DIMENSIONS = ('servicesId', 'membershipStatus')
+
+
+def period_start(day, interval):
+    """Monday of the week or first of the month holding day"""
+    if interval == 'week':
+        return day - timedelta(days=day.weekday())
+    return day.replace(day=1)
+
+
+def shift(day, interval, periods):
+    """Start of the period periods before (negative: after) the period starting on day"""
+    if interval == 'week':
+        return day - timedelta(weeks=periods)
+    months = day.year * 12 + day.month - 1 - periods
+    return day.replace(year=months // 12, month=months % 12 + 1)
+
+
+def period_starts(start, end, interval):
+    starts = []
+    day = period_start(start, interval)
+    while day <= end:
+        starts.append(day)
+        day = shift(day, interval, -1)
+    return starts
+
+
+def rolling_mean(counts, window):
+    """Trailing mean over window periods, NaN until window periods are available"""
+    means = np.full(counts.shape, np.nan)
+    if window <= counts.shape[-1]:
+        totals = np.cumsum(np.insert(counts, 0, 0, axis=-1), axis=-1, dtype=float)
+        means[..., window - 1:] = (totals[..., window:] - totals[..., :-window]) / window
+    return means
+
+
+def year_over_year(counts, lag):
+    """(delta, percent) against the same period lag periods earlier, NaN percent where that was 0"""
+    previous = counts[..., :-lag]
+    delta = counts[..., lag:] - previous
+    with np.errstate(divide='ignore', invalid='ignore'):
+        percent = np.where(previous > 0, delta * 100.0 / previous, np.nan)
+    return delta, percent
+
+
+def as_list(values, digits=None):
+    """numpy row to JSON, NaN as None"""
+    return [None if np.isnan(value) else (round(float(value), digits) if digits is not None else int(value))
+            for value in values]
+
+
+def attendance_trends(church_id, start, end, interval, window):
+    """
+    Attendance per week or month between start and end, overall, per service
+    and per membership status, from the daily rollups. Every series comes with
+    a trailing rolling mean over window periods and deltas against the same
+    period a year earlier. The rollups are read from a year before start so
+    both are defined from the first period on.
+    """
+    trunc, lag, _, _ = INTERVALS[interval]
+    visible = period_starts(start, end, interval)
+    first = shift(visible[0], interval, lag)
+    periods = period_starts(first, end, interval)
+    index = {day: position for position, day in enumerate(periods)}
+
+    rollups = AttendanceRollup.objects.filter(date__gte=first, date__lte=end)
+    if church_id is not None:
+        rollups = rollups.filter(churchId=church_id)
+
+    breakdowns = {}
+    for dimension in DIMENSIONS:
+        rows = (rollups.annotate(period=trunc('date')).values('period', dimension)
+                .annotate(total=Sum('count')).order_by())
+        keys = {}
+        for row in rows:
+            keys.setdefault(row[dimension], len(keys))
+        counts = np.zeros((len(keys), len(periods)), dtype=np.int64)
+        for row in rows:
+            period = row['period']
+            period = period.date() if hasattr(period, 'date') else period
+            counts[keys[row[dimension]], index[period]] += row['total']
+        breakdowns[dimension] = (list(keys), counts)
+
+    def series(counts):
+        rolling = rolling_mean(counts, window)
+        delta, percent = year_over_year(counts, lag)
+        shown = slice(len(periods) - len(visible), None)
+        return {"counts": as_list(counts[shown].astype(float)),
+                "rolling_average": as_list(rolling[shown], 2),
+                "yoy_delta": as_list(delta[-len(visible):].astype(float)),
+                "yoy_percent": as_list(percent[-len(visible):], 1)}
+
+    services, service_counts = breakdowns['servicesId']
+    statuses, status_counts = breakdowns['membershipStatus']
+    by_service = []
+    for position, services_id in enumerate(services):
+        try:
+            event_name = ReferenceCache.get(Services, id=services_id).eventName
+        except Services.DoesNotExist:
+            event_name = None
+        by_service.append({"servicesId": services_id, "eventName": event_name,
+                           **series(service_counts[position])})
+    by_membership = [{"membershipStatus": status, **series(status_counts[position])}
+                     for position, status in enumerate(statuses)]
+
+    return {"interval": interval, "from": visible[0], "to": end, "window": window,
+            "periods": visible,
+            "total": series(service_counts.sum(axis=0)),
+            "by_service": by_service,
+            "by_membership": by_membership}
+
+
+def cached_trends(church_id, start, end, interval, window):
+    """
+    attendance_trends() cached per church and range. Ranges reaching today
+    keep ANALYTICS_TRENDS_TIMEOUT seconds, closed ones a day.
+    """
+    key = TRENDS_KEY.format(church=church_id or 'all', interval=interval, start=start.isoformat(),
+                            end=end.isoformat(), window=window)
+    trends = cache.get(key)
+    if trends is None:
+        trends = attendance_trends(church_id, start, end, interval, window)
+        timeout = settings.ANALYTICS_TRENDS_TIMEOUT if end >= timezone.localdate() else 24 * 3600
+        cache.set(key, trends, timeout)
+    return trends
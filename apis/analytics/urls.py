@@ -19,5 +19,13 @@ from django.urls import path
 from .views import *
 urlpatterns = [
     path('analytics/', Analytics.as_view(), name='analytics'),
+   path('attendance-dashboard/', AttendanceDashboard.as_view(), name='attendance-dashboard'),
+   path('attendance-trends/', AttendanceTrends.as_view(), name='attendance-trends'),
+   path('arrival-heatmaps/', ArrivalHeatmaps.as_view(), name='arrival-heatmaps'),
+   path('retention-cohorts/', RetentionCohorts.as_view(), name='retention-cohorts'),
+   path('attendance-stats/', AttendanceStats.as_view(), name='attendance-stats'),
    path('followup-analytics/', FollowupAnalytics.as_view(), name='followup-analytics'),
+   path('followup-absentees/', FollowupAbsentees.as_view(), name='followup-absentees'),
+   path('followup-visitors/', FollowupVisitors.as_view(), name='followup-visitors'),
+   path('birthday-celebrants/', BirthdayCelebrants.as_view(), name='birthday-celebrants'),
 ]
@@ -1,16 +1,15 @@
 
 from django.shortcuts import render
-import pandas as pd
 from rest_framework import status
 from rest_framework.reverse import reverse
 from rest_framework import generics
 from rest_framework.response import Response
 from rest_framework import filters
 from django_filters.rest_framework import DjangoFilterBackend
-from urllib.parse import urlparse
+from urllib.parse import urlencode, urlparse
 from rest_framework.permissions import IsAuthenticated, IsAdminUser,AllowAny
 from django_filters import AllValuesFilter, DateTimeFilter, NumberFilter
-from rest_framework.exceptions import PermissionDenied
+from rest_framework.exceptions import PermissionDenied, ValidationError
 from django.http import HttpResponse
 from rest_framework.views import APIView
 from django.contrib.auth.models import Permission
@@ -20,196 +19,410 @@ from household.models import HouseHold
 from user.models import User
 from ministries.models import Ministries
 from membership.models import Membership
-from attendance.models import Attendance
+from attendance.models import Attendance, AttendanceRollup
+from attendance import bitmaps
 from services.models import Services
 from leadership.models import Leadership
 from role.models import Role
+from apis.pagination import PersonPagination
+from .ages import bracket_filters
+from .snapshots import AnalyticsSnapshot
+from . import followup
+from .serializers import AttendanceStatsSerializer, CelebrantSerializer, FollowupPersonSerializer
+from . import arrivals, cohorts, trends
 from django.utils import timezone
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncMonth, TruncYear
 from datetime import datetime, timedelta
-from django.utils.dateparse import parse_datetime
-import bisect
+from django.utils.dateparse import parse_date, parse_datetime
 
 # Create your views here.
+NO_DATA = {"message":"Please ensure your database tables are filled before your analysis"}
+
+
+def church_param(request):
+    """?churchId=<id> narrowing a dashboard to one church, None for every church"""
+    church_id = request.query_params.get('churchId')
+    if church_id and not church_id.isdigit():
+        raise ValidationError({"churchId": "churchId must be a number"})
+    return int(church_id) if church_id else None
+
+
 class Analytics(APIView):
+    """Membership statistics, ?churchId=<id> for one church. Served from AnalyticsSnapshot"""
     permission_classes = [IsAuthenticated] #only authenticated users can access
     name = 'Analytics'
+    month_names = {1:'January', 2:'February', 3:'March',4:'April',5:'May', 6:'June',
+                   7:'July', 8:'August',9:'September', 10:'October',11:'November',
+                   12:'December'}
+
     def get(self,request):
-        try:
-            # Take statistics of menbers in the various ministries
-            persons = Person.objects.values() 
-            contacts = Contact.objects.values()
-            household = HouseHold.objects.values()
-            users = User.objects.values()
-            leaderships = Leadership.objects.values()
-            #only todays's attendance
-            today = timezone.localtime(timezone.now()).date()
-            attendance = Attendance.objects.filter(checkInTimestamp__date=today).values()
-            statistics = {}
-            if persons and contacts:
-                df = pd.merge(pd.DataFrame.from_records(persons), 
-                          pd.DataFrame.from_records(contacts), left_on='id', 
-                          right_on='personId_id', how='outer')
-
-                men = df[(df['gender'] == 'M') & ((df['marital_status'] == 'MARRIED') | 
-                                              (df['marital_status'] == 'SEPARATED'))].shape[0]
-                women = df[(df['gender'] == 'F') & ((df['marital_status'] == 'MARRIED') | 
-                                              (df['marital_status'] == 'SEPARATED'))].shape[0]
-                youths = 0
-                teens = 0
-                children = 0
-                for row in df.itertuples(index=False):
-                     youths  += 1 if (row.marital_status == 'SINGLE' and self.age(row.dob) > 19) else 0
-                     teens  += 1 if (row.marital_status == 'SINGLE' and (self.age(row.dob) > 12 and self.age(row.dob) < 19)) else 0
-                     children  += 1 if (row.marital_status == 'SINGLE' and self.age(row.dob) < 12) else 0
-                total_users = len(users)
-                families = len(household)
-                total_persons = df.shape[0]
-                statistics = {
-                "men": men,
-                "women": women,
-                "youths": youths,
-                "teens": teens,
-                "children": children,
-                "total_users": total_users,
-                "families": families,
-                "total_persons": total_persons,
-                }
-            membership = df['membershipId_id'].value_counts() 
-            membership_status = {}
-            for member in membership.items():
-                membership_status[Membership.objects.get(id=member[0]).status]= member[1]
-
-            ethnicity = df['ethnicity'].value_counts()
-            ethnic_groups = {}
-            for ethnic in ethnicity.items():
-                ethnic_groups[ethnic[0]] = ethnic[1]
-
-            leadership_status = {}
-            if leaderships:
-                df3 = pd.DataFrame.from_records(leaderships)
-                leadership = df3['roleId_id'].value_counts()
-                for leader in leadership.items():
-                    leadership_status[Role.objects.get(id=leader[0]).name]= leader[1]
-
-            # Annual Membership Growth for the last 5 years
-            five_years_age = timezone.now() - timedelta(days=5*365)
-            df['entranceDate'] = pd.to_datetime(df['entranceDate'])
-            filtered_df = df[df['entranceDate'] >= five_years_age]
-            annual_membership_statistics = filtered_df.groupby(filtered_df['entranceDate'].dt.year).size().to_dict()
-
-            # Monthly Membership Growth for the current  year
-            currentYear = timezone.now().year
-            df['entranceDate'] = pd.to_datetime(df['entranceDate'])
-            filtered_df = df[df['entranceDate'].dt.year == currentYear]
-            key_mapping = {1:'January', 2:'February', 3:'March',4:'April',5:'May', 6:'June',
-                           7:'July', 8:'August',9:'September', 10:'October',11:'November',
-                           12:'December'}
-            monthly_membership_statistics = filtered_df.groupby(filtered_df['entranceDate'].dt.month).size().to_dict()
-            current_year_monthly_membership_statistics = {key_mapping.get(k,k): v for k, v in monthly_membership_statistics.items()}
-
-            #membership attendance merge
-            today_attendance = {}
-            if attendance:
-                df4 = pd.merge(pd.DataFrame.from_records(persons), 
-                          pd.DataFrame.from_records(attendance), left_on='id', 
-                          right_on='personId_id', how='inner')
-                if not df4.empty:
-                    memberships = Membership.objects.values('id','status')
-                    memberships = {m['id']:m['status'] for m in memberships}
-                    today_attendance = df4.groupby('membershipId_id').size().to_dict()
-                    today_attendance = {memberships.get(k,k): v for k, v in today_attendance.items()}
-
-            return Response({ "statistics": statistics, "membership_status": membership_status, "ethnic_groups": ethnic_groups, 
-                             "leadership_status": leadership_status, "annual_growth": annual_membership_statistics, 
-                             "current_year_monthly_growth": current_year_monthly_membership_statistics, "today_attendance": today_attendance }, status=200)
-        except Exception as e:
-            return Response({"message":"Please ensure your database tables are filled before your analysis"}, status=404)
-    def age(self, birthdate):
-        today = timezone.now().date()
-        dob = timezone.datetime.strptime(str(birthdate),'%Y-%m-%d')
-        age = today.year - dob.year
-        if (today.month, today.day) < (dob.month, dob.day):
-            age -= 1 #is not yet birthday so subtract 1 from age
-        return age
-   
+        # None is the empty-data case (no persons or contacts), any other failure is a real error
+        payload = AnalyticsSnapshot.get('analytics', church_id=church_param(request))
+        if payload is None:
+            return Response(NO_DATA, status=404)
+        return Response(payload, status=200)
+
+    @classmethod
+    def build(cls, church_id, today):
+        """The dashboard payload of one church (every church for None), None without persons or contacts"""
+        # every figure is an aggregate query, no table is loaded into Python
+        persons = Person.objects.all()
+        contacts = Contact.objects.all()
+        users = User.objects.all()
+        households = HouseHold.objects.all()
+        leaderships = Leadership.objects.all()
+        rollups = AttendanceRollup.objects.all()
+        if church_id is not None:
+            persons = persons.filter(churchId=church_id)
+            contacts = contacts.filter(personId__churchId=church_id)
+            users = users.filter(personId__churchId=church_id)
+            households = households.filter(person__churchId=church_id).distinct()
+            leaderships = leaderships.filter(churchId=church_id)
+            rollups = rollups.filter(churchId=church_id)
+        if not persons.exists() or not contacts.exists():
+            return None
+
+        # one pass over contacts joined to their person for the family and age statistics
+        couple = Q(marital_status__in=('MARRIED', 'SEPARATED'))
+        single = Q(marital_status='SINGLE')
+        age_filters = bracket_filters('personId__dob', today)
+        counts = contacts.aggregate(
+            men=Count('id', filter=couple & Q(gender='M')),
+            women=Count('id', filter=couple & Q(gender='F')),
+            **{name: Count('id', filter=single & q) for name, q in age_filters.items()})
+        statistics = {
+        "men": counts['men'],
+        "women": counts['women'],
+        "youths": counts['youths'],
+        "teens": counts['teens'],
+        "children": counts['children'],
+        "total_users": users.count(),
+        "families": households.count(),
+        "total_persons": persons.count(),
+        }
+
+        membership_status = cls.group_count(persons.exclude(membershipId=None), 'membershipId__status')
+        ethnic_groups = cls.group_count(contacts, 'ethnicity')
+        leadership_status = cls.group_count(leaderships.exclude(roleId=None), 'roleId__name')
+
+        # Annual Membership Growth for the last 5 years
+        five_years_age = timezone.now() - timedelta(days=5*365)
+        annual_membership_statistics = {
+            row['year'].year: row['total'] for row in
+            persons.filter(entranceDate__gte=five_years_age).annotate(year=TruncYear('entranceDate'))
+            .values('year').annotate(total=Count('id')).order_by('year')}
+
+        # Monthly Membership Growth for the current  year
+        current_year_monthly_membership_statistics = {
+            cls.month_names[row['month'].month]: row['total'] for row in
+            persons.filter(entranceDate__year=today.year).annotate(month=TruncMonth('entranceDate'))
+            .values('month').annotate(total=Count('id')).order_by('month')}
+
+        #today's attendance per membership status from the daily rollups
+        today_attendance = dict(rollups.filter(date=today).exclude(membershipStatus='')
+                                .values('membershipStatus').annotate(total=Sum('count'))
+                                .values_list('membershipStatus', 'total'))
+
+        return { "statistics": statistics, "membership_status": membership_status, "ethnic_groups": ethnic_groups,
+                 "leadership_status": leadership_status, "annual_growth": annual_membership_statistics,
+                 "current_year_monthly_growth": current_year_monthly_membership_statistics, "today_attendance": today_attendance }
+
+    @staticmethod
+    def group_count(queryset, field):
+        """{value of field: rows} with a GROUP BY in the database, largest first like value_counts()"""
+        rows = queryset.values(field).annotate(total=Count('id')).order_by('-total')
+        return {row[field]: row['total'] for row in rows}
+
+
+class AttendanceDashboard(APIView):
+    """
+    Attendance totals for the weekly, monthly and yearly dashboards, read from
+    the daily rollups so the cost does not grow with attendance history.
+
+    ?period=week|month|year (default week), ?churchId=<id> to narrow to one church.
+    week and month give one total per day, year one total per month.
+    """
+    permission_classes = [IsAuthenticated]
+    name = 'attendance-dashboard'
+    periods = {'week': 7, 'month': 31, 'year': 365}
+
+    def get(self, request):
+        period = request.query_params.get('period', 'week')
+        if period not in self.periods:
+            return Response({"error": f"period must be one of {', '.join(self.periods)}"}, status=400)
+        today = timezone.localtime(timezone.now()).date()
+        start = today - timedelta(days=self.periods[period] - 1)
+        rollups = AttendanceRollup.objects.filter(date__gte=start, date__lte=today)
+        church_id = request.query_params.get('churchId')
+        if church_id:
+            if not church_id.isdigit():
+                return Response({"error": "churchId must be a number"}, status=400)
+            rollups = rollups.filter(churchId=church_id)
+
+        if period == 'year':
+            series = (rollups.annotate(month=TruncMonth('date')).values('month')
+                      .annotate(total=Sum('count')).order_by('month'))
+            series = [{"date": row['month'], "total": row['total']} for row in series]
+        else:
+            series = list(rollups.values('date').annotate(total=Sum('count')).order_by('date')
+                          .values('date', 'total'))
+
+        by_membership = dict(rollups.values('membershipStatus').annotate(total=Sum('count'))
+                             .order_by().values_list('membershipStatus', 'total'))
+        by_method = dict(rollups.values('captureMethod').annotate(total=Sum('count'))
+                         .order_by().values_list('captureMethod', 'total'))
+        return Response({"period": period, "from": start, "to": today,
+                         "total": sum(by_method.values()),
+                         "series": series,
+                         "by_membership": by_membership,
+                         "by_capture_method": by_method}, status=200)
+
+
+class AttendanceTrends(APIView):
+    """
+    Attendance trend per week or month over a range, overall, per service and
+    per membership status, with rolling averages and year-over-year deltas.
+    Built from the daily rollups and cached per range (analytics/trends.py).
+
+    ?interval=week|month (default week)
+    ?dateFrom=YYYY-MM-DD&dateTo=YYYY-MM-DD (default the last 52 weeks / 12 months)
+    ?window=N periods in the rolling average (default 4 weeks / 3 months, at most a year)
+    ?churchId=<id> to narrow to one church
+    """
+    permission_classes = [IsAuthenticated]
+    name = 'attendance-trends'
+
+    def get(self, request):
+        interval = request.query_params.get('interval', 'week')
+        if interval not in trends.INTERVALS:
+            raise ValidationError({"interval": f"interval must be one of {', '.join(trends.INTERVALS)}"})
+        _, lag, default_window, span = trends.INTERVALS[interval]
+        church_id = church_param(request)
+
+        dates = {}
+        for param in ('dateFrom', 'dateTo'):
+            value = request.query_params.get(param)
+            try:
+                dates[param] = parse_date(value) if value else None
+            except ValueError:
+                dates[param] = None
+            if value and dates[param] is None:
+                raise ValidationError({param: "Enter a date in YYYY-MM-DD format."})
+        end = dates['dateTo'] or timezone.localdate()
+        start = dates['dateFrom'] or trends.shift(trends.period_start(end, interval), interval, span - 1)
+        if start > end:
+            raise ValidationError({"dateFrom": "dateFrom must not be after dateTo."})
+        if len(trends.period_starts(start, end, interval)) > trends.MAX_PERIODS[interval]:
+            raise ValidationError({"dateFrom": f"A range covers at most {trends.MAX_PERIODS[interval]} {interval}s."})
+
+        window = request.query_params.get('window', str(default_window))
+        if not window.isdigit() or not 1 <= int(window) <= lag:
+            raise ValidationError({"window": f"window must be a number from 1 to {lag}"})
+
+        return Response(trends.cached_trends(church_id, start, end, interval, int(window)), status=200)
+
+
+class ArrivalHeatmaps(APIView):
+    """
+    When people check in relative to the start of their service, for staffing
+    kiosks and doors: per service, check-ins binned by minutes from eventTime
+    over the check-in window, one row per recent week (analytics/arrivals.py).
+
+    ?bucket=1|5 minutes per bucket (default 5)
+    ?weeks=N recent weeks (default 8, at most 52)
+    ?servicesId=<id> for one service, ?churchId=<id> for one church's services
+    """
+    permission_classes = [IsAuthenticated]
+    name = 'arrival-heatmaps'
+
+    def get(self, request):
+        bucket = request.query_params.get('bucket', '5')
+        if not bucket.isdigit() or int(bucket) not in arrivals.BUCKET_MINUTES:
+            raise ValidationError({"bucket": f"bucket must be one of {', '.join(map(str, arrivals.BUCKET_MINUTES))}"})
+        weeks = request.query_params.get('weeks', str(arrivals.DEFAULT_WEEKS))
+        if not weeks.isdigit() or not 1 <= int(weeks) <= arrivals.MAX_WEEKS:
+            raise ValidationError({"weeks": f"weeks must be a number from 1 to {arrivals.MAX_WEEKS}"})
+        services_id = request.query_params.get('servicesId')
+        if services_id is not None and not services_id.isdigit():
+            raise ValidationError({"servicesId": "servicesId must be a number"})
+
+        heatmaps = arrivals.cached_heatmaps(church_param(request), int(services_id) if services_id else None,
+                                            int(weeks), int(bucket))
+        return Response(heatmaps, status=200)
+
+
+class RetentionCohorts(APIView):
+    """
+    Member retention by entrance month (analytics/cohorts.py): for each cohort
+    the share of its persons still checking in 3, 6 and 12 months after
+    entering, and the weekly curve of the share active k weeks in.
+
+    ?cohortFrom=YYYY-MM&cohortTo=YYYY-MM (default the last 12 months, at most 60 cohorts)
+    ?churchId=<id> to narrow to one church
+    """
+    permission_classes = [IsAuthenticated]
+    name = 'retention-cohorts'
+
+    def get(self, request):
+        months = {}
+        for param in ('cohortFrom', 'cohortTo'):
+            value = request.query_params.get(param)
+            try:
+                months[param] = parse_date(f'{value}-01') if value else None
+            except ValueError:
+                months[param] = None
+            if value and months[param] is None:
+                raise ValidationError({param: "Enter a month in YYYY-MM format."})
+        last = months['cohortTo'] or timezone.localdate().replace(day=1)
+        first = months['cohortFrom'] or trends.shift(last, 'month', 11)
+        if first > last:
+            raise ValidationError({"cohortFrom": "cohortFrom must not be after cohortTo."})
+        if len(cohorts.cohort_months(first, last)) > cohorts.MAX_COHORTS:
+            raise ValidationError({"cohortFrom": f"At most {cohorts.MAX_COHORTS} cohorts at a time."})
+
+        results = cohorts.retention_cohorts(first, last, church_param(request))
+        return Response({"milestones": [f'{months_on}m' for months_on in cohorts.MILESTONES],
+                         "curve_weeks": cohorts.CURVE_WEEKS,
+                         "cohorts": results}, status=200)
+
+
+class AttendanceStats(generics.ListAPIView):
+    """
+    Attendance rate over the last days, current and longest streak and last
+    check-in of a church's persons, page by page, read from the per-person
+    attendance bitmaps (attendance/bitmaps.py). Rates and streaks count the
+    occurrences before the church's today.
+
+    ?churchId=<id> (required, streaks run over that church's services)
+    ?servicesId=<id> to count only one of its services
+    ?days=N window of the attendance rate (default 91, a quarter, up to 730)
+    ?personId=1,2,3 to narrow to some persons
+    """
+    serializer_class = AttendanceStatsSerializer
+    permission_classes = [IsAuthenticated, IsAdminUser]
+    pagination_class = PersonPagination
+    name = 'attendance-stats'
+    MAX_DAYS = 730
+
+    def get_queryset(self):
+        church_id = church_param(self.request)
+        if church_id is None:
+            raise ValidationError({"churchId": "churchId is required"})
+        persons = Person.objects.filter(churchId=church_id)
+        person_ids = self.request.query_params.get('personId')
+        if person_ids:
+            person_ids = person_ids.split(',')
+            if not all(person_id.isdigit() for person_id in person_ids):
+                raise ValidationError({"personId": "personId must be a comma separated list of numbers"})
+            persons = persons.filter(id__in=person_ids)
+        return persons
+
+    def list(self, request, *args, **kwargs):
+        church_id = church_param(request)
+        days = request.query_params.get('days', '91')
+        if not days.isdigit() or not 1 <= int(days) <= self.MAX_DAYS:
+            raise ValidationError({"days": f"days must be a number from 1 to {self.MAX_DAYS}"})
+        services_id = request.query_params.get('servicesId')
+        if services_id is not None:
+            if not services_id.isdigit() or not Services.objects.filter(id=services_id, churchId=church_id).exists():
+                raise ValidationError({"servicesId": "servicesId must be a service of the church"})
+            services_id = int(services_id)
+
+        page = self.paginate_queryset(self.get_queryset())
+        scheduled, stats = bitmaps.attendance_stats(church_id, [person.id for person in page], int(days), services_id)
+        serializer = self.get_serializer(page, many=True,
+                                         context={**self.get_serializer_context(),
+                                                  'stats': {row['personId']: row for row in stats}})
+        response = self.get_paginated_response(serializer.data)
+        response.data['scheduled'] = scheduled
+        return response
+
 
 class FollowupAnalytics(APIView):
+    """
+    Absentees, today's birthday celebrants and visitors. The absentee and
+    visitor lists are summed up as their count and first page, next links
+    to the following pages of followup-absentees/ and followup-visitors/.
+    """
     permission_classes = [IsAuthenticated, IsAdminUser]
     name = 'Followup Analytics'
-    visitor_synonyms = [
-        "guest", "caller", "company", "visitant", "houseguest", "drop-in", "invitee",
-        "friend", "companion", "plus-one", "hanger-on", "tourist", "traveler", "sightseer", 
-        "holidaymaker", "vacationer", "voyager", "tripper", "day-tripper", "globetrotter", 
-        "backpacker", "explorer", "out-of-towner", "wanderer", "wayfarer", "pilgrim", "stranger",
-        "outsider", "newcomer", "alien", "foreigner", "offcomer", "incomer", "interloper", "arrival",
-        "newbie", "greenhorn", "blow-in", "new kid on the block", "attendee", "participant",
-        "spectator", "audience", "listener", "patron", "customer", "client", "new user", "prospect",
-          "crasher", "gatecrasher", "walk-in", "punter", "rubberneck", "drifter",
-            "bum",'visitor','visitors', 'new member','new believer', 'new visitor','fresher'
-    ]
+    # payload list -> the view serving it page by page
+    paged_lists = {'absentees': 'followup-absentees', 'visitors': 'followup-visitors'}
+
     def get(self, request):
-        try:
-            self.visitor_synonyms.sort(key=str.lower) #sort the list for binary search
-            person = Person.objects.values()
-            #attendance less than or equal to a month ago
-            one_month_ago = timezone.now() - timedelta(days=30)
-            #deduplicate and sort attendance by personId_id for binary search
-            attendance = sorted(set(Attendance.objects.filter(checkInTimestamp__gte=one_month_ago).values_list('personId_id', flat=True))) 
-            #All visitors using binary search for efficiency
-            visitors = []
-            for p in person:
-                if not p["membershipId_id"]:
-                     continue
-                target = Membership.objects.get(id=p['membershipId_id']).status.lower()
-                index = bisect.bisect_left(self.visitor_synonyms, target) #binary search for the target
-                if index < len(self.visitor_synonyms) and self.visitor_synonyms[index] == target:
-                    visitors.append({'id':p['id'],
-                                         'firstName':p['firstName'],
-                                         'lastName':p['lastName'],
-                                         'email':p['email'],
-                                         'phone':p['phone'],
-                                         'entranceDate':p['entranceDate']
-                                         })
-
-            #today's birthday celebrant
-            df = pd.DataFrame.from_records(person)
-            df['dob'] = pd.to_datetime(df['dob'])
-            #cleanup
-            df['householdId_id'].fillna('None',inplace=True)
-            df['membershipId_id'].fillna('None',inplace=True)
-            df['churchId_id'].fillna('None',inplace=True)
-            today = timezone.now().date()
-            today_birthdays = df[
-               (df['dob'].dt.month == (today.month)) & 
-               (df['dob'].dt.day == (today.day))
-            ]
-            if today_birthdays.empty:
-                today_birthdays= []
-            else:
-               today_birthdays = today_birthdays[['id','firstName','lastName','email','phone','dob']].to_dict(orient='records')
-            
-            # church absentees for the past one month using binary search for efficiency
-            absentees = []
-            if(attendance):
-                for p in person:
-                    target = int(p['id'])
-                    index = bisect.bisect_left(attendance, target) #binary search for the target
-                    if index < len(attendance) and attendance[index] == target:
-                       #person is present in the attendance list so ignore
-                       continue
-                    else:
-                       #person is not present in the list, so absent for the past one month
-                       absentees.append({'id':p['id'],
-                                         'firstName':p['firstName'],
-                                         'lastName':p['lastName'],
-                                         'email':p['email'],
-                                         'phone':p['phone']
-                                         })
-                        
-            return Response({"absentees":absentees,
-                             'today_birthday_celebrants':today_birthdays,
-                             'visitors':visitors}, 
-                             status=200)        
-
-        except Exception as e:
-            return Response({"message":"Please ensure your database tables are filled before your analysis"}, status=404)
\ No newline at end of file
+        church_id = church_param(request)
+        payload = AnalyticsSnapshot.get('followup', church_id=church_id)
+        # the cached payload is shared, links are added to copies
+        payload = {**payload}
+        for key, view_name in self.paged_lists.items():
+            summary = payload[key]
+            next_page = None
+            if summary['count'] > len(summary['results']):
+                params = {'page': 2, **({'churchId': church_id} if church_id is not None else {})}
+                next_page = f"{reverse(view_name, request=request)}?{urlencode(params)}"
+            payload[key] = {**summary, 'next': next_page}
+        return Response(payload, status=200)
+
+    @classmethod
+    def build(cls, church_id, today):
+        """Absentees, today's birthdays and visitors of one church (every church for None)"""
+        # visitors join against the visitor membership ids, absentees are an anti-join on attendance
+        visitors = cls.first_page(followup.visitors(church_id),
+                                  ('id','firstName','lastName','email','phone','entranceDate'))
+
+        #today's birthday celebrants, an index range on Person.birthMonthDay
+        today_birthdays = list(followup.celebrants(church_id, today).values('id','firstName','lastName','email','phone','dob'))
+
+        # church absentees for the past one month
+        absentees = cls.first_page(followup.absentees(church_id), ('id','firstName','lastName','email','phone'))
+
+        return {"absentees":absentees,
+                'today_birthday_celebrants':today_birthdays,
+                'visitors':visitors}
+
+    @staticmethod
+    def first_page(queryset, fields):
+        """{count, results} with the rows of the paged view's first page, two queries whatever the list's length"""
+        pagination = PersonPagination()
+        queryset = queryset.order_by(*pagination.get_legacy_ordering(queryset))
+        return {'count': queryset.count(), 'results': list(queryset.values(*fields)[:pagination.page_size])}
+
+
+class FollowupAbsentees(generics.ListAPIView):
+    """Persons with no check-in in the last 30 days, page by page. ?churchId=<id> for one church"""
+    serializer_class = FollowupPersonSerializer
+    permission_classes = [IsAuthenticated, IsAdminUser]
+    pagination_class = PersonPagination
+    name = 'followup-absentees'
+
+    def get_queryset(self):
+        return followup.absentees(church_param(self.request))
+
+
+class FollowupVisitors(generics.ListAPIView):
+    """Persons whose membership status is a visitor synonym, page by page. ?churchId=<id> for one church"""
+    serializer_class = FollowupPersonSerializer
+    permission_classes = [IsAuthenticated, IsAdminUser]
+    pagination_class = PersonPagination
+    name = 'followup-visitors'
+
+    def get_queryset(self):
+        return followup.visitors(church_param(self.request))
+
+
+class BirthdayCelebrants(generics.ListAPIView):
+    """
+    Persons with a birthday today or in the next days, soonest first, for
+    birthday widgets and greeting jobs. ?days=N (default 1, today only, up to
+    366) and ?churchId=<id>. Windows running over the new year wrap around.
+    """
+    serializer_class = CelebrantSerializer
+    permission_classes = [IsAuthenticated, IsAdminUser]
+    name = 'birthday-celebrants'
+
+    def get_queryset(self):
+        days = self.request.query_params.get('days', '1')
+        if not days.isdigit() or not 1 <= int(days) <= followup.MAX_BIRTHDAY_DAYS:
+            raise ValidationError({"days": f"days must be a number from 1 to {followup.MAX_BIRTHDAY_DAYS}"})
+        return followup.celebrants(church_param(self.request), days=int(days))
@@ -116,14 +116,54 @@ WSGI_APPLICATION = 'apis.wsgi.application'
 
 
 # Face Recognition Cache
+# per process by default, CACHE_BACKEND/CACHE_LOCATION point every worker at a shared one
+# (e.g. django.core.cache.backends.db.DatabaseCache after `manage.py createcachetable`)
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'unique-snowflake',
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'unique-snowflake'),
         'TIMEOUT': 3600,
     }
 }
 
+# Seconds a worker keeps its copy of a reference table (apis/refcache.py) before reading it again
+REFCACHE_MAX_AGE = int(os.environ.get('REFCACHE_MAX_AGE', '30'))
+
+# Check-in window around a service's eventTime used by the schedule index (minutes)
+SERVICE_CHECKIN_OPENS_BEFORE = int(os.environ.get('SERVICE_CHECKIN_OPENS_BEFORE', '60'))
+SERVICE_CHECKIN_CLOSES_AFTER = int(os.environ.get('SERVICE_CHECKIN_CLOSES_AFTER', '180'))
+
+# Attendance older than this many days is moved to AttendanceArchive by `manage.py archive_attendance`
+ATTENDANCE_ARCHIVE_HORIZON_DAYS = int(os.environ.get('ATTENDANCE_ARCHIVE_HORIZON_DAYS', '730'))
+
+# Live attendance stream: seconds between keep-alive comments and between full snapshots
+LIVE_ATTENDANCE_HEARTBEAT = int(os.environ.get('LIVE_ATTENDANCE_HEARTBEAT', '15'))
+LIVE_ATTENDANCE_RESYNC = int(os.environ.get('LIVE_ATTENDANCE_RESYNC', '60'))
+
+# Background report exports: worker threads per process and how long (seconds) an identical request reuses a built file
+REPORT_JOB_WORKERS = int(os.environ.get('REPORT_JOB_WORKERS', '2'))
+REPORT_JOB_TTL = int(os.environ.get('REPORT_JOB_TTL', '600'))
+# Running jobs with no heartbeat for this many seconds died with their worker (restart, crash) and are failed
+REPORT_JOB_STALE_AFTER = int(os.environ.get('REPORT_JOB_STALE_AFTER', '300'))
+
+# Delta exports leave rows changed in the last this many seconds for the next export (uncommitted transactions)
+EXPORT_WATERMARK_LAG = int(os.environ.get('EXPORT_WATERMARK_LAG', '30'))
+
+# Cached analytics dashboards (analytics/snapshots.py): seconds a payload is served before it is rebuilt in the
+# background, and the least seconds between two rebuilds of a payload for changes to its data
+ANALYTICS_SNAPSHOT_MAX_AGE = int(os.environ.get('ANALYTICS_SNAPSHOT_MAX_AGE', '300'))
+ANALYTICS_SNAPSHOT_DEBOUNCE = int(os.environ.get('ANALYTICS_SNAPSHOT_DEBOUNCE', '30'))
+# Attendance trends ranges reaching today are cached this many seconds
+ANALYTICS_TRENDS_TIMEOUT = int(os.environ.get('ANALYTICS_TRENDS_TIMEOUT', '600'))
+# Retention cohorts still gaining members or check-ins are cached this many seconds
+ANALYTICS_COHORT_TIMEOUT = int(os.environ.get('ANALYTICS_COHORT_TIMEOUT', '3600'))
+# Check-in arrival heatmaps are cached this many seconds
+ANALYTICS_ARRIVALS_TIMEOUT = int(os.environ.get('ANALYTICS_ARRIVALS_TIMEOUT', '900'))
+
+# Load the face recognition model in the background at boot instead of on the first face check-in:
+# 'auto' in web workers (gunicorn, runserver...) but not in management commands, '1' always, '0' never
+FACE_MODEL_PRELOAD = os.environ.get('FACE_MODEL_PRELOAD', 'auto')
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -213,6 +253,9 @@ SPECTACULAR_SETTINGS = {
 }
 
 
+# Largest ?page_size a client may ask for on paginated lists (apis/pagination.py)
+MAX_LIST_PAGE_SIZE = int(os.environ.get('MAX_LIST_PAGE_SIZE', '100'))
+
 REST_FRAMEWORK = {
 'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
 'DEFAULT_PAGINATION_CLASS':'rest_framework.pagination.PageNumberPagination',
@@ -0,0 +1,81 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor (keyset) pagination for the large, ever-growing tables.
+
+    Pages are fetched with WHERE <key> < <last seen> ORDER BY <key> LIMIT n
+    on an indexed column, so page 500 costs the same as page 1 and no
+    COUNT(*) is run. Responses carry next/previous links instead of a count.
+
+    Clients opt in by sending ?cursor= (empty for the first page) and then
+    follow the next/previous links. Every other request, and every union
+    queryset, gets the numbered pages with a count as before, ordered by the
+    queryset's own ordering or else the paginator's, with the pk appended.
+
+    ?page_size=n picks the page size (up to MAX_LIST_PAGE_SIZE).
+    ?ordering=<field> from the view's OrderingFilter is honoured for plain
+    fields; the pk is always appended as tie-breaker. DRF seeks on the first
+    ordering field only and skips rows within equal values, so the key
+    should be unique or nearly so.
+    """
+    page_size = settings.REST_FRAMEWORK['PAGE_SIZE']
+    page_size_query_param = 'page_size'
+    max_page_size = settings.MAX_LIST_PAGE_SIZE
+
+    def paginate_queryset(self, queryset, request, view=None):
+        # keyset filters cannot be applied to a union (live + archived attendance)
+        if self.cursor_query_param not in request.query_params or queryset.query.combinator:
+            if not queryset.query.combinator:
+                queryset = queryset.order_by(*self.get_legacy_ordering(queryset))
+            self.legacy = LegacyPageNumberPagination()
+            return self.legacy.paginate_queryset(queryset, request, view)
+        self.legacy = None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.legacy is not None:
+            return self.legacy.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_legacy_ordering(self, queryset):
+        """The ?ordering / model ordering of the queryset, else the paginator's, ending with the pk"""
+        ordering = list(queryset.query.order_by or queryset.model._meta.ordering or self.ordering)
+        if ordering[-1].lstrip('-') not in ('pk', 'id'):
+            ordering.append('-pk' if ordering[0].startswith('-') else 'pk')
+        return ordering
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        # related lookups cannot be read back off the row to build the cursor
+        if any('__' in field for field in ordering):
+            ordering = tuple(self.ordering)
+        tie_breaker = '-pk' if ordering[0].startswith('-') else 'pk'
+        if ordering[-1].lstrip('-') not in ('pk', 'id'):
+            ordering = (*ordering, tie_breaker)
+        return ordering
+
+
+class LegacyPageNumberPagination(PageNumberPagination):
+    page_size_query_param = 'page_size'
+    max_page_size = settings.MAX_LIST_PAGE_SIZE
+
+
+class AttendancePagination(KeysetPagination):
+    ordering = ('-checkInTimestamp', '-id')
+
+
+class PersonPagination(KeysetPagination):
+    # keyed on the pk, a name key would skip through everyone sharing a first name;
+    # numbered pages keep the alphabetical Person ordering
+    ordering = ('id',)
+
+
+class MessagePagination(KeysetPagination):
+    ordering = ('-date', '-id')
+
+
+class LogEntryPagination(KeysetPagination):
+    ordering = ('-timestamp', '-id')
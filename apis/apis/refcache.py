@@ -0,0 +1,111 @@
+import threading
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+
+
+class ReferenceCache:
+    """
+    Read-through, process-local cache for small reference tables
+    (CaptureMethod, Membership, Role, Church, Ministries, Services).
+
+    Rows are kept in a plain dict per model, so a warm lookup costs no query.
+    Saving or deleting a registered model clears the local copy through
+    post_save/post_delete and bumps a version stamp in the Django cache;
+    other workers compare that stamp at most every VERSION_CHECK_INTERVAL
+    seconds and drop their copy when it moved. The stamp is only shared
+    between processes when CACHES points at a shared backend (CACHE_BACKEND),
+    so every copy is also dropped REFCACHE_MAX_AGE seconds after it was
+    loaded: with the default per-process cache an edit reaches the other
+    workers within that time.
+
+    Returned instances are shared between requests, treat them as read-only.
+    """
+
+    VERSION_KEY = 'refcache:version:{label}'
+    VERSION_CHECK_INTERVAL = 5  # seconds
+    ALL = ('__all__',)
+
+    _models = {}
+    _entries = {}
+    _lock = threading.Lock()
+
+    @classmethod
+    def register(cls, model):
+        label = model._meta.label_lower
+        cls._models[label] = model
+        post_save.connect(cls._on_change, sender=model, dispatch_uid=f'refcache-save-{label}')
+        post_delete.connect(cls._on_change, sender=model, dispatch_uid=f'refcache-delete-{label}')
+        return model
+
+    @classmethod
+    def get(cls, model, **lookup):
+        """Same contract as model.objects.get(**lookup), DoesNotExist included"""
+        rows = cls._rows(model)
+        key = tuple(sorted(lookup.items()))
+        try:
+            return rows[key]
+        except KeyError:
+            pass
+        obj = model.objects.get(**lookup)
+        rows[key] = obj
+        return obj
+
+    @classmethod
+    def all(cls, model):
+        """Every row of the model as a list"""
+        rows = cls._rows(model)
+        try:
+            return rows[cls.ALL]
+        except KeyError:
+            pass
+        objs = list(model.objects.all())
+        rows[cls.ALL] = objs
+        return objs
+
+    @classmethod
+    def mapping(cls, model, field='pk'):
+        """{obj.field: obj} over every row, e.g. mapping(Membership) -> {id: membership}"""
+        return {getattr(obj, field): obj for obj in cls.all(model)}
+
+    @classmethod
+    def invalidate(cls, model):
+        label = model._meta.label_lower
+        cls._entries.pop(label, None)
+        key = cls.VERSION_KEY.format(label=label)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
+
+    @classmethod
+    def clear(cls):
+        for model in list(cls._models.values()):
+            cls.invalidate(model)
+
+    @classmethod
+    def _on_change(cls, sender, **kwargs):
+        cls.invalidate(sender)
+        # a read between now and commit may cache the old row, drop it again once committed
+        transaction.on_commit(lambda: cls.invalidate(sender))
+
+    @classmethod
+    def _rows(cls, model):
+        label = model._meta.label_lower
+        now = time.monotonic()
+        entry = cls._entries.get(label)
+        if (entry is not None and now - entry['checked'] < cls.VERSION_CHECK_INTERVAL
+                and now - entry['loaded'] < settings.REFCACHE_MAX_AGE):
+            return entry['rows']
+
+        with cls._lock:
+            version = cache.get(cls.VERSION_KEY.format(label=label), 0)
+            entry = cls._entries.get(label)
+            if (entry is None or entry['version'] != version
+                    or now - entry['loaded'] >= settings.REFCACHE_MAX_AGE):
+                entry = {'version': version, 'rows': {}, 'loaded': now}
+            entry['checked'] = now
+            cls._entries[label] = entry
+        return entry['rows']
@@ -0,0 +1,45 @@
+import json
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+
+class EventStreamRenderer(BaseRenderer):
+    """
+    Lets views answer Accept: text/event-stream. The view streams the events
+    itself, this only renders error responses (auth, validation) as a
+    single event.
+    """
+    media_type = 'text/event-stream'
+    format = 'event-stream'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return f"event: error\ndata: {json.dumps(data, cls=JSONEncoder)}\n\n".encode(self.charset)
+
+
+class StreamedExportRenderer(BaseRenderer):
+    """
+    Base of the export formats picked with ?format=. Report views stream the
+    rows themselves, the renderer only selects the format and renders
+    error responses as JSON text.
+    """
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data, cls=JSONEncoder).encode('utf-8')
+
+
+class XLSXRenderer(StreamedExportRenderer):
+    media_type = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    format = 'xlsx'
+    charset = None
+
+
+class CSVRenderer(StreamedExportRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class NDJSONRenderer(StreamedExportRenderer):
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
@@ -0,0 +1,79 @@
+"""Fixtures shared by the apps' tests.py"""
+import datetime
+import tempfile
+from unittest import mock
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+from apis.refcache import ReferenceCache
+from capturemethod.models import CaptureMethod
+from church.models import Church
+from membership.models import Membership
+from person.models import Person
+from role.models import Role
+from services.models import Services
+from services.schedule import EVENT_DAYS
+from user.models import User
+
+
+class ApiTestCase(TestCase):
+    """
+    TestCase with a church, a service held every week on today's weekday,
+    the capture methods and an admin user. Caches are emptied before every
+    test and background tasks run inline.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.church = Church.objects.create(name='Grace', address='1 Main St', description='d')
+        cls.member = Membership.objects.create(status='member', description='m')
+        cls.form = CaptureMethod.objects.create(method=CaptureMethod.METHOD_FORM,
+                                                description=CaptureMethod.METHOD_DESCRIPTION_FORM)
+        cls.face = CaptureMethod.objects.create(method=CaptureMethod.METHOD_FACE,
+                                                description=CaptureMethod.METHOD_DESCRIPTION_FACE)
+        cls.service = cls.create_service(cls.church)
+        cls.role = Role.objects.create(name='admin', description='a', permissions='all')
+        cls.user = User.objects.create(username='admin', email='admin@example.com', roleId=cls.role,
+                                       personId=cls.create_person(cls.church, 'Admin', 'User'),
+                                       is_staff=True)
+        cls.user.groups.add(Group.objects.create(name='admin'))
+
+    def setUp(self):
+        cache.clear()
+        ReferenceCache.clear()
+        patcher = mock.patch('user.apps.executor', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @classmethod
+    def create_service(cls, church, **fields):
+        fields = {'eventName': 'Sunday Service', 'eventTime': datetime.time(9), 'location': 'Hall',
+                  'isReoccuring': True, 'eventDay': EVENT_DAYS[timezone.localdate().weekday()], **fields}
+        return Services.objects.create(churchId=church, **fields)
+
+    @classmethod
+    def create_person(cls, church, firstName, lastName, **fields):
+        fields = {'middleName': 'M', 'dob': datetime.date(1990, 1, 1), 'phone': '0800000000',
+                  'email': f'{firstName}.{lastName}@example.com'.lower(), 'entranceDate': timezone.now(),
+                  'membershipId': getattr(cls, 'member', None), **fields}
+        return Person.objects.create(churchId=church, firstName=firstName, lastName=lastName, **fields)
+
+    def use_temporary_media(self):
+        """Files stored by the test go to a folder removed after it"""
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        media_root = override_settings(MEDIA_ROOT=media.name)
+        media_root.enable()
+        self.addCleanup(media_root.disable)
+        return media.name
+
+    def call(self, view, method='get', data=None, user=None, path='/', **kwargs):
+        factory = APIRequestFactory()
+        if method == 'get':
+            request = factory.get(path, data)
+        else:
+            request = getattr(factory, method)(path, data, format='json')
+        force_authenticate(request, user=user or self.user)
+        return view.as_view()(request, **kwargs)
@@ -0,0 +1,29 @@
+from django.test import override_settings
+from apis.refcache import ReferenceCache
+from membership.models import Membership
+from .testing import ApiTestCase
+
+
+class ReferenceCacheTests(ApiTestCase):
+
+    def test_lookups_are_cached(self):
+        ReferenceCache.get(Membership, id=self.member.id)
+        with self.assertNumQueries(0):
+            self.assertEqual(ReferenceCache.get(Membership, id=self.member.id).status, 'member')
+
+    def test_save_drops_the_copy(self):
+        ReferenceCache.all(Membership)
+        Membership.objects.create(status='visitor', description='v')
+        self.assertEqual(sorted(m.status for m in ReferenceCache.all(Membership)), ['member', 'visitor'])
+
+    def test_missing_row_raises(self):
+        with self.assertRaises(Membership.DoesNotExist):
+            ReferenceCache.get(Membership, id=99999)
+
+    def test_copy_expires(self):
+        # an edit in another worker only reaches this one through the max age
+        ReferenceCache.get(Membership, id=self.member.id)
+        Membership.objects.filter(id=self.member.id).update(status='elder')
+        self.assertEqual(ReferenceCache.get(Membership, id=self.member.id).status, 'member')
+        with override_settings(REFCACHE_MAX_AGE=0):
+            self.assertEqual(ReferenceCache.get(Membership, id=self.member.id).status, 'elder')
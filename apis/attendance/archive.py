@@ -0,0 +1,117 @@
+from datetime import timedelta
+from auditlog.context import disable_auditlog
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from rest_framework.exceptions import ValidationError
+from .models import Attendance, AttendanceArchive
+from .signals import rollups_suspended
+
+ARCHIVED_THROUGH_KEY = 'attendance:archived-through'
+ARCHIVED_THROUGH_TIMEOUT = 300  # seconds
+# Attendance and AttendanceArchive share these columns in this order
+COLUMNS = ('id', 'personId_id', 'servicesId_id', 'captureMethodId_id', 'checkInTimestamp',
+           'attendanceDate', 'checkOutTimestamp', 'comment', 'lastModified')
+
+
+def archive_cutoff(horizon_days=None):
+    """Rows with an attendanceDate before this date belong in the archive"""
+    if horizon_days is None:
+        horizon_days = settings.ATTENDANCE_ARCHIVE_HORIZON_DAYS
+    return timezone.localdate() - timedelta(days=horizon_days)
+
+
+def archived_through():
+    """Latest attendanceDate held in the archive, None when nothing was archived yet"""
+    latest = cache.get(ARCHIVED_THROUGH_KEY)
+    if latest is None:
+        latest = AttendanceArchive.objects.aggregate(latest=Max('attendanceDate'))['latest'] or False
+        cache.set(ARCHIVED_THROUGH_KEY, latest, ARCHIVED_THROUGH_TIMEOUT)
+    return latest or None
+
+
+def archive_batch(cutoff, batch_size=1000):
+    """
+    Move up to batch_size rows older than cutoff into the archive,
+    returns how many were moved. The copy and the delete commit together.
+    """
+    with transaction.atomic():
+        rows = list(Attendance.objects.filter(attendanceDate__lt=cutoff).order_by('attendanceDate', 'id')
+                    .select_for_update().values(*COLUMNS)[:batch_size])
+        if not rows:
+            return 0
+        AttendanceArchive.objects.bulk_create([AttendanceArchive(**row) for row in rows],
+                                              ignore_conflicts=True)
+        with disable_auditlog(), rollups_suspended():
+            Attendance.objects.filter(id__in=[row['id'] for row in rows]).delete()
+    cache.delete(ARCHIVED_THROUGH_KEY)
+    return len(rows)
+
+
+class ArchiveRangeMixin:
+    """
+    List views over Attendance that read the archive too when the requested
+    ?dateFrom=YYYY-MM-DD / ?dateTo=YYYY-MM-DD range reaches archived days.
+    Without a range only the live table is read. Ranges that reach the
+    archive are answered from a UNION of both tables, filtered per table
+    by the view's filter backends and ordered like the live-only pages,
+    ending with the id so rows never swap between pages.
+    """
+
+    def get_date_range(self):
+        date_range = []
+        for param in ('dateFrom', 'dateTo'):
+            value = self.request.query_params.get(param)
+            day = parse_date(value) if value else None
+            if value and day is None:
+                raise ValidationError({param: "Enter a date in YYYY-MM-DD format."})
+            date_range.append(day)
+        return date_range
+
+    def reads_archive(self, date_from, date_to):
+        if date_from is None and date_to is None:
+            return False
+        latest = archived_through()
+        return latest is not None and (date_from is None or date_from <= latest)
+
+    def get_queryset(self):
+        date_from, date_to = self.get_date_range()
+        queryset = super().get_queryset()
+        if date_from is not None:
+            queryset = queryset.filter(attendanceDate__gte=date_from)
+        if date_to is not None:
+            queryset = queryset.filter(attendanceDate__lte=date_to)
+        return queryset
+
+    def filter_queryset(self, queryset):
+        date_from, date_to = self.get_date_range()
+        if not self.reads_archive(date_from, date_to):
+            return super().filter_queryset(queryset)
+
+        archived = AttendanceArchive.objects.all()
+        if date_from is not None:
+            archived = archived.filter(attendanceDate__gte=date_from)
+        if date_to is not None:
+            archived = archived.filter(attendanceDate__lte=date_to)
+        live = super().filter_queryset(queryset).order_by()
+        archived = super().filter_queryset(archived).order_by()
+
+        ordering = self.get_union_ordering(queryset)
+        return live.union(archived, all=True).order_by(*ordering)
+
+    def get_union_ordering(self, queryset):
+        ordering = None
+        for backend in self.filter_backends:
+            if hasattr(backend, 'get_ordering'):
+                ordering = backend().get_ordering(self.request, queryset, self)
+        # no ?ordering: the view's, else its paginator's key, the same order the live-only pages use
+        ordering = (ordering or getattr(self, 'ordering', None)
+                    or getattr(self.pagination_class, 'ordering', None) or ('-checkInTimestamp',))
+        # a union can only be ordered by its own columns, personId__id -> personId
+        ordering = [field[:-len('__id')] if field.endswith('__id') else field for field in ordering]
+        if not any(field.lstrip('-') == 'id' for field in ordering):
+            ordering.append('-id' if ordering[0].startswith('-') else 'id')
+        return ordering
@@ -0,0 +1,354 @@
+import logging
+import threading
+from collections import defaultdict
+from datetime import timedelta
+import numpy as np
+from django.db import close_old_connections, transaction
+from django.db.models import Min
+from django.utils import timezone
+from apis.refcache import ReferenceCache
+from church.models import Church
+from services.models import Services
+from services.schedule import church_date, occurs_on
+from .models import Attendance, AttendanceArchive, AttendanceBitmap, ServiceOccurrence
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 5000
+
+
+def church_services(church_id):
+    """The church's services in the order their occurrences are numbered on a day"""
+    services = [service for service in ReferenceCache.all(Services) if service.churchId_id == church_id]
+    return sorted(services, key=lambda service: (service.eventTime, service.id))
+
+
+def first_attendance(church_id):
+    """Earliest check-in day at the church's services, live or archived"""
+    days = [model.objects.filter(servicesId__churchId=church_id)
+            .aggregate(first=Min('attendanceDate'))['first']
+            for model in (Attendance, AttendanceArchive)]
+    days = [day for day in days if day is not None]
+    return min(days) if days else None
+
+
+def extend_calendar(church_id, through):
+    """
+    Number the occurrences of the church's services up to through, from the
+    last numbered day on (or the church's first check-in). Services added to
+    the last numbered day after it was numbered are appended to it.
+    """
+    with transaction.atomic():
+        # one writer per church, positions are handed out in sequence. Check-ins never wait
+        # here, their marks are written after commit by MarkQueue
+        if Church.objects.select_for_update().filter(pk=church_id).first() is None:
+            return
+        last = (ServiceOccurrence.objects.filter(churchId=church_id).order_by('-position')
+                .values('date', 'position').first())
+        if last is None:
+            day, position = first_attendance(church_id) or through, 0
+        else:
+            day, position = last['date'], last['position'] + 1
+        if day > through:
+            return
+        numbered = set(ServiceOccurrence.objects.filter(churchId=church_id, date=day)
+                       .values_list('servicesId_id', flat=True))
+        services = church_services(church_id)
+        occurrences = []
+        while day <= through:
+            for service in services:
+                if occurs_on(service, day) and service.id not in numbered:
+                    occurrences.append(ServiceOccurrence(churchId_id=church_id, servicesId_id=service.id,
+                                                         date=day, position=position))
+                    position += 1
+            numbered = set()
+            day += timedelta(days=1)
+        ServiceOccurrence.objects.bulk_create(occurrences, batch_size=1000)
+
+
+def _scheduled(buckets):
+    rows = (ServiceOccurrence.objects
+            .filter(servicesId__in={services_id for services_id, _ in buckets},
+                    date__in={day for _, day in buckets})
+            .values_list('servicesId_id', 'date', 'churchId_id', 'position'))
+    return {(services_id, day): (church_id, position) for services_id, day, church_id, position in rows
+            if (services_id, day) in buckets}
+
+
+def positions_of(buckets):
+    """{(servicesId, date): (churchId, position)} for the scheduled ones of buckets"""
+    buckets = set(buckets)
+    found = _scheduled(buckets)
+    missing = buckets - found.keys()
+    if missing:
+        # first check-in of the day, number the days since the last numbered one
+        through = {}
+        for services_id, day in missing:
+            try:
+                church_id = ReferenceCache.get(Services, id=services_id).churchId_id
+            except Services.DoesNotExist:
+                continue
+            through[church_id] = max(day, through.get(church_id, day))
+        for church_id, day in through.items():
+            extend_calendar(church_id, day)
+        found.update(_scheduled(missing))
+    return found
+
+
+def with_bits(bits, positions, value=True):
+    """bits with the given positions set (or cleared), grown as needed"""
+    positions = np.asarray(positions, dtype=np.int64)
+    current = np.frombuffer(bytes(bits), dtype=np.uint8)
+    array = np.zeros(max(len(current), int(positions.max()) // 8 + 1 if len(positions) else 0), dtype=np.uint8)
+    array[:len(current)] = current
+    masks = np.left_shift(1, positions % 8).astype(np.uint8)
+    if value:
+        np.bitwise_or.at(array, positions // 8, masks)
+    else:
+        np.bitwise_and.at(array, positions // 8, ~masks)
+    return array.tobytes()
+
+
+def set_bits(church_id, person_positions, value=True):
+    """Set (or clear) {personId: [positions]} in the church's bitmaps"""
+    if not person_positions:
+        return
+    with transaction.atomic():
+        if value:
+            AttendanceBitmap.objects.bulk_create(
+                [AttendanceBitmap(personId_id=person_id, churchId_id=church_id) for person_id in person_positions],
+                ignore_conflicts=True)
+        bitmaps = list(AttendanceBitmap.objects.select_for_update()
+                       .filter(churchId=church_id, personId__in=person_positions))
+        now = timezone.now()
+        for bitmap in bitmaps:
+            bitmap.bits = with_bits(bitmap.bits, person_positions[bitmap.personId_id], value)
+            bitmap.updated = now
+        AttendanceBitmap.objects.bulk_update(bitmaps, ['bits', 'updated'], batch_size=1000)
+
+
+def write_marks(marks, buckets=()):
+    """
+    Set or clear {(personId, servicesId, date): value} and set the bits of
+    every check-in of the whole service days buckets {(servicesId, date)}.
+    Unscheduled check-ins have no bit.
+    """
+    found = positions_of({(services_id, day) for _, services_id, day in marks} | set(buckets))
+    if not found:
+        return
+    changes = {value: defaultdict(lambda: defaultdict(list)) for value in (False, True)}
+    for (person_id, services_id, day), value in marks.items():
+        if (services_id, day) in found:
+            church_id, position = found[(services_id, day)]
+            changes[value][church_id][person_id].append(position)
+    buckets = {bucket for bucket in buckets if bucket in found}
+    if buckets:
+        rows = (Attendance.objects.filter(servicesId__in={services_id for services_id, _ in buckets},
+                                          attendanceDate__in={day for _, day in buckets})
+                .values_list('personId_id', 'servicesId_id', 'attendanceDate'))
+        for person_id, services_id, day in rows:
+            if (services_id, day) in buckets:
+                church_id, position = found[(services_id, day)]
+                changes[True][church_id][person_id].append(position)
+    for value in (False, True):
+        for church_id, person_positions in changes[value].items():
+            set_bits(church_id, person_positions, value)
+
+
+class MarkQueue:
+    """
+    Check-ins waiting to be recorded in the bitmaps. They are queued once
+    their transaction commits and written in batches on the background
+    executor, so a check-in never waits on the church's calendar or the
+    bitmap row locks. Marks of one person and service day collapse to the
+    last one, whole service days from bulk inserts are read back from
+    Attendance when the batch is written. Batches are written one at a time
+    and in order. A failed batch is logged, `manage.py
+    rebuild_attendance_bitmaps` repairs the bits it missed.
+    Calendars found behind by attendance_stats() are numbered with the next
+    batch, so reads never take the church's calendar lock.
+    """
+
+    def __init__(self):
+        self._marks = {}
+        self._buckets = set()
+        # {churchId: day} calendars to number up to day, and the days they were numbered to
+        self._calendars = {}
+        self._numbered = {}
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._flush_scheduled = False
+
+    def add(self, marks=None, buckets=()):
+        marks, buckets = dict(marks or {}), set(buckets)
+        transaction.on_commit(lambda: self._enqueue(marks, buckets))
+
+    def extend(self, church_id, through):
+        """Number the church's occurrences up to through with the next batch, once per day and worker"""
+        with self._lock:
+            numbered = self._numbered.get(church_id)
+            if numbered is not None and numbered >= through:
+                return
+            self._calendars[church_id] = max(through, self._calendars.get(church_id, through))
+        self._enqueue({}, set())
+
+    def _enqueue(self, marks, buckets):
+        with self._lock:
+            self._marks.update(marks)
+            self._buckets.update(buckets)
+            if self._flush_scheduled:
+                return
+            self._flush_scheduled = True
+
+        # executor is created in UserConfig.ready(), look it up at call time
+        from user.apps import executor
+        if executor is None:
+            self.flush()
+        else:
+            executor.submit(self._flush_in_worker)
+
+    def flush(self):
+        with self._write_lock:
+            with self._lock:
+                marks, self._marks = self._marks, {}
+                buckets, self._buckets = self._buckets, set()
+                calendars, self._calendars = self._calendars, {}
+                self._flush_scheduled = False
+            for church_id, through in calendars.items():
+                try:
+                    extend_calendar(church_id, through)
+                except Exception:
+                    logger.exception("Numbering the service occurrences of church %s failed", church_id)
+                else:
+                    with self._lock:
+                        self._numbered[church_id] = max(through, self._numbered.get(church_id, through))
+            if not marks and not buckets:
+                return 0
+            try:
+                write_marks(marks, buckets)
+            except Exception:
+                logger.exception("Writing %d attendance bitmap mark(s) failed", len(marks) + len(buckets))
+            return len(marks) + len(buckets)
+
+    def _flush_in_worker(self):
+        try:
+            self.flush()
+        finally:
+            close_old_connections()
+
+
+pending_marks = MarkQueue()
+
+
+def mark(person_id, services_id, day, value=True):
+    """Record (or withdraw) one check-in once the transaction commits"""
+    pending_marks.add(marks={(person_id, services_id, day): value})
+
+
+def mark_buckets(buckets):
+    """Set the bits of every check-in of whole service days {(servicesId, date)} once committed, after bulk inserts"""
+    pending_marks.add(buckets=buckets)
+
+
+def rebuild(church_id=None):
+    """
+    Renumber the occurrences from each church's first check-in to its today and
+    rewrite the bitmaps from Attendance and AttendanceArchive, returns the
+    number of bitmaps written.
+    """
+    churches = [church.id for church in ReferenceCache.all(Church)
+                if church_id is None or church.id == church_id]
+    written = 0
+    for church in churches:
+        with transaction.atomic():
+            ServiceOccurrence.objects.filter(churchId=church).delete()
+            AttendanceBitmap.objects.filter(churchId=church).delete()
+            extend_calendar(church, church_date(church))
+            positions = {(services_id, day): position for services_id, day, position in
+                         ServiceOccurrence.objects.filter(churchId=church)
+                         .values_list('servicesId_id', 'date', 'position')}
+            person_positions = defaultdict(list)
+            for model in (Attendance, AttendanceArchive):
+                rows = (model.objects.filter(servicesId__churchId=church)
+                        .values_list('personId_id', 'servicesId_id', 'attendanceDate')
+                        .iterator(chunk_size=CHUNK_SIZE))
+                for person_id, services_id, day in rows:
+                    position = positions.get((services_id, day))
+                    if position is not None:
+                        person_positions[person_id].append(position)
+            AttendanceBitmap.objects.bulk_create(
+                [AttendanceBitmap(personId_id=person_id, churchId_id=church, bits=with_bits(b'', found))
+                 for person_id, found in person_positions.items()], batch_size=1000)
+            written += len(person_positions)
+    return written
+
+
+def longest_runs(matrix):
+    """Longest run of set bits in each row of a boolean matrix"""
+    edges = np.diff(np.pad(matrix.astype(np.int8), ((0, 0), (1, 1))), axis=1)
+    # starts and ends come out row by row in order, so they pair up
+    rows, starts = np.nonzero(edges == 1)
+    _, ends = np.nonzero(edges == -1)
+    longest = np.zeros(matrix.shape[0], dtype=np.int64)
+    np.maximum.at(longest, rows, ends - starts)
+    return longest
+
+
+def trailing_runs(matrix):
+    """Run of set bits each row ends with"""
+    if not matrix.shape[1]:
+        # nothing held yet, argmax() has no empty rows
+        return np.zeros(matrix.shape[0], dtype=np.int64)
+    unset = ~matrix[:, ::-1]
+    return np.where(unset.any(axis=1), unset.argmax(axis=1), matrix.shape[1])
+
+
+def attendance_stats(church_id, person_ids, days, services_id=None, today=None):
+    """
+    Attendance rate over the last days, current and longest streak and last
+    check-in of each of person_ids at the church (or one of its services),
+    computed over the unpacked bitmaps in one pass. Rates and streaks count
+    occurrences before the church's today, its services may still be going on.
+    Only reads the calendar: days after the last numbered one (no check-in
+    since) are numbered by MarkQueue for the next reads.
+    Returns (occurrences scheduled in the window, [stats in person_ids order]).
+    """
+    today = today or church_date(church_id)
+    occurrences = list(ServiceOccurrence.objects.filter(churchId=church_id).order_by('position')
+                       .values_list('position', 'date', 'servicesId_id'))
+    if not occurrences or occurrences[-1][1] < today:
+        pending_marks.extend(church_id, today)
+    if services_id is not None:
+        occurrences = [occurrence for occurrence in occurrences if occurrence[2] == services_id]
+    positions = np.array([position for position, _, _ in occurrences], dtype=np.int64)
+    dates = np.array([day for _, day, _ in occurrences], dtype='datetime64[D]')
+    width = int(positions.max()) + 1 if len(positions) else 0
+
+    bitmaps = dict(AttendanceBitmap.objects.filter(churchId=church_id, personId__in=person_ids)
+                   .values_list('personId_id', 'bits'))
+    packed = np.zeros((len(person_ids), (width + 7) // 8), dtype=np.uint8)
+    for row, person_id in enumerate(person_ids):
+        bits = np.frombuffer(bytes(bitmaps.get(person_id, b'')), dtype=np.uint8)[:packed.shape[1]]
+        packed[row, :len(bits)] = bits
+    matrix = np.unpackbits(packed, axis=1, count=width, bitorder='little')[:, positions].astype(bool)
+
+    closed = dates < np.datetime64(today, 'D')
+    window = closed & (dates >= np.datetime64(today - timedelta(days=days), 'D'))
+    scheduled = int(window.sum())
+    attended = matrix[:, window].sum(axis=1)
+    history = matrix[:, closed]
+    current, longest = trailing_runs(history), longest_runs(history)
+    seen = matrix.any(axis=1)
+    last = len(dates) - 1 - matrix[:, ::-1].argmax(axis=1) if len(dates) else np.zeros(len(person_ids), dtype=np.int64)
+
+    stats = []
+    for row, person_id in enumerate(person_ids):
+        stats.append({
+            "personId": person_id,
+            "attended": int(attended[row]),
+            "rate": round(float(attended[row]) / scheduled, 4) if scheduled else None,
+            "currentStreak": int(current[row]),
+            "longestStreak": int(longest[row]),
+            "lastSeen": dates[last[row]].item() if seen[row] else None,
+        })
+    return scheduled, stats
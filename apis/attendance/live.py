@@ -0,0 +1,99 @@
+import queue
+import threading
+from collections import defaultdict
+from django.db import transaction
+from apis.refcache import ReferenceCache
+from services.models import Services
+from services.schedule import ServiceSchedule
+from .models import AttendanceRollup
+
+
+class Subscription:
+    def __init__(self, church_id, maxsize):
+        self.church_id = church_id
+        self.queue = queue.Queue(maxsize=maxsize)
+        # set when updates were dropped, the stream answers with a fresh snapshot
+        self.overflowed = False
+
+    def get(self, timeout):
+        return self.queue.get(timeout=timeout)
+
+
+class LiveAttendance:
+    """
+    In-process pub/sub of per-service attendance totals for the live
+    dashboard stream (attendance/live-attendance/).
+
+    Check-in writes publish the (service, day) they touched; once the
+    transaction commits the service's totals are read from the rollups and
+    pushed to every subscribed stream of that church. Totals are absolute,
+    so a missed update is fixed by the next one. Subscribers only see
+    writes made by their own process, streams resend a full snapshot
+    every LIVE_ATTENDANCE_RESYNC seconds to catch up with other workers.
+    """
+
+    QUEUE_SIZE = 256
+    _subscribers = set()
+    _lock = threading.Lock()
+
+    @classmethod
+    def subscribe(cls, church_id=None):
+        subscription = Subscription(church_id, cls.QUEUE_SIZE)
+        with cls._lock:
+            cls._subscribers.add(subscription)
+        return subscription
+
+    @classmethod
+    def unsubscribe(cls, subscription):
+        with cls._lock:
+            cls._subscribers.discard(subscription)
+
+    @classmethod
+    def publish(cls, services_id, day):
+        if cls._subscribers:
+            transaction.on_commit(lambda: cls.broadcast(services_id, day))
+
+    @classmethod
+    def broadcast(cls, services_id, day):
+        with cls._lock:
+            subscribers = list(cls._subscribers)
+        if not subscribers:
+            return
+        try:
+            service = ReferenceCache.get(Services, id=services_id)
+        except Services.DoesNotExist:
+            return
+        update = cls.totals({services_id: day}, {services_id: service.eventName})[0]
+        for subscription in subscribers:
+            if subscription.church_id not in (None, service.churchId_id):
+                continue
+            try:
+                subscription.queue.put_nowait(update)
+            except queue.Full:
+                subscription.overflowed = True
+
+    @classmethod
+    def snapshot(cls, church_id=None):
+        """Totals of every service held today, from the schedule index and the rollups"""
+        occurrences = ServiceSchedule.today(church_id)
+        return cls.totals({occ['serviceId']: occ['date'] for occ in occurrences},
+                          {occ['serviceId']: occ['eventName'] for occ in occurrences})
+
+    @staticmethod
+    def totals(days, names):
+        """[{serviceId, eventName, date, total, byCaptureMethod, byMembership}] for {serviceId: day}"""
+        totals = {services_id: {"serviceId": services_id, "eventName": names.get(services_id), "date": day,
+                                "total": 0, "byCaptureMethod": defaultdict(int), "byMembership": defaultdict(int)}
+                  for services_id, day in days.items()}
+        if not totals:
+            return []
+        rows = (AttendanceRollup.objects.filter(servicesId__in=days.keys(), date__in=set(days.values()))
+                .values_list('servicesId_id', 'date', 'membershipStatus', 'captureMethod', 'count'))
+        for services_id, day, membership, method, count in rows:
+            if days.get(services_id) != day:
+                continue
+            service = totals[services_id]
+            service['total'] += count
+            service['byCaptureMethod'][method] += count
+            service['byMembership'][membership] += count
+        return list(totals.values())
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from attendance.archive import archive_batch, archive_cutoff
+from attendance.models import Attendance
+
+
+class Command(BaseCommand):
+    """
+    Move attendance older than ATTENDANCE_ARCHIVE_HORIZON_DAYS into
+    AttendanceArchive, a batch per transaction. Meant to run nightly, e.g.
+        python manage.py archive_attendance --batch-size 2000
+    Rollup counts are left alone, archived check-ins stay in the history.
+    """
+    help = 'Archive attendance rows older than the configured horizon'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--horizon-days', type=int,
+                            help='archive rows older than this many days (default ATTENDANCE_ARCHIVE_HORIZON_DAYS)')
+        parser.add_argument('--batch-size', type=int, default=1000, help='rows moved per transaction')
+        parser.add_argument('--dry-run', action='store_true', help='only report how many rows would move')
+
+    def handle(self, *args, **options):
+        cutoff = archive_cutoff(options['horizon_days'])
+        if options['dry_run']:
+            pending = Attendance.objects.filter(attendanceDate__lt=cutoff).count()
+            self.stdout.write(f'Would archive {pending} attendance rows dated before {cutoff}')
+            return
+
+        batch_size = max(1, options['batch_size'])
+        moved = 0
+        while True:
+            count = archive_batch(cutoff, batch_size)
+            moved += count
+            if count < batch_size:
+                break
+        self.stdout.write(self.style.SUCCESS(f'Archived {moved} attendance rows dated before {cutoff}'))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from attendance import bitmaps
+
+
+class Command(BaseCommand):
+    """
+    Renumber the service occurrences and rewrite the per-person attendance
+    bitmaps from Attendance and AttendanceArchive. Run once after deploying
+    the bitmap tables, after changing the schedule of past services, or when
+    the bitmaps are suspected to have drifted, e.g.
+        python manage.py rebuild_attendance_bitmaps --church 3
+    """
+    help = 'Rebuild the per-person attendance bitmaps'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--church', type=int, help='only rebuild this church id')
+
+    def handle(self, *args, **options):
+        written = bitmaps.rebuild(church_id=options['church'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {written} attendance bitmaps'))
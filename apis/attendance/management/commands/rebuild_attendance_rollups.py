@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+from attendance import rollups
+
+
+class Command(BaseCommand):
+    """
+    Recompute AttendanceRollup from the raw Attendance rows. Run once after
+    deploying the rollup table, after renaming a membership status, or
+    whenever the counts are suspected to have drifted, e.g.
+        python manage.py rebuild_attendance_rollups --since 2026-01-01
+    """
+    help = 'Rebuild the daily attendance rollups from Attendance'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help='only rebuild days on or after this date (YYYY-MM-DD)')
+        parser.add_argument('--church', type=int, help='only rebuild this church id')
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            since = parse_date(options['since'])
+            if since is None:
+                raise CommandError('--since must be a date in YYYY-MM-DD format')
+
+        written = rollups.rebuild(since=since, church_id=options['church'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {written} rollup rows'))
@@ -0,0 +1,42 @@
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from django.db import IntegrityError, migrations, models, transaction
+
+
+def refile_by_church_day(apps, schema_editor):
+    # rows were filed under the server's UTC day, move them to the church's day of the check-in
+    Church = apps.get_model('church', 'Church')
+    Attendance = apps.get_model('attendance', 'Attendance')
+    for church in Church.objects.exclude(timezone__in=['', 'UTC']):
+        try:
+            zone = ZoneInfo(church.timezone)
+        except (ZoneInfoNotFoundError, ValueError):
+            continue
+        rows = (Attendance.objects.filter(servicesId__churchId=church.id)
+                .values_list('id', 'checkInTimestamp', 'attendanceDate').iterator(chunk_size=5000))
+        for pk, moment, day in list(rows):
+            local_day = moment.astimezone(zone).date()
+            if local_day == day:
+                continue
+            try:
+                with transaction.atomic():
+                    Attendance.objects.filter(pk=pk).update(attendanceDate=local_day)
+            except IntegrityError:
+                # the person is already marked for the service on that day, keep the row as it was
+                pass
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0005_remove_attendance_unique_person_date_attendance_and_more'),
+        ('church', '0005_church_timezone'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='attendance',
+            name='attendanceDate',
+            field=models.DateField(editable=False),
+        ),
+        migrations.RunPython(refile_by_church_day, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:47
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0006_church_local_attendance_date'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='attendance',
+            name='checkInTimestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.CreateModel(
+            name='AttendanceSyncEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('idempotencyKey', models.CharField(max_length=64, unique=True)),
+                ('deviceId', models.CharField(db_index=True, max_length=64)),
+                ('capturedAt', models.DateTimeField()),
+                ('receivedAt', models.DateTimeField(auto_now_add=True)),
+                ('outcome', models.CharField(choices=[('CREATED', 'CREATED'), ('ALREADY_MARKED', 'ALREADY_MARKED'), ('REJECTED', 'REJECTED')], max_length=16)),
+                ('reason', models.CharField(blank=True, default='', max_length=32)),
+                ('attendanceId', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='attendance.attendance')),
+            ],
+            options={
+                'ordering': ('-receivedAt',),
+            },
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0007_attendance_sync_events'),
+        ('capturemethod', '0002_alter_capturemethod_description'),
+        ('person', '0007_person_name_keys'),
+        ('services', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['checkInTimestamp', 'id'], name='attendance_checkin_keyset_idx'),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0008_keyset_indexes'),
+        ('capturemethod', '0002_alter_capturemethod_description'),
+        ('church', '0005_church_timezone'),
+        ('person', '0008_keyset_indexes'),
+        ('services', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('membershipStatus', models.CharField(blank=True, default='', max_length=64)),
+                ('captureMethod', models.CharField(blank=True, default='', max_length=16)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'ordering': ('date',),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['servicesId', 'attendanceDate'], name='attendance_service_day_idx'),
+        ),
+        migrations.AddField(
+            model_name='attendancerollup',
+            name='churchId',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='church.church'),
+        ),
+        migrations.AddField(
+            model_name='attendancerollup',
+            name='servicesId',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='services.services'),
+        ),
+        migrations.AddIndex(
+            model_name='attendancerollup',
+            index=models.Index(fields=['churchId', 'date'], name='rollup_church_date_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='attendancerollup',
+            constraint=models.UniqueConstraint(fields=('servicesId', 'date', 'membershipStatus', 'captureMethod'), name='unique_attendance_rollup_key'),
+        ),
+    ]
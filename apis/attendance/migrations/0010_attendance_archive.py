@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0009_attendance_rollups'),
+        ('capturemethod', '0002_alter_capturemethod_description'),
+        ('person', '0008_keyset_indexes'),
+        ('services', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('checkInTimestamp', models.DateTimeField()),
+                ('attendanceDate', models.DateField()),
+                ('checkOutTimestamp', models.DateTimeField(blank=True, null=True)),
+                ('comment', models.TextField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AlterModelOptions(
+            name='attendance',
+            options={},
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['attendanceDate', 'id'], name='attendance_date_idx'),
+        ),
+        migrations.AddField(
+            model_name='attendancearchive',
+            name='captureMethodId',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_attendance', to='capturemethod.capturemethod'),
+        ),
+        migrations.AddField(
+            model_name='attendancearchive',
+            name='personId',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_attendance', to='person.person'),
+        ),
+        migrations.AddField(
+            model_name='attendancearchive',
+            name='servicesId',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_attendance', to='services.services'),
+        ),
+        migrations.AddIndex(
+            model_name='attendancearchive',
+            index=models.Index(fields=['attendanceDate', 'id'], name='archive_date_idx'),
+        ),
+    ]
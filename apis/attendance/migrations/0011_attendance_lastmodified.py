@@ -0,0 +1,39 @@
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_last_modified(apps, schema_editor):
+    # existing rows count as changed when they were checked in
+    for name in ('Attendance', 'AttendanceArchive'):
+        model = apps.get_model('attendance', name)
+        model.objects.filter(lastModified__isnull=True).update(lastModified=F('checkInTimestamp'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0010_attendance_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attendance',
+            name='lastModified',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.AddField(
+            model_name='attendancearchive',
+            name='lastModified',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_last_modified, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='attendance',
+            name='lastModified',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['lastModified', 'id'], name='attendance_modified_idx'),
+        ),
+    ]
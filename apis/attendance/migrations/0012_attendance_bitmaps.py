@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0011_attendance_lastmodified'),
+        ('church', '0005_church_timezone'),
+        ('person', '0009_person_birthmonthday'),
+        ('services', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceBitmap',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bits', models.BinaryField(default=b'')),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('churchId', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='church.church')),
+                ('personId', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='person.person')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('personId', 'churchId'), name='unique_attendance_bitmap')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ServiceOccurrence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('position', models.IntegerField()),
+                ('churchId', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='church.church')),
+                ('servicesId', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='services.services')),
+            ],
+            options={
+                'ordering': ('churchId', 'position'),
+                'constraints': [models.UniqueConstraint(fields=('churchId', 'position'), name='unique_occurrence_position'), models.UniqueConstraint(fields=('servicesId', 'date'), name='unique_service_occurrence')],
+            },
+        ),
+    ]
@@ -2,6 +2,9 @@ from django.db import models
 from django.utils import timezone
 from capturemethod.models import CaptureMethod
 from services.models import Services
+from services.schedule import church_date
+from apis.refcache import ReferenceCache
+from church.models import Church
 from person.models import Person
 from auditlog.registry import auditlog
 from django.db.models import UniqueConstraint, Q
@@ -13,13 +16,29 @@ class Attendance(models.Model):
     captureMethodId = models.ForeignKey(CaptureMethod,  on_delete=models.SET_NULL,
                                    null=True, blank=True)
     
-    checkInTimestamp = models.DateTimeField(blank=False, auto_now_add=True)
-    attendanceDate = models.DateField(blank=False, auto_now_add=True)
+    # set on insert like auto_now_add, but offline kiosk syncs keep the original capture time
+    checkInTimestamp = models.DateTimeField(blank=False, default=timezone.now, editable=False)
+    # the church's calendar day of checkInTimestamp, filled in by save() when not given
+    attendanceDate = models.DateField(blank=False, editable=False)
     checkOutTimestamp = models.DateTimeField(blank=True, null=True)
     comment = models.TextField(blank=True, null=True)
+    # bumped on every save, incremental exports (report/delta.py) read rows changed after their watermark
+    lastModified = models.DateTimeField(auto_now=True)
+
+    COUNT_FIELDS = ('personId_id', 'servicesId_id', 'attendanceDate', 'captureMethodId_id')
 
     class Meta:
-        ordering = ('comment','attendanceDate',)
+        # no default ordering, list views order explicitly and every other query skips the sort
+        indexes = [
+            # keyset pagination of the attendance list (apis/pagination.py)
+            models.Index(fields=['checkInTimestamp', 'id'], name='attendance_checkin_keyset_idx'),
+            # rollup refresh of one service day (attendance/rollups.py)
+            models.Index(fields=['servicesId', 'attendanceDate'], name='attendance_service_day_idx'),
+            # archive_attendance picks rows older than the horizon
+            models.Index(fields=['attendanceDate', 'id'], name='attendance_date_idx'),
+            # delta exports walk (lastModified, id) from a consumer's watermark
+            models.Index(fields=['lastModified', 'id'], name='attendance_modified_idx'),
+        ]
         # Enforce uniqueness for the combination of 'personId' and attendance date
         constraints = [
             UniqueConstraint(
@@ -30,6 +49,182 @@ class Attendance(models.Model):
 
     def __str__(self):
         return f'{self.personId.firstName} {self.personId.lastName}'
+
+    def save(self, *args, **kwargs):
+        if self.attendanceDate is None:
+            # the day the schedule accepted the check-in for, not the server's UTC date
+            church_id = ReferenceCache.get(Services, id=self.servicesId_id).churchId_id
+            self.attendanceDate = church_date(church_id, self.checkInTimestamp)
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        attendance = super().from_db(db, field_names, values)
+        if not attendance.get_deferred_fields() & set(cls.COUNT_FIELDS):
+            # what the row is counted under, attendance/signals.py moves the counts when it changes
+            attendance._counted_as = attendance.counted_as
+        return attendance
+
+    @property
+    def counted_as(self):
+        """(personId, servicesId, attendanceDate, captureMethodId), the fields rollups and bitmaps count by"""
+        return tuple(getattr(self, field) for field in self.COUNT_FIELDS)
+
+    @property
+    def day_key(self):
+        """(personId, servicesId, attendanceDate), the unique_person_date_attendance key"""
+        return (self.personId_id, self.servicesId_id, self.attendanceDate)
+
+    @classmethod
+    def rows_of(cls, keys):
+        """{day_key: (id, checkInTimestamp, captureMethodId)} of the rows holding the given keys, one query"""
+        if not keys:
+            return {}
+        rows = cls.objects.filter(personId__in={key[0] for key in keys},
+                                  servicesId__in={key[1] for key in keys},
+                                  attendanceDate__in={key[2] for key in keys}
+                                  ).values_list('personId_id', 'servicesId_id', 'attendanceDate',
+                                                'id', 'checkInTimestamp', 'captureMethodId_id')
+        return {(person, service, day): (pk, checked_in, method)
+                for person, service, day, pk, checked_in, method in rows if (person, service, day) in keys}
+
+    @classmethod
+    def insert_new(cls, records, batch_size=500):
+        """
+        Insert records with one bulk insert skipping the conflicting ones, then
+        read the rows back: a record whose row carries another check-in time or
+        capture method was marked by a concurrent request first. Every record
+        gets the pk of the row holding its day_key, the raced ones are returned.
+        """
+        cls.objects.bulk_create(records, batch_size=batch_size, ignore_conflicts=True)
+        rows = cls.rows_of({record.day_key for record in records})
+        raced = []
+        for record in records:
+            record.pk, checked_in, method = rows.get(record.day_key, (None, None, None))
+            if (checked_in, method) != (record.checkInTimestamp, record.captureMethodId_id):
+                raced.append(record)
+        return raced
     
 
-auditlog.register(Attendance)
\ No newline at end of file
+auditlog.register(Attendance)
+
+
+class AttendanceArchive(models.Model):
+    """
+    Attendance rows older than ATTENDANCE_ARCHIVE_HORIZON_DAYS, moved here by
+    `manage.py archive_attendance` so the live table only holds recent history.
+    Columns mirror Attendance in the same order and rows keep their id, which
+    lets attendance/archive.py union the two tables for date-range reads.
+    """
+    personId = models.ForeignKey(Person, on_delete=models.CASCADE, related_name='archived_attendance')
+    servicesId = models.ForeignKey(Services, on_delete=models.CASCADE, related_name='archived_attendance')
+    captureMethodId = models.ForeignKey(CaptureMethod, on_delete=models.SET_NULL, null=True, blank=True,
+                                        related_name='archived_attendance')
+    checkInTimestamp = models.DateTimeField()
+    attendanceDate = models.DateField()
+    checkOutTimestamp = models.DateTimeField(blank=True, null=True)
+    comment = models.TextField(blank=True, null=True)
+    lastModified = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['attendanceDate', 'id'], name='archive_date_idx'),
+        ]
+    def __str__(self):
+        return f'{self.personId_id} {self.attendanceDate}'
+
+
+class AttendanceSyncEvent(models.Model):
+    """Receipt of a check-in queued offline by a kiosk, keyed by the kiosk's idempotency key"""
+    OUTCOME_CREATED = 'CREATED'
+    OUTCOME_ALREADY_MARKED = 'ALREADY_MARKED'
+    OUTCOME_REJECTED = 'REJECTED'
+    OUTCOMES = [
+        (OUTCOME_CREATED, 'CREATED'),
+        (OUTCOME_ALREADY_MARKED, 'ALREADY_MARKED'),
+        (OUTCOME_REJECTED, 'REJECTED'),
+    ]
+    idempotencyKey = models.CharField(max_length=64, unique=True)
+    deviceId = models.CharField(max_length=64, db_index=True)
+    attendanceId = models.ForeignKey(Attendance, on_delete=models.SET_NULL, null=True, blank=True)
+    capturedAt = models.DateTimeField()
+    receivedAt = models.DateTimeField(auto_now_add=True)
+    outcome = models.CharField(max_length=16, choices=OUTCOMES)
+    reason = models.CharField(max_length=32, blank=True, default='')
+
+    class Meta:
+        ordering = ('-receivedAt',)
+    def __str__(self):
+        return f'{self.deviceId} {self.idempotencyKey}'
+
+
+class AttendanceRollup(models.Model):
+    """
+    Daily attendance counts per service, membership status and capture method.
+    Check-ins count under the person's current membership status, past days
+    are recounted when it changes (attendance/rollups.py).
+    Kept in step with Attendance by attendance/signals.py, rebuilt with
+    `manage.py rebuild_attendance_rollups`. Dashboards read this instead of raw rows.
+    """
+    churchId = models.ForeignKey(Church, on_delete=models.CASCADE)
+    servicesId = models.ForeignKey(Services, on_delete=models.CASCADE)
+    date = models.DateField()
+    # labels rather than foreign keys so "no membership" is a value, not a NULL, in the unique key
+    membershipStatus = models.CharField(max_length=64, blank=True, default='')
+    captureMethod = models.CharField(max_length=16, blank=True, default='')
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ('date',)
+        indexes = [
+            models.Index(fields=['churchId', 'date'], name='rollup_church_date_idx'),
+        ]
+        constraints = [
+            UniqueConstraint(
+                fields=['servicesId', 'date', 'membershipStatus', 'captureMethod'],
+                name='unique_attendance_rollup_key'
+            )
+        ]
+    def __str__(self):
+        return f'{self.servicesId_id} {self.date} {self.membershipStatus} {self.captureMethod}: {self.count}'
+
+
+class ServiceOccurrence(models.Model):
+    """
+    Every scheduled occurrence of a church's services, numbered in date order
+    per church. position is the bit an occurrence owns in the attendance
+    bitmaps (attendance/bitmaps.py). Occurrences are only ever appended, so a
+    later schedule change never moves the bits of past ones.
+    """
+    churchId = models.ForeignKey(Church, on_delete=models.CASCADE)
+    servicesId = models.ForeignKey(Services, on_delete=models.CASCADE)
+    date = models.DateField()
+    position = models.IntegerField()
+
+    class Meta:
+        ordering = ('churchId', 'position')
+        constraints = [
+            UniqueConstraint(fields=['churchId', 'position'], name='unique_occurrence_position'),
+            UniqueConstraint(fields=['servicesId', 'date'], name='unique_service_occurrence'),
+        ]
+    def __str__(self):
+        return f'{self.servicesId_id} {self.date} #{self.position}'
+
+
+class AttendanceBitmap(models.Model):
+    """
+    One bit per ServiceOccurrence of a church for one person, set when the
+    person checked in to it. Bits are packed little-endian (bit n is
+    bits[n // 8] >> n % 8), trailing unset bytes may be missing.
+    """
+    personId = models.ForeignKey(Person, on_delete=models.CASCADE)
+    churchId = models.ForeignKey(Church, on_delete=models.CASCADE)
+    bits = models.BinaryField(default=b'')
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            UniqueConstraint(fields=['personId', 'churchId'], name='unique_attendance_bitmap'),
+        ]
+    def __str__(self):
+        return f'{self.personId_id} @ {self.churchId_id}'
@@ -0,0 +1,156 @@
+from collections import Counter
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F
+from apis.refcache import ReferenceCache
+from capturemethod.models import CaptureMethod
+from membership.models import Membership
+from services.models import Services
+from .models import Attendance, AttendanceArchive, AttendanceRollup
+
+# Check-ins are counted under the person's current membership status, both
+# by apply_delta() and by refresh()/rebuild(). A person changing membership
+# or a status being renamed recounts the days concerned (recount_person,
+# recount_status), so the incremental counts always match a rebuild.
+
+# Attendance.values() columns a rollup key is built from
+KEY_FIELDS = ('servicesId_id', 'attendanceDate', 'personId__membershipId_id', 'captureMethodId_id')
+
+
+def _label(model, pk, field):
+    if pk is None:
+        return ''
+    try:
+        return getattr(ReferenceCache.get(model, id=pk), field)
+    except model.DoesNotExist:
+        return ''
+
+
+def rollup_key(services_id, day, membership_id, capture_method_id):
+    """(servicesId, date, membershipStatus, captureMethod) as stored on AttendanceRollup"""
+    return (services_id, day,
+            _label(Membership, membership_id, 'status')[:64],
+            _label(CaptureMethod, capture_method_id, 'method'))
+
+
+def _key_filter(key):
+    services_id, day, membership, method = key
+    return {'servicesId_id': services_id, 'date': day,
+            'membershipStatus': membership, 'captureMethod': method}
+
+
+def apply_delta(key, delta):
+    """
+    Add delta to one rollup row. Increments are one upsert that creates the
+    row on the first check-in of the bucket, decrements one update.
+    """
+    rows = AttendanceRollup.objects.filter(**_key_filter(key))
+    if delta < 0:
+        rows.update(count=F('count') + delta)
+        return
+    try:
+        church_id = ReferenceCache.get(Services, id=key[0]).churchId_id
+    except Services.DoesNotExist:
+        return
+    if connection.vendor in ('postgresql', 'sqlite'):
+        _upsert(church_id, key, delta)
+        return
+    if rows.update(count=F('count') + delta):
+        return
+    try:
+        with transaction.atomic():
+            AttendanceRollup.objects.create(churchId_id=church_id, count=delta, **_key_filter(key))
+    except IntegrityError:
+        # another request created the row first
+        rows.update(count=F('count') + delta)
+
+
+def _upsert(church_id, key, delta):
+    """INSERT ... ON CONFLICT DO UPDATE adding delta to the count, the ORM upsert can only overwrite it"""
+    quote = connection.ops.quote_name
+    table = quote(AttendanceRollup._meta.db_table)
+    columns = [AttendanceRollup._meta.get_field(name).column
+               for name in ('churchId', 'servicesId', 'date', 'membershipStatus', 'captureMethod', 'count')]
+    services_id, day, membership, method = key
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} ({', '.join(map(quote, columns))}) VALUES (%s, %s, %s, %s, %s, %s) "
+            f"ON CONFLICT ({', '.join(map(quote, columns[1:5]))}) "
+            f"DO UPDATE SET {quote(columns[5])} = {table}.{quote(columns[5])} + EXCLUDED.{quote(columns[5])}",
+            [church_id, services_id, connection.ops.adapt_datefield_value(day), membership, method, delta])
+
+
+def _counts(queryset):
+    counts = Counter()
+    for row in queryset.values(*KEY_FIELDS).annotate(n=Count('id')).order_by().iterator():
+        counts[rollup_key(*(row[field] for field in KEY_FIELDS))] += row['n']
+    return counts
+
+
+def _write(counts):
+    churches = dict(Services.objects.filter(id__in={key[0] for key in counts})
+                    .values_list('id', 'churchId_id'))
+    AttendanceRollup.objects.bulk_create(
+        [AttendanceRollup(churchId_id=churches[key[0]], count=n, **_key_filter(key))
+         for key, n in counts.items() if key[0] in churches],
+        batch_size=1000, update_conflicts=True,
+        unique_fields=['servicesId', 'date', 'membershipStatus', 'captureMethod'],
+        update_fields=['count'])
+
+
+def refresh(buckets):
+    """Recount whole service days {(servicesId, date)} from Attendance, used after bulk inserts"""
+    buckets = set(buckets)
+    if not buckets:
+        return
+    service_ids = {services_id for services_id, _ in buckets}
+    days = {day for _, day in buckets}
+    counts = (_counts(Attendance.objects.filter(servicesId__in=service_ids, attendanceDate__in=days))
+              + _counts(AttendanceArchive.objects.filter(servicesId__in=service_ids, attendanceDate__in=days)))
+    counts = Counter({key: n for key, n in counts.items() if key[:2] in buckets})
+
+    with transaction.atomic():
+        stale = [row['id'] for row in AttendanceRollup.objects
+                 .filter(servicesId__in=service_ids, date__in=days)
+                 .values('id', 'servicesId_id', 'date', 'membershipStatus', 'captureMethod')
+                 if (row['servicesId_id'], row['date']) in buckets
+                 and (row['servicesId_id'], row['date'], row['membershipStatus'], row['captureMethod']) not in counts]
+        AttendanceRollup.objects.filter(id__in=stale).delete()
+        _write(counts)
+
+
+def recount_person(person_id):
+    """Recount every service day the person checked in on, after their membership changed"""
+    buckets = set()
+    for model in (Attendance, AttendanceArchive):
+        buckets.update(model.objects.filter(personId=person_id)
+                       .values_list('servicesId_id', 'attendanceDate').distinct())
+    refresh(buckets)
+
+
+def recount_status(status):
+    """Recount the service days counted under a membership status label, after it was renamed or removed"""
+    refresh(AttendanceRollup.objects.filter(membershipStatus=status[:64])
+            .values_list('servicesId_id', 'date').distinct())
+
+
+def rebuild(since=None, church_id=None):
+    """Recompute every rollup row (optionally from a date / for one church), returns rows written"""
+    rollups = AttendanceRollup.objects.all()
+    counts = Counter()
+    # archived rows are still part of the history
+    for model in (Attendance, AttendanceArchive):
+        attendance = model.objects.all()
+        if since is not None:
+            attendance = attendance.filter(attendanceDate__gte=since)
+        if church_id is not None:
+            attendance = attendance.filter(servicesId__churchId=church_id)
+        counts += _counts(attendance)
+    if since is not None:
+        rollups = rollups.filter(date__gte=since)
+    if church_id is not None:
+        rollups = rollups.filter(churchId=church_id)
+
+    with transaction.atomic():
+        rollups.delete()
+        _write(counts)
+    return len(counts)
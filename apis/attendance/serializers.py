@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from capturemethod.models import CaptureMethod
 from .models import Attendance
 
 class attendanceSerializers(serializers.ModelSerializer):
@@ -10,4 +11,24 @@ class attendanceSerializers(serializers.ModelSerializer):
 
 class RecognizeFormSerializer(serializers.Serializer):
     fullname = serializers.CharField(required=True)
-    servicesId = serializers.IntegerField(required=True)
\ No newline at end of file
+    servicesId = serializers.IntegerField(required=True)
+    # picks one of the candidates returned when the name is ambiguous
+    personId = serializers.IntegerField(required=False)
+
+class BulkAttendanceSerializer(serializers.Serializer):
+    servicesId = serializers.IntegerField(required=True)
+    personIds = serializers.ListField(child=serializers.IntegerField(), allow_empty=False,
+                                      max_length=5000, required=True)
+
+
+class SyncEventSerializer(serializers.Serializer):
+    key = serializers.CharField(max_length=64)
+    personId = serializers.IntegerField()
+    servicesId = serializers.IntegerField()
+    capturedAt = serializers.DateTimeField()
+    method = serializers.ChoiceField(choices=CaptureMethod.CAPTURE_METHODS, default=CaptureMethod.METHOD_FORM)
+
+
+class AttendanceSyncSerializer(serializers.Serializer):
+    deviceId = serializers.CharField(max_length=64)
+    events = SyncEventSerializer(many=True, allow_empty=False, max_length=2000)
@@ -0,0 +1,133 @@
+import contextlib
+from contextvars import ContextVar
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import Signal, receiver
+from membership.models import Membership
+from person.models import Person
+from .models import Attendance
+from . import bitmaps, rollups
+from .live import LiveAttendance
+
+# bulk_create skips post_save, bulk writers send this instead with the
+# {(servicesId, attendanceDate)} days they touched
+attendance_bulk_created = Signal()
+
+_rollups_suspended = ContextVar('attendance_rollups_suspended', default=False)
+
+
+@contextlib.contextmanager
+def rollups_suspended():
+    """Archived rows leave the table but stay in the history the rollups and bitmaps count"""
+    token = _rollups_suspended.set(True)
+    try:
+        yield
+    finally:
+        _rollups_suspended.reset(token)
+
+
+def membership_of(instance, person_id):
+    """Membership id of the row's person, without a query when the person is loaded on the row"""
+    if person_id == instance.personId_id and Attendance._meta.get_field('personId').is_cached(instance):
+        return instance.personId.membershipId_id
+    return Person.objects.filter(pk=person_id).values_list('membershipId_id', flat=True).first()
+
+
+def rollup_key_for(counted_as, membership_id):
+    _, services_id, day, method_id = counted_as
+    return rollups.rollup_key(services_id, day, membership_id, method_id)
+
+
+@receiver(pre_save, sender=Attendance)
+def remember_counted_as(sender, instance, raw=False, **kwargs):
+    """Rows loaded from the database know what they are counted under, read it for the others"""
+    if raw or instance.pk is None or '_counted_as' in instance.__dict__ or _rollups_suspended.get():
+        return
+    instance._counted_as = (Attendance.objects.filter(pk=instance.pk)
+                            .values_list(*Attendance.COUNT_FIELDS).first())
+
+
+@receiver(post_save, sender=Attendance)
+def count_attendance(sender, instance, created, raw=False, **kwargs):
+    """Move the rollup count and the bitmap bit when a row is added or its counted fields change"""
+    if raw or _rollups_suspended.get():
+        return
+    previous = None if created else instance.__dict__.get('_counted_as')
+    current = instance._counted_as = instance.counted_as
+    if previous == current or not (created or previous):
+        return
+    if previous is None or previous[:3] != current[:3]:
+        if previous is not None:
+            bitmaps.mark(*previous[:3], value=False)
+        bitmaps.mark(*current[:3])
+    membership_id = membership_of(instance, current[0])
+    key = rollup_key_for(current, membership_id)
+    if previous is not None:
+        previous_membership_id = membership_id if previous[0] == current[0] else membership_of(instance, previous[0])
+        previous_key = rollup_key_for(previous, previous_membership_id)
+        if previous_key == key:
+            return
+        rollups.apply_delta(previous_key, -1)
+        LiveAttendance.publish(previous_key[0], previous_key[1])
+    rollups.apply_delta(key, 1)
+    LiveAttendance.publish(instance.servicesId_id, instance.attendanceDate)
+
+
+@receiver(post_delete, sender=Attendance)
+def uncount_attendance(sender, instance, **kwargs):
+    if _rollups_suspended.get():
+        return
+    rollups.apply_delta(rollup_key_for(instance.counted_as, membership_of(instance, instance.personId_id)), -1)
+    bitmaps.mark(instance.personId_id, instance.servicesId_id, instance.attendanceDate, False)
+    LiveAttendance.publish(instance.servicesId_id, instance.attendanceDate)
+
+
+@receiver(attendance_bulk_created, sender=Attendance)
+def recount_bulk_attendance(sender, buckets, **kwargs):
+    rollups.refresh(buckets)
+    bitmaps.mark_buckets(buckets)
+    for services_id, day in buckets:
+        LiveAttendance.publish(services_id, day)
+
+
+@receiver(pre_save, sender=Person)
+def remember_membership(sender, instance, raw=False, **kwargs):
+    """Persons loaded from the database know their membership (Person.from_db), read it for the others"""
+    if raw or instance.pk is None or '_loaded_membershipId' in instance.__dict__:
+        return
+    instance._loaded_membershipId = (Person.objects.filter(pk=instance.pk)
+                                     .values_list('membershipId_id', flat=True).first())
+
+
+@receiver(post_save, sender=Person)
+def recount_person_rollups(sender, instance, created, raw=False, **kwargs):
+    """Rollups count the current membership, move the person's past check-ins along"""
+    if raw:
+        return
+    previous = instance.__dict__.get('_loaded_membershipId', instance.membershipId_id)
+    instance._loaded_membershipId = instance.membershipId_id
+    if not created and previous != instance.membershipId_id:
+        rollups.recount_person(instance.pk)
+
+
+@receiver(pre_save, sender=Membership)
+def remember_status(sender, instance, raw=False, **kwargs):
+    if raw or instance.pk is None or '_loaded_status' in instance.__dict__:
+        return
+    instance._loaded_status = (Membership.objects.filter(pk=instance.pk)
+                               .values_list('status', flat=True).first())
+
+
+@receiver(post_save, sender=Membership)
+def recount_renamed_status(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = instance.__dict__.get('_loaded_status', instance.status)
+    instance._loaded_status = instance.status
+    if not created and previous is not None and previous != instance.status:
+        rollups.recount_status(previous)
+
+
+@receiver(post_delete, sender=Membership)
+def recount_removed_status(sender, instance, **kwargs):
+    # its persons were set to no membership by a queryset update, which sends no signals
+    rollups.recount_status(instance.status)
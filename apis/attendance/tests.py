@@ -1,3 +1,440 @@
-from django.test import TestCase
+import json
+import queue
+from datetime import timedelta
+from unittest import mock
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from apis.testing import ApiTestCase
+from membership.models import Membership
+from person.models import Person
+from . import bitmaps, rollups
+from .archive import archive_batch
+from .live import LiveAttendance
+from .models import Attendance, AttendanceArchive, AttendanceBitmap, AttendanceRollup, AttendanceSyncEvent
+from .views import AttendanceList, BulkCreateAttendance, CreateAttendance, LiveAttendanceStream, SyncAttendance
 
-# Create your tests here.
+
+class BulkCreateAttendanceTests(ApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.persons = [self.create_person(self.church, f'First{n}', f'Last{n}') for n in range(3)]
+
+    def test_outcomes(self):
+        Attendance.objects.create(personId=self.persons[0], servicesId=self.service, captureMethodId=self.form)
+        ids = [person.id for person in self.persons]
+        response = self.call(BulkCreateAttendance, 'post', {'servicesId': self.service.id,
+                                                            'personIds': ids + [ids[1], 99999]})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['summary'], {'created': 2, 'already_marked': 1, 'not_found': 1})
+        self.assertEqual([row['status'] for row in response.data['results']],
+                         ['already_marked', 'created', 'created', 'not_found'])
+        self.assertEqual(Attendance.objects.filter(servicesId=self.service).count(), 3)
+        self.assertEqual(sum(AttendanceRollup.objects.values_list('count', flat=True)), 3)
+
+    def test_nothing_new_is_200(self):
+        Attendance.objects.create(personId=self.persons[0], servicesId=self.service, captureMethodId=self.form)
+        response = self.call(BulkCreateAttendance, 'post', {'servicesId': self.service.id,
+                                                            'personIds': [self.persons[0].id]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['summary']['already_marked'], 1)
+
+    def marked_meanwhile(self, person):
+        """bulk_create that finds person checked in by another request first"""
+        bulk_create = Attendance.objects.bulk_create
+
+        def racing_bulk_create(records, **kwargs):
+            Attendance.objects.create(personId=person, servicesId=self.service, captureMethodId=self.face)
+            return bulk_create(records, **kwargs)
+        return mock.patch.object(Attendance.objects, 'bulk_create', side_effect=racing_bulk_create)
+
+    def test_raced_rows_are_reported(self):
+        records = [Attendance(personId=person, servicesId=self.service, captureMethodId=self.form,
+                              attendanceDate=timezone.localdate()) for person in self.persons]
+        with self.marked_meanwhile(self.persons[1]):
+            raced = Attendance.insert_new(records)
+        self.assertEqual([record.personId_id for record in raced], [self.persons[1].id])
+        self.assertEqual([record.pk for record in records],
+                         [Attendance.objects.get(personId=person).pk for person in self.persons])
+
+    def test_one_insert_and_one_read(self):
+        records = [Attendance(personId=person, servicesId=self.service, captureMethodId=self.form,
+                              attendanceDate=timezone.localdate()) for person in self.persons]
+        with self.assertNumQueries(2):
+            self.assertEqual(Attendance.insert_new(records), [])
+
+    def test_raced_rows_through_the_view(self):
+        with self.marked_meanwhile(self.persons[1]):
+            response = self.call(BulkCreateAttendance, 'post', {'servicesId': self.service.id,
+                                                                'personIds': [person.id for person in self.persons]})
+        self.assertEqual([row['status'] for row in response.data['results']],
+                         ['created', 'already_marked', 'created'])
+        self.assertEqual(Attendance.objects.get(personId=self.persons[1]).captureMethodId, self.face)
+
+    def test_unscheduled_service(self):
+        other_day = self.create_service(self.church, eventName='Midweek', isReoccuring=False,
+                                        eventDate=timezone.localdate() - timedelta(days=1))
+        response = self.call(BulkCreateAttendance, 'post', {'servicesId': other_day.id,
+                                                            'personIds': [self.persons[0].id]})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Attendance.objects.exists())
+
+
+class AttendanceListTests(ApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        now = timezone.now()
+        # inserted oldest last, so the table order is not the list order
+        self.rows = [Attendance.objects.create(personId=self.create_person(self.church, f'First{n}', f'Last{n}'),
+                                               servicesId=self.service, captureMethodId=self.form,
+                                               checkInTimestamp=now - timedelta(minutes=n))
+                     for n in range(5)]
+
+    def ids(self, response):
+        return [row['id'] for row in response.data['results']]
+
+    def test_numbered_pages_by_default(self):
+        response = self.call(AttendanceList, data={'page_size': 2})
+        self.assertEqual(response.data['count'], 5)
+        self.assertEqual(self.ids(response), [self.rows[0].id, self.rows[1].id])
+        response = self.call(AttendanceList, data={'page_size': 2, 'page': 3})
+        self.assertEqual(self.ids(response), [self.rows[4].id])
+
+    def test_cursor_pages_on_request(self):
+        response = self.call(AttendanceList, data={'page_size': 2, 'cursor': ''})
+        self.assertNotIn('count', response.data)
+        seen = self.ids(response)
+        while response.data['next']:
+            response = self.call(AttendanceList, path=response.data['next'])
+            seen += self.ids(response)
+        self.assertEqual(seen, [row.id for row in self.rows])
+
+    def test_ordering_parameter(self):
+        response = self.call(AttendanceList, data={'ordering': 'checkInTimestamp'})
+        self.assertEqual(self.ids(response), [row.id for row in reversed(self.rows)])
+
+
+class RollupTests(ApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.person = self.create_person(self.church, 'Ada', 'Obi')
+        Attendance.objects.create(personId=self.person, servicesId=self.service, captureMethodId=self.form)
+        Attendance.objects.create(personId=self.create_person(self.church, 'Ben', 'Eze'),
+                                  servicesId=self.service, captureMethodId=self.face)
+
+    def counts(self):
+        return sorted(AttendanceRollup.objects.values_list('membershipStatus', 'captureMethod', 'count'))
+
+    def assertMatchesRebuild(self):
+        counts = self.counts()
+        rollups.rebuild()
+        self.assertEqual(counts, self.counts())
+
+    def test_check_ins_are_counted(self):
+        self.assertEqual(self.counts(), [('member', 'FACE', 1), ('member', 'FORM', 1)])
+        Attendance.objects.filter(personId=self.person).get().delete()
+        self.assertEqual(self.counts(), [('member', 'FACE', 1), ('member', 'FORM', 0)])
+        self.assertEqual(rollups.rebuild(), 1)
+
+    def test_membership_change_moves_past_check_ins(self):
+        self.person.membershipId = Membership.objects.create(status='visitor', description='v')
+        self.person.save()
+        self.assertEqual(self.counts(), [('member', 'FACE', 1), ('visitor', 'FORM', 1)])
+        self.assertMatchesRebuild()
+
+    def queries(self, action):
+        with CaptureQueriesContext(connection) as captured:
+            action()
+        return [query['sql'] for query in captured.captured_queries]
+
+    def test_check_in_is_one_rollup_upsert(self):
+        person = self.create_person(self.church, 'Chi', 'Ude')
+        queries = self.queries(lambda: Attendance.objects.create(personId=person, servicesId=self.service,
+                                                                 captureMethodId=self.form))
+        self.assertEqual(len([sql for sql in queries if 'attendancerollup' in sql]), 1)
+        self.assertEqual(self.counts(), [('member', 'FACE', 1), ('member', 'FORM', 2)])
+
+    def test_edits_compare_with_the_loaded_row(self):
+        row = Attendance.objects.get(personId=self.person)
+        row.comment = 'late'
+        queries = self.queries(row.save)
+        # auditlog reads the whole row, nothing reads the counted fields or touches the rollups
+        self.assertFalse([sql for sql in queries if sql.startswith('SELECT "attendance_attendance"."personId_id"')
+                          or 'attendancerollup' in sql])
+        row.captureMethodId = self.face
+        row.save()
+        self.assertEqual(self.counts(), [('member', 'FACE', 2), ('member', 'FORM', 0)])
+
+    def test_loaded_person_changing_membership(self):
+        person = Person.objects.get(pk=self.person.pk)
+        person.phone = '0811111111'
+        self.assertFalse([sql for sql in self.queries(person.save) if 'membershipId_id" FROM' in sql])
+        person.membershipId = Membership.objects.create(status='visitor', description='v')
+        person.save()
+        self.assertEqual(self.counts(), [('member', 'FACE', 1), ('visitor', 'FORM', 1)])
+
+    def test_status_rename_and_removal(self):
+        self.member.status = 'full member'
+        self.member.save()
+        self.assertEqual(self.counts(), [('full member', 'FACE', 1), ('full member', 'FORM', 1)])
+        self.assertMatchesRebuild()
+        Membership.objects.get(pk=self.member.pk).delete()
+        self.assertEqual(self.counts(), [('', 'FACE', 1), ('', 'FORM', 1)])
+        self.assertMatchesRebuild()
+
+
+class ArchiveTests(ApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        now = timezone.now()
+        person = self.create_person(self.church, 'Ada', 'Obi')
+        # one check-in a week, the oldest two end up archived
+        self.rows = [Attendance.objects.create(personId=person, servicesId=self.service, captureMethodId=self.form,
+                                               checkInTimestamp=now - timedelta(weeks=n),
+                                               attendanceDate=timezone.localdate() - timedelta(weeks=n))
+                     for n in range(4)]
+        self.assertEqual(archive_batch(timezone.localdate() - timedelta(weeks=2) + timedelta(days=1)), 2)
+
+    def ids(self, response):
+        return [row['id'] for row in response.data['results']]
+
+    def test_rows_move_and_stay_counted(self):
+        self.assertEqual(Attendance.objects.count(), 2)
+        self.assertEqual(sorted(AttendanceArchive.objects.values_list('id', flat=True)),
+                         sorted(row.id for row in self.rows[2:]))
+        self.assertEqual(sum(AttendanceRollup.objects.values_list('count', flat=True)), 4)
+
+    def test_range_reads_the_archive(self):
+        since = (timezone.localdate() - timedelta(weeks=10)).isoformat()
+        response = self.call(AttendanceList, data={'dateFrom': since})
+        self.assertEqual(response.data['count'], 4)
+        self.assertEqual(self.ids(response), [row.id for row in self.rows])
+        response = self.call(AttendanceList, data={'dateFrom': since, 'page_size': 3, 'page': 2})
+        self.assertEqual(self.ids(response), [self.rows[3].id])
+        response = self.call(AttendanceList, data={'dateFrom': since, 'ordering': 'checkInTimestamp'})
+        self.assertEqual(self.ids(response), [row.id for row in reversed(self.rows)])
+
+    def test_no_range_reads_live_rows_only(self):
+        response = self.call(AttendanceList)
+        self.assertEqual(self.ids(response), [row.id for row in self.rows[:2]])
+
+
+class BitmapTests(ApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        # calendars numbered by an earlier test are gone with its rows
+        bitmaps.pending_marks._numbered.clear()
+        self.person = self.create_person(self.church, 'Ada', 'Obi')
+        self.today = timezone.localdate()
+
+    def check_in(self, weeks_ago, person=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Attendance.objects.create(personId=person or self.person, servicesId=self.service,
+                                             captureMethodId=self.form,
+                                             attendanceDate=self.today - timedelta(weeks=weeks_ago))
+
+    def stats(self, days=91):
+        return bitmaps.attendance_stats(self.church.id, [self.person.id], days, today=self.today)
+
+    def test_marked_once_committed(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            Attendance.objects.create(personId=self.person, servicesId=self.service, captureMethodId=self.form)
+        self.assertFalse(AttendanceBitmap.objects.exists())
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.stats()[1][0]['lastSeen'], self.today)
+
+    def test_streaks_and_rate(self):
+        for weeks_ago in (5, 3, 2, 1, 0):
+            self.check_in(weeks_ago)
+        scheduled, (stats,) = self.stats()
+        # today's service is still going on and counts for lastSeen only
+        self.assertEqual(scheduled, 5)
+        self.assertEqual((stats['attended'], stats['rate']), (4, 0.8))
+        self.assertEqual((stats['currentStreak'], stats['longestStreak']), (3, 3))
+        self.assertEqual(stats['lastSeen'], self.today)
+
+    def test_stats_leave_the_calendar_to_the_mark_queue(self):
+        self.check_in(2)
+        with mock.patch('user.apps.executor') as executor, \
+                mock.patch.object(bitmaps, 'extend_calendar', wraps=bitmaps.extend_calendar) as extend:
+            # the weeks since the last check-in are not numbered yet
+            self.assertEqual(self.stats()[0], 1)
+            extend.assert_not_called()
+            executor.submit.assert_called_once()
+            bitmaps.pending_marks.flush()
+            extend.assert_called_once_with(self.church.id, self.today)
+            self.assertEqual(self.stats()[0], 2)
+            # numbered for today, later reads queue nothing
+            self.stats()
+            executor.submit.assert_called_once()
+
+    def test_stats_close_the_day_of_the_church(self):
+        self.check_in(0)
+        self.assertEqual(bitmaps.attendance_stats(self.church.id, [self.person.id], 91)[0], 0)
+        with mock.patch.object(bitmaps, 'church_date', return_value=self.today + timedelta(days=1)):
+            scheduled, (stats,) = bitmaps.attendance_stats(self.church.id, [self.person.id], 91)
+        self.assertEqual((scheduled, stats['attended']), (1, 1))
+
+    def test_delete_clears_the_bit(self):
+        for weeks_ago in (2, 1):
+            self.check_in(weeks_ago)
+        with self.captureOnCommitCallbacks(execute=True):
+            Attendance.objects.get(attendanceDate=self.today - timedelta(weeks=1)).delete()
+        _, (stats,) = self.stats()
+        self.assertEqual((stats['attended'], stats['currentStreak'], stats['longestStreak']), (1, 0, 1))
+
+    def test_marks_are_batched_and_match_a_rebuild(self):
+        others = [self.create_person(self.church, f'First{n}', f'Last{n}') for n in range(3)]
+        with mock.patch('user.apps.executor') as executor:
+            with self.captureOnCommitCallbacks(execute=True):
+                for person in [self.person, *others]:
+                    Attendance.objects.create(personId=person, servicesId=self.service, captureMethodId=self.form)
+        # one batch is queued for the four check-ins and written with one update per church
+        executor.submit.assert_called_once()
+        with mock.patch.object(bitmaps, 'set_bits', wraps=bitmaps.set_bits) as set_bits:
+            self.assertEqual(bitmaps.pending_marks.flush(), 4)
+        set_bits.assert_called_once()
+        bits = dict(AttendanceBitmap.objects.values_list('personId_id', 'bits'))
+        self.assertEqual(bitmaps.rebuild(self.church.id), 4)
+        self.assertEqual(bits, dict(AttendanceBitmap.objects.values_list('personId_id', 'bits')))
+
+    def test_bulk_check_ins_are_marked(self):
+        others = [self.create_person(self.church, f'First{n}', f'Last{n}') for n in range(2)]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.call(BulkCreateAttendance, 'post', {'servicesId': self.service.id,
+                                                     'personIds': [person.id for person in others]})
+        self.assertEqual(sorted(AttendanceBitmap.objects.values_list('personId_id', flat=True)),
+                         [person.id for person in others])
+
+
+class CreateAttendanceTests(ApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.ada = self.create_person(self.church, 'Ada', 'Obi', middleName='Grace')
+
+    def check_in(self, fullname, **data):
+        return self.call(CreateAttendance, 'post', {'fullname': fullname, 'servicesId': self.service.id, **data})
+
+    def test_check_in_by_name(self):
+        response = self.check_in('obi ada')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Attendance.objects.get().personId, self.ada)
+        response = self.check_in('Ada Obi')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('already been marked present', response.data['message'])
+        self.assertEqual(Attendance.objects.count(), 1)
+
+    def test_unknown_name(self):
+        self.assertEqual(self.check_in('Nobody Here').status_code, 404)
+
+    def test_namesakes_are_left_to_the_usher(self):
+        other = self.create_person(self.church, 'Ada', 'Obi', middleName='Ngozi')
+        response = self.check_in('Ada Obi')
+        self.assertEqual(response.status_code, 300)
+        self.assertEqual(sorted(row['id'] for row in response.data['candidates']), [self.ada.id, other.id])
+        # the full name tells them apart
+        self.assertEqual(self.check_in('Ada Ngozi Obi').status_code, 201)
+        self.assertEqual(self.check_in('Ada Obi', personId=self.ada.id).status_code, 201)
+        self.assertEqual(Attendance.objects.count(), 2)
+
+
+class SyncAttendanceTests(ApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.ada = self.create_person(self.church, 'Ada', 'Obi')
+        self.ben = self.create_person(self.church, 'Ben', 'Eze')
+        self.last_week = timezone.now() - timedelta(weeks=1)
+
+    def event(self, key, person, captured_at=None, **fields):
+        return {'key': key, 'personId': getattr(person, 'id', person), 'servicesId': self.service.id,
+                'capturedAt': (captured_at or self.last_week).isoformat(), **fields}
+
+    def sync(self, *events):
+        return self.call(SyncAttendance, 'post', {'deviceId': 'hall-kiosk-1', 'events': list(events)}).data
+
+    def test_offline_check_ins_keep_their_capture_time(self):
+        result = self.sync(self.event('k1', self.ada), self.event('k2', self.ben, method='FACE'))
+        self.assertEqual((sorted(result['acked']), result['created']), (['k1', 'k2'], 2))
+        row = Attendance.objects.get(personId=self.ada)
+        self.assertEqual(row.checkInTimestamp, self.last_week)
+        self.assertEqual(row.attendanceDate, timezone.localdate(self.last_week))
+        self.assertEqual(Attendance.objects.get(personId=self.ben).captureMethodId, self.face)
+
+    def test_replays_and_duplicates(self):
+        self.sync(self.event('k1', self.ada))
+        # the kiosk missed the answer and sends the batch again, plus a second scan of Ada
+        result = self.sync(self.event('k1', self.ada), self.event('k2', self.ada))
+        self.assertEqual((sorted(result['acked']), result['created']), (['k1', 'k2'], 0))
+        self.assertEqual(Attendance.objects.count(), 1)
+        receipt = AttendanceSyncEvent.objects.get(idempotencyKey='k2')
+        self.assertEqual((receipt.outcome, receipt.attendanceId), (AttendanceSyncEvent.OUTCOME_ALREADY_MARKED,
+                                                                   Attendance.objects.get()))
+
+    def test_check_in_raced_in_by_another_kiosk(self):
+        bulk_create = Attendance.objects.bulk_create
+
+        def racing_bulk_create(records, **kwargs):
+            Attendance.objects.create(personId=self.ada, servicesId=self.service, captureMethodId=self.face,
+                                      checkInTimestamp=self.last_week - timedelta(minutes=1))
+            return bulk_create(records, **kwargs)
+        with mock.patch.object(Attendance.objects, 'bulk_create', side_effect=racing_bulk_create):
+            result = self.sync(self.event('k1', self.ada), self.event('k2', self.ben))
+        self.assertEqual((sorted(result['acked']), result['created']), (['k1', 'k2'], 1))
+        receipt = AttendanceSyncEvent.objects.get(idempotencyKey='k1')
+        self.assertEqual((receipt.outcome, receipt.attendanceId), (AttendanceSyncEvent.OUTCOME_ALREADY_MARKED,
+                                                                   Attendance.objects.get(personId=self.ada)))
+        # the replay gets the same answer
+        self.assertEqual(self.sync(self.event('k1', self.ada))['created'], 0)
+
+    def test_rejections_are_final(self):
+        events = (self.event('unknown', 99999),
+                  self.event('yesterday', self.ada, timezone.now() - timedelta(days=1)),
+                  self.event('future', self.ada, timezone.now() + timedelta(hours=1)))
+        expected = {'unknown': 'person_not_found', 'yesterday': 'not_scheduled', 'future': 'invalid_timestamp'}
+        self.assertEqual(self.sync(*events)['rejected'], expected)
+        self.assertEqual(self.sync(*events)['rejected'], expected)
+        self.assertFalse(Attendance.objects.exists())
+
+
+class LiveAttendanceTests(ApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.ada = self.create_person(self.church, 'Ada', 'Obi')
+        self.subscription = LiveAttendance.subscribe(self.church.id)
+        self.addCleanup(LiveAttendance.unsubscribe, self.subscription)
+
+    def test_check_in_is_pushed_once_committed(self):
+        elsewhere = LiveAttendance.subscribe(self.church.id + 1)
+        self.addCleanup(LiveAttendance.unsubscribe, elsewhere)
+        with self.captureOnCommitCallbacks(execute=True):
+            Attendance.objects.create(personId=self.ada, servicesId=self.service, captureMethodId=self.form)
+            self.assertTrue(self.subscription.queue.empty())
+        update = self.subscription.get(timeout=0)
+        self.assertEqual((update['serviceId'], update['total']), (self.service.id, 1))
+        self.assertEqual(dict(update['byCaptureMethod']), {'FORM': 1})
+        self.assertEqual(dict(update['byMembership']), {'member': 1})
+        self.assertTrue(elsewhere.queue.empty())
+
+    def test_full_queue_asks_for_a_snapshot(self):
+        with mock.patch.object(self.subscription.queue, 'put_nowait', side_effect=queue.Full):
+            LiveAttendance.broadcast(self.service.id, timezone.localdate())
+        self.assertTrue(self.subscription.overflowed)
+
+    def test_stream_starts_with_a_snapshot(self):
+        Attendance.objects.create(personId=self.ada, servicesId=self.service, captureMethodId=self.form)
+        response = self.call(LiveAttendanceStream, data={'churchId': self.church.id})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        first = next(iter(response.streaming_content)).decode()
+        response.close()
+        self.assertTrue(first.startswith('event: snapshot\n'))
+        services = json.loads(first.split('data: ', 1)[1])
+        self.assertEqual([(row['serviceId'], row['total']) for row in services], [(self.service.id, 1)])
@@ -20,6 +20,9 @@ from .views import *
 urlpatterns = [
     path('attendance-lists/', AttendanceList.as_view(), name='attendance-list'),
     path('mark-attendance/', CreateAttendance.as_view(), name='create-attendance'),
+    path('bulk-mark-attendance/', BulkCreateAttendance.as_view(), name='bulk-create-attendance'),
+    path('live-attendance/', LiveAttendanceStream.as_view(), name='live-attendance'),
+    path('sync-attendance/', SyncAttendance.as_view(), name='sync-attendance'),
     path('remove-attendance/<int:id>/', DeleteAttendance.as_view(), name='delete-attendance'),
     path('modify-attendance/<int:id>/', UpdateAttendance.as_view(), name='attendance-update'),
 ]
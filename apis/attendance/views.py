@@ -1,17 +1,36 @@
+import json
+import queue
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.http import StreamingHttpResponse
 from django.utils import timezone
-from django.db.models import Q
+from apis.refcache import ReferenceCache
+from church.models import Church
 
 from capturemethod.models import CaptureMethod
 from person.models import Person
+from person.util import find_persons_by_name
 from services.models import Services
+from services.schedule import ServiceSchedule, church_zone, not_scheduled_message, occurs_on
 
-from .models import Attendance
-from .serializers import RecognizeFormSerializer, attendanceSerializers
+from .archive import ArchiveRangeMixin
+from .live import LiveAttendance
+from .models import Attendance, AttendanceSyncEvent
+from .signals import attendance_bulk_created
+from .serializers import (AttendanceSyncSerializer, BulkAttendanceSerializer, RecognizeFormSerializer,
+                          attendanceSerializers)
 from django.shortcuts import render
 from rest_framework import status
 from rest_framework.reverse import reverse
+from apis.pagination import AttendancePagination
+from apis.renderers import EventStreamRenderer
 from rest_framework import generics
 from rest_framework.response import Response
+from rest_framework.renderers import JSONRenderer
+from rest_framework.views import APIView
 from rest_framework import filters
 from django_filters.rest_framework import DjangoFilterBackend
 from urllib.parse import urlparse
@@ -25,12 +44,14 @@ from user.permissions import IsInGroup
 
 
 #this generic class will handle GET method to be used by the admin alone
-class AttendanceList(generics.ListAPIView):
+#?dateFrom=/?dateTo= (YYYY-MM-DD) ranges reaching archived days read the archive too
+class AttendanceList(ArchiveRangeMixin, generics.ListAPIView):
     queryset = Attendance.objects.all()
     serializer_class = attendanceSerializers
     permission_classes = [IsAuthenticated,IsInGroup,]
     required_groups = requiredGroups(permission='view_attendance')
     name = 'attendance-list'
+    pagination_class = AttendancePagination
 
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     
@@ -70,33 +91,36 @@ class CreateAttendance(generics.GenericAPIView):
 
     def capture_attendance(self, personID, servicesId, match=True):
         try:
-            person = Person.objects.get(id=personID)
-            services = Services.objects.get(id=servicesId)
-            capture_method = CaptureMethod.objects.get(method=CaptureMethod.METHOD_FORM)
+            occurrence = ServiceSchedule.occurrence(servicesId)
+            if occurrence is None:
+                # not held today, or unknown (DoesNotExist below)
+                return Response({"message" : not_scheduled_message(ReferenceCache.get(Services, id=servicesId))})
 
-            if services.eventDate != timezone.now().date() and services.eventDay != timezone.now().strftime('%a').upper():
-                return Response({"message" : f"Attendance can only be captured for today's services. The event date for {services.eventName} is {services.eventDate} {services.eventDay} {services.eventTime}."})
+            person = Person.objects.get(id=personID)
+            capture_method = ReferenceCache.get(CaptureMethod, method=CaptureMethod.METHOD_FORM)
             
-            today = timezone.now().date()
+            # the church's day, the one the schedule accepted
+            today = occurrence['date']
             
             # Check if already attended today
-            if Attendance.objects.filter(personId=person, attendanceDate=today, servicesId=services).exists():
+            if Attendance.objects.filter(personId=person, attendanceDate=today, servicesId_id=servicesId).exists():
                 return Response({
-                    "message": f"{person.firstName} {person.lastName} has already been marked present for today's {services.eventName}"
+                    "message": f"{person.firstName} {person.lastName} has already been marked present for today's {occurrence['eventName']}"
                 }, status=status.HTTP_200_OK)
             
             # Create attendance record
             Attendance.objects.create(
                 personId=person,
-                servicesId=services,
+                servicesId_id=servicesId,
                 captureMethodId=capture_method,
-                comment = capture_method.description
+                comment = capture_method.description,
+                attendanceDate=today
             )
             
             return Response({
                 "message": f"Attendance successfully captured for {person.firstName} {person.lastName}",
                 "person": f"{person.firstName} {person.lastName}",
-                "service": services.eventName,
+                "service": occurrence['eventName'],
                 "date": today,
                 "match": match
             }, status=status.HTTP_201_CREATED)
@@ -114,12 +138,293 @@ class CreateAttendance(generics.GenericAPIView):
         serializer.is_valid(raise_exception=True)
         fullname = serializer.validated_data['fullname']
         services_id = serializer.validated_data['servicesId']
-        firstName, _, lastName = fullname.partition(" ")
-        try:
-            person  = Person.objects.get(Q(firstName=firstName) & Q(lastName=lastName) | 
-                                         Q(firstName=lastName) & Q(lastName=firstName))
-            # mark attendance
-            return self.capture_attendance(personID=person.id, servicesId=services_id, match=True)
-        except Person.DoesNotExist:
+        person_id = serializer.validated_data.get('personId')
+
+        candidates = find_persons_by_name(fullname)
+        if person_id is not None:
+            candidates = [(person, score) for person, score in candidates if person.id == person_id]
+        if not candidates:
             return Response({"Match": False, "message": "Person with the provided fullname does not exist"}, status=status.HTTP_404_NOT_FOUND)
 
+        # the word order bonus alone never decides between two people
+        if len(candidates) > 1 and candidates[0][1] - candidates[1][1] < 1:
+            # several people fit equally well, let the usher pick and resend with personId
+            return Response({"Match": False,
+                             "message": "More than one person matches the provided fullname, resend with personId",
+                             "candidates": [{"id": person.id, "firstName": person.firstName,
+                                             "middleName": person.middleName, "lastName": person.lastName,
+                                             "score": score} for person, score in candidates]},
+                            status=status.HTTP_300_MULTIPLE_CHOICES)
+
+        # mark attendance
+        return self.capture_attendance(personID=candidates[0][0].id, servicesId=services_id, match=True)
+
+
+class BulkCreateAttendance(generics.GenericAPIView):
+    """
+    Mark many people present for one service in a single request
+    (paper lists, kiosks flushing after being offline).
+
+    Request body:
+    {
+        "servicesId": 3,
+        "personIds": [12, 15, 40]
+    }
+    Every person id gets an outcome: "created", "already_marked" or "not_found".
+    Rows are written with one bulk insert that skips the ones another request
+    marked in the meantime (unique_person_date_attendance), those are reported
+    as "already_marked".
+    """
+    serializer_class = BulkAttendanceSerializer
+    permission_classes = [IsAuthenticated,IsInGroup,]
+    required_groups = requiredGroups(permission='add_attendance')
+    name = 'bulk-create-attendance'
+    batch_size = 500
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        services_id = serializer.validated_data['servicesId']
+        # drop repeated ids but keep the order they were sent in
+        person_ids = list(dict.fromkeys(serializer.validated_data['personIds']))
+
+        try:
+            occurrence = ServiceSchedule.occurrence(services_id)
+            if occurrence is None:
+                return Response({"message" : not_scheduled_message(ReferenceCache.get(Services, id=services_id))},
+                                status=status.HTTP_400_BAD_REQUEST)
+            capture_method = ReferenceCache.get(CaptureMethod, method=CaptureMethod.METHOD_FORM)
+        except Services.DoesNotExist:
+            return Response({"error": "Service not found"}, status=status.HTTP_404_NOT_FOUND)
+        except CaptureMethod.DoesNotExist:
+            return Response({"error": "Form capture method not configured"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        today = occurrence['date']
+        known = set(Person.objects.filter(id__in=person_ids).values_list('id', flat=True))
+        already_marked = set(Attendance.objects.filter(servicesId_id=services_id, attendanceDate=today,
+                                                       personId__in=known)
+                             .values_list('personId_id', flat=True))
+
+        outcomes = {}
+        new_records = []
+        for person_id in person_ids:
+            if person_id not in known:
+                outcomes[person_id] = "not_found"
+            elif person_id in already_marked:
+                outcomes[person_id] = "already_marked"
+            else:
+                outcomes[person_id] = "created"
+                new_records.append(Attendance(personId_id=person_id,
+                                              servicesId_id=services_id,
+                                              captureMethodId=capture_method,
+                                              comment=capture_method.description,
+                                              attendanceDate=today))
+
+        for record in Attendance.insert_new(new_records, batch_size=self.batch_size):
+            outcomes[record.personId_id] = "already_marked"
+        attendance_bulk_created.send(sender=Attendance,
+                                     buckets={(record.servicesId_id, record.attendanceDate) for record in new_records})
+
+        summary = {outcome: 0 for outcome in ("created", "already_marked", "not_found")}
+        for outcome in outcomes.values():
+            summary[outcome] += 1
+
+        return Response({
+            "service": occurrence['eventName'],
+            "date": today,
+            "summary": summary,
+            "results": [{"personId": person_id, "status": outcome} for person_id, outcome in outcomes.items()],
+        }, status=status.HTTP_201_CREATED if summary["created"] else status.HTTP_200_OK)
+
+
+class LiveAttendanceStream(APIView):
+    """
+    Server-Sent Events stream of today's per-service attendance totals for
+    dashboards, instead of polling the list endpoints.
+
+    ?churchId=<id> limits the stream to one church. Events:
+      snapshot - every service held today, sent on connect and every LIVE_ATTENDANCE_RESYNC seconds
+      service  - new totals of one service after a check-in was written or removed
+    Each service is {serviceId, eventName, date, total, byCaptureMethod, byMembership}.
+    A comment line is sent every LIVE_ATTENDANCE_HEARTBEAT seconds to keep proxies from closing the connection.
+    Every open stream holds a worker thread, run enough threads for the dashboards you expect.
+    """
+    permission_classes = [IsAuthenticated,IsInGroup,]
+    required_groups = requiredGroups(permission='view_attendance')
+    renderer_classes = [EventStreamRenderer, JSONRenderer]
+    name = 'live-attendance'
+
+    def get(self, request):
+        church_id = request.query_params.get('churchId')
+        try:
+            church_id = int(church_id) if church_id else None
+        except ValueError:
+            return Response({"error": "churchId must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+
+        response = StreamingHttpResponse(self.events(church_id), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        # nginx would otherwise buffer the stream
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    def events(self, church_id):
+        subscription = LiveAttendance.subscribe(church_id)
+        try:
+            synced = time.monotonic()
+            yield self.event('snapshot', LiveAttendance.snapshot(church_id))
+            while True:
+                try:
+                    update = subscription.get(timeout=settings.LIVE_ATTENDANCE_HEARTBEAT)
+                except queue.Empty:
+                    update = None
+                if subscription.overflowed or time.monotonic() - synced >= settings.LIVE_ATTENDANCE_RESYNC:
+                    subscription.overflowed = False
+                    synced = time.monotonic()
+                    yield self.event('snapshot', LiveAttendance.snapshot(church_id))
+                elif update is not None:
+                    yield self.event('service', update)
+                else:
+                    yield ': keep-alive\n\n'
+        finally:
+            LiveAttendance.unsubscribe(subscription)
+
+    @staticmethod
+    def event(name, data):
+        return f"event: {name}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n"
+
+
+class SyncAttendance(generics.GenericAPIView):
+    """
+    Apply check-ins a kiosk queued while it was offline.
+
+    Request body:
+    {
+        "deviceId": "hall-kiosk-1",
+        "events": [
+            {"key": "5f0c...", "personId": 12, "servicesId": 3,
+             "capturedAt": "2026-10-18T09:12:44+01:00", "method": "FACE"}
+        ]
+    }
+    The batch is applied in one transaction. Each event keeps its original
+    capture time and must fall on a day its service was held (church time zone).
+    Replayed keys are answered from their stored receipt. Duplicate check-ins,
+    also those another request inserted while the batch was applied, are
+    dropped by the unique_person_date_attendance constraint and stored as
+    already marked.
+
+    Response: {"acked": [keys the kiosk can drop], "rejected": {key: reason}, "created": n}
+    Rejected events are final, retrying them gives the same answer.
+    """
+    serializer_class = AttendanceSyncSerializer
+    permission_classes = [IsAuthenticated,IsInGroup,]
+    required_groups = requiredGroups(permission='add_attendance')
+    name = 'sync-attendance'
+    # kiosk clocks drift, accept capture times slightly ahead of the server
+    clock_skew = timedelta(minutes=5)
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        device_id = serializer.validated_data['deviceId']
+        # first occurrence of a key wins inside one batch
+        events = {}
+        for event in serializer.validated_data['events']:
+            events.setdefault(event['key'], event)
+
+        with transaction.atomic():
+            outcomes = self.apply(device_id, events)
+
+        acked = [key for key, (outcome, _) in outcomes.items() if outcome != AttendanceSyncEvent.OUTCOME_REJECTED]
+        rejected = {key: reason for key, (outcome, reason) in outcomes.items()
+                    if outcome == AttendanceSyncEvent.OUTCOME_REJECTED}
+        created = sum(1 for outcome, reason in outcomes.values()
+                      if outcome == AttendanceSyncEvent.OUTCOME_CREATED and reason != 'replayed')
+        return Response({"acked": acked, "rejected": rejected, "created": created,
+                         "serverTime": timezone.now()}, status=status.HTTP_200_OK)
+
+    def apply(self, device_id, events):
+        """Return {key: (outcome, reason)} for every event"""
+        outcomes = {}
+
+        # replays of keys already applied get their stored answer back
+        for receipt in AttendanceSyncEvent.objects.filter(idempotencyKey__in=events.keys()):
+            outcome = receipt.outcome
+            outcomes[receipt.idempotencyKey] = (outcome, receipt.reason if outcome == AttendanceSyncEvent.OUTCOME_REJECTED else 'replayed')
+        pending = {key: event for key, event in events.items() if key not in outcomes}
+        if not pending:
+            return outcomes
+
+        person_ids = {event['personId'] for event in pending.values()}
+        service_ids = {event['servicesId'] for event in pending.values()}
+        known_persons = set(Person.objects.filter(id__in=person_ids).values_list('id', flat=True))
+        services = {service['id']: service for service in
+                    Services.objects.filter(id__in=service_ids).values(*ServiceSchedule.FIELDS)}
+        zones = {church['id']: church_zone(church['timezone'])
+                 for church in Church.objects.filter(id__in={s['churchId_id'] for s in services.values()})
+                 .values('id', 'timezone')}
+        latest = timezone.now() + self.clock_skew
+
+        accepted = {}
+        for key, event in pending.items():
+            service = services.get(event['servicesId'])
+            captured_at = event['capturedAt']
+            reason = None
+            if event['personId'] not in known_persons:
+                reason = 'person_not_found'
+            elif service is None:
+                reason = 'service_not_found'
+            elif captured_at > latest:
+                reason = 'invalid_timestamp'
+            else:
+                # the church's day of the capture, the calendar check-ins are filed under
+                day = captured_at.astimezone(zones.get(service['churchId_id'], church_zone(None))).date()
+                if not occurs_on(service, day):
+                    reason = 'not_scheduled'
+                else:
+                    try:
+                        capture_method = ReferenceCache.get(CaptureMethod, method=event['method'])
+                    except CaptureMethod.DoesNotExist:
+                        reason = 'method_not_configured'
+            if reason:
+                outcomes[key] = (AttendanceSyncEvent.OUTCOME_REJECTED, reason)
+                continue
+            accepted[key] = (event, capture_method, day)
+
+        triples = {(event['personId'], event['servicesId'], day) for event, _, day in accepted.values()}
+        attendance_ids = {triple: row[0] for triple, row in Attendance.rows_of(triples).items()}
+        new_records = {}
+        for key, (event, capture_method, day) in accepted.items():
+            triple = (event['personId'], event['servicesId'], day)
+            if triple in attendance_ids or triple in new_records:
+                outcomes[key] = (AttendanceSyncEvent.OUTCOME_ALREADY_MARKED, '')
+                continue
+            outcomes[key] = (AttendanceSyncEvent.OUTCOME_CREATED, '')
+            new_records[triple] = Attendance(personId_id=event['personId'],
+                                             servicesId_id=event['servicesId'],
+                                             captureMethodId=capture_method,
+                                             comment=capture_method.description,
+                                             checkInTimestamp=event['capturedAt'],
+                                             attendanceDate=day)
+        raced = {record.day_key for record in Attendance.insert_new(list(new_records.values()))}
+        attendance_bulk_created.send(sender=Attendance, buckets={(t[1], t[2]) for t in new_records})
+        for key, (event, _, day) in accepted.items():
+            triple = (event['personId'], event['servicesId'], day)
+            if triple in raced:
+                # checked in by another request or kiosk since the rows were looked up
+                outcomes[key] = (AttendanceSyncEvent.OUTCOME_ALREADY_MARKED, '')
+        attendance_ids.update((triple, record.pk) for triple, record in new_records.items())
+
+        # link every receipt to its attendance row
+        receipts = []
+        for key, event in pending.items():
+            outcome, reason = outcomes[key]
+            attendance_id = None
+            if key in accepted:
+                _, _, day = accepted[key]
+                attendance_id = attendance_ids.get((event['personId'], event['servicesId'], day))
+            receipts.append(AttendanceSyncEvent(idempotencyKey=key, deviceId=device_id,
+                                                attendanceId_id=attendance_id,
+                                                capturedAt=event['capturedAt'],
+                                                outcome=outcome, reason=reason))
+        AttendanceSyncEvent.objects.bulk_create(receipts, batch_size=500, ignore_conflicts=True)
+        return outcomes
@@ -7,6 +7,7 @@ from .serializers.otp import (PasswordResetRequestSerializer,
                               OTPVerificationSerializer, 
                               PasswordResetSerializer)
 from .serializers.logentry import LogEntrySerializer
+from apis.pagination import LogEntryPagination
 from rest_framework import generics
 from auditlog.models import LogEntry
 from rest_framework.permissions import IsAuthenticated, IsAdminUser,AllowAny
@@ -84,6 +85,7 @@ class LogEntryViews(generics.ListAPIView):
     permission_classes = [IsAuthenticated, IsInGroup]
     required_groups = ['admin',]
     name = 'user-logs'
+    pagination_class = LogEntryPagination
 
 
 
@@ -10,6 +10,7 @@ from ..serializers.login import LoginSerializer
 from ..serializers.otp import OTPVerificationSerializer
 from user.models import User
 from church.models import Church
+from apis.refcache import ReferenceCache
 from person.models import Person
 from permissions.models import Permissions
 from role.models import Role
@@ -74,8 +75,7 @@ class FaceLoginView(ViewSet):
     
             #send OTP email/SMS
             ### Send Two-Factor Authentication Email
-            church = Church.objects.get(id=(Person.objects.get(id=user.personId.id)
-                                        .churchId.id))
+            church = ReferenceCache.get(Church, id=user.personId.churchId_id)
             
             try:
                 # Use the executor thread pool to send the email asynchronously
@@ -166,8 +166,7 @@ class LoginView(ViewSet):
     
             #send OTP email/SMS
             ### Send Two-Factor Authentication Email
-            church = Church.objects.get(id=(Person.objects.get(id=user.personId.id)
-                                        .churchId.id))
+            church = ReferenceCache.get(Church, id=user.personId.churchId_id)
             
             try:
                 # Use the executor thread pool to send the email asynchronously
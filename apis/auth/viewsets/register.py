@@ -10,6 +10,7 @@ from role.util import requiredGroups
 from role.models import Role
 from message import EmailService
 from church.models import Church
+from apis.refcache import ReferenceCache
 from person.models import Person
 from user.apps import executor
 
@@ -31,7 +32,7 @@ class SignupViewset(ViewSet):
         '''check if user is added to a group otherwise 
         fetch user choosen group and add user to the group
         '''
-        role = Role.objects.get(pk=request.data['roleId'])
+        role = ReferenceCache.get(Role, pk=request.data['roleId'])
         group = Group.objects.get(name=role.name)
         user.groups.add(group)
 
@@ -46,8 +47,8 @@ class SignupViewset(ViewSet):
         
         
         # In your user registration view
-        church = Church.objects.get(id=Person.objects.get(id=request.data['personId'])
-                                        .churchId.id)
+        church = ReferenceCache.get(Church, id=Person.objects.get(id=request.data['personId'])
+                                        .churchId_id)
         
         try:
                 # Use the executor thread pool to send the email asynchronously
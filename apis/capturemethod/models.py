@@ -1,5 +1,6 @@
 from django.db import models
 from auditlog.registry import auditlog
+from apis.refcache import ReferenceCache
 # Create your models here.
 class CaptureMethod(models.Model):
     METHOD_FACE = 'FACE'
@@ -26,4 +27,5 @@ class CaptureMethod(models.Model):
         return f"{self.description}"
     
     
-auditlog.register(CaptureMethod)
\ No newline at end of file
+auditlog.register(CaptureMethod)
+ReferenceCache.register(CaptureMethod)
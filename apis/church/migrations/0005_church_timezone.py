@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:46
+
+import church.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('church', '0004_alter_church_logo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='church',
+            name='timezone',
+            field=models.CharField(default='UTC', max_length=64, validators=[church.models.validate_timezone]),
+        ),
+    ]
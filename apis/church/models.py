@@ -1,16 +1,28 @@
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from django.core.exceptions import ValidationError
 from django.db import models
 from auditlog.registry import auditlog
+from apis.refcache import ReferenceCache
 
 # Create your models here.
 
+def validate_timezone(value):
+    try:
+        ZoneInfo(value)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValidationError(f'{value} is not a valid IANA time zone e.g. Africa/Lagos')
+
 class Church(models.Model):
     name = models.TextField(blank=False)
     address = models.TextField(blank=False)
     description = models.TextField(blank=False)
     logo = models.CharField(max_length=500, blank=False, default="welcome")
+    # local time zone of the church, decides what "today" means for its services
+    timezone = models.CharField(max_length=64, default="UTC", validators=[validate_timezone])
     class Meta:
         ordering = ('name',)
     def __str__(self):
         return f"{self.name}"
 
-auditlog.register(Church)
\ No newline at end of file
+auditlog.register(Church)
+ReferenceCache.register(Church)
@@ -1,6 +1,5 @@
 from rest_framework import serializers
 from .models import Church
-from supabase import create_client, Client
 from django.conf import settings
 
 from faces.apps import FacesConfig
@@ -13,7 +12,7 @@ class ChurchSerializers(serializers.ModelSerializer):
 
     class Meta:
         model = Church
-        fields = ['id', 'logo', 'address', 'description', 'name']
+        fields = ['id', 'logo', 'address', 'description', 'name', 'timezone']
     
     def get_logo(self, obj):
         if obj.logo:
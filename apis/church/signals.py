@@ -0,0 +1,10 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from .models import Church
+
+
+@receiver(post_delete, sender=Church)
+def delete_church_logo(sender, instance, **kwargs):
+    """Queue the church logo for removal once the church is gone"""
+    from faces.apps import FacesConfig
+    FacesConfig.storage.schedule_delete(instance.logo)
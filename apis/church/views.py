@@ -61,11 +61,6 @@ class DeleteChurch(generics.DestroyAPIView):
     required_groups = requiredGroups(permission='delete_church')
     name = 'delete-church'
     lookup_field = "id"
-    def perform_destroy(self, instance):
-       if instance.logo:
-          storage.delete_file(str(instance.logo))
-
-       return super().perform_destroy(instance)
 
 class CreateChurch(generics.CreateAPIView):
     queryset = Church.objects.all()
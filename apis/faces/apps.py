@@ -1,14 +1,58 @@
+import os
+import sys
+import threading
 from django.apps import AppConfig
-from .util import FaceRecognitionHandler
+from django.conf import settings
+from django.utils.functional import classproperty
+
+
+# programs running management commands, `python -m django` included
+COMMAND_PROGRAMS = ('manage.py', 'django-admin', '__main__.py')
+
+
+def serves_requests(argv):
+    """Whether the process was started as a web server rather than to run a management command"""
+    if os.path.basename(argv[0] if argv else '') not in COMMAND_PROGRAMS:
+        return True
+    # runserver's autoreloader serves from a child process it marks with RUN_MAIN
+    return argv[1:2] == ['runserver'] and (os.environ.get('RUN_MAIN') == 'true' or '--noreload' in argv)
+
+
+def preloads_face_model(setting, argv):
+    """FACE_MODEL_PRELOAD: '1' always, '0' never, 'auto' in web servers only"""
+    if setting == 'auto':
+        return serves_requests(argv)
+    return setting == '1'
+
 
 class FacesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'faces'
-    face_handler = FaceRecognitionHandler()
+    _face_handler = None
+    _face_handler_lock = threading.Lock()
+
+    @classproperty
+    def face_handler(cls):
+        """
+        The face recognition model. cv2, insightface and the model files are
+        only loaded on first use, so processes that never match a face
+        (management commands, workers) do not pay for them.
+        """
+        if cls._face_handler is None:
+            with cls._face_handler_lock:
+                if cls._face_handler is None:
+                    from .util import FaceRecognitionHandler
+                    cls._face_handler = FaceRecognitionHandler()
+        return cls._face_handler
 
     def ready(self):
         import faces.signals  # noqa
 
         from .storage import StorageService
 
-        FacesConfig.storage = StorageService()
\ No newline at end of file
+        FacesConfig.storage = StorageService()
+
+        # web servers taking face check-ins load the model in the background at boot,
+        # so the first face check-in does not wait for it
+        if preloads_face_model(settings.FACE_MODEL_PRELOAD, sys.argv):
+            threading.Thread(target=lambda: FacesConfig.face_handler, daemon=True).start()
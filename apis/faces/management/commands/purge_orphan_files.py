@@ -0,0 +1,59 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from church.models import Church
+from faces.apps import FacesConfig
+from faces.models import Faces
+
+
+class Command(BaseCommand):
+    """
+    Garbage collect storage objects no longer referenced by Faces.pics or Church.logo.
+    Meant to run periodically (cron / scheduled job), e.g.
+        python manage.py purge_orphan_files --chunk-size 500
+    """
+    help = 'Remove stored files that no face or church record points at'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--folder', default='uploads', help='storage folder to scan')
+        parser.add_argument('--chunk-size', type=int, default=500,
+                            help='number of orphans removed per storage call')
+        parser.add_argument('--grace-minutes', type=int, default=60,
+                            help='skip objects younger than this, their record may not be committed yet')
+        parser.add_argument('--dry-run', action='store_true', help='only report what would be removed')
+
+    def handle(self, *args, **options):
+        storage = FacesConfig.storage
+        chunk_size = max(1, options['chunk_size'])
+        cutoff = timezone.now() - timedelta(minutes=options['grace_minutes'])
+
+        referenced = set(Faces.objects.values_list('pics', flat=True))
+        referenced.update(Church.objects.values_list('logo', flat=True))
+
+        scanned = 0
+        purged = 0
+        chunk = []
+        for path, created_at in storage.list_files(options['folder']):
+            scanned += 1
+            if path in referenced:
+                continue
+            if created_at is not None and created_at > cutoff:
+                continue
+            chunk.append(path)
+            if len(chunk) >= chunk_size:
+                purged += self.purge(storage, chunk, options['dry_run'])
+                chunk = []
+        if chunk:
+            purged += self.purge(storage, chunk, options['dry_run'])
+
+        action = 'Would remove' if options['dry_run'] else 'Removed'
+        self.stdout.write(self.style.SUCCESS(
+            f"{action} {purged} orphaned file(s) out of {scanned} scanned in '{options['folder']}'"))
+
+    def purge(self, storage, paths, dry_run):
+        if dry_run:
+            for path in paths:
+                self.stdout.write(path)
+        else:
+            storage.delete_files(paths)
+        return len(paths)
@@ -13,4 +13,11 @@ def invalidate_faces_cache_on_save(sender, instance, **kwargs):
 @receiver(post_delete, sender=Faces)
 def invalidate_faces_cache_on_delete(sender, instance, **kwargs):
     """Invalidate cache when a face is deleted"""
-    FacesCache.invalidate_cache()
\ No newline at end of file
+    FacesCache.invalidate_cache()
+
+
+@receiver(post_delete, sender=Faces)
+def delete_face_image(sender, instance, **kwargs):
+    """Queue the face image for removal, also covers faces cascaded from a deleted person"""
+    from .apps import FacesConfig
+    FacesConfig.storage.schedule_delete(instance.pics)
@@ -1,22 +1,36 @@
+import logging
 import os
+import threading
 import uuid
+from io import BytesIO
 from django.conf import settings
 from django.core.files.storage import default_storage
-from supabase import create_client
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+
+logger = logging.getLogger(__name__)
 
 class StorageService:
+    # Supabase caps list() pages at 1000 objects and remove() is cheapest in large batches
+    LIST_PAGE_SIZE = 1000
+    DELETE_BATCH_SIZE = 100
+
     def __init__(self):
         # Detect environment
         self.local = os.environ.get("APP_ENV", "local") == "local"
         
         if not self.local:
             #hybrid and production mode
+            from supabase import create_client
             self.bucket_name = settings.AWS_STORAGE_BUCKET_NAME
             self.client = create_client(settings.SUPERBASE_URL, settings.SERVICE_ROLE_KEY)
         else:
             # Ensure local media directory exists
             self._ensure_local_dir("uploads")
 
+        # paths waiting to be removed off the request path
+        self.deletion_queue = DeletionQueue(self)
+
     def _ensure_local_dir(self, folder):
         """Creates the local directory if it doesn't exist"""
         path = os.path.join(settings.MEDIA_ROOT, folder)
@@ -46,18 +60,65 @@ class StorageService:
         return path
 
     def update_file(self, old_path, new_file_obj, folder="uploads"):
-        if old_path:
-            self.delete_file(old_path)
-        return self.upload_file(new_file_obj, folder)
+        # upload first so a failed upload never leaves the record without a file,
+        # the old object is removed in the background once the change is committed
+        new_path = self.upload_file(new_file_obj, folder)
+        if old_path and new_path:
+            self.schedule_delete(old_path)
+        return new_path
 
     def delete_file(self, path):
         if not path: return
-        
+        self.delete_files([path])
+
+    def delete_files(self, paths):
+        """Remove several objects at once, one remove() call per batch on Supabase"""
+        paths = [str(path) for path in paths if is_stored_path(path)]
+        if not paths: return
+
         if not self.local:
-            self.client.storage.from_(self.bucket_name).remove([path])
+            for start in range(0, len(paths), self.DELETE_BATCH_SIZE):
+                batch = paths[start:start + self.DELETE_BATCH_SIZE]
+                self.client.storage.from_(self.bucket_name).remove(batch)
         else:
-            if default_storage.exists(path):
-                default_storage.delete(path)
+            for path in paths:
+                if default_storage.exists(path):
+                    default_storage.delete(path)
+
+    def schedule_delete(self, path):
+        """Queue a path for batched removal after the current transaction commits"""
+        if not is_stored_path(path): return
+        self.deletion_queue.add(str(path))
+
+    def list_files(self, folder="uploads"):
+        """Yield (path, created_at) for every object stored under folder"""
+        if not self.local:
+            bucket = self.client.storage.from_(self.bucket_name)
+            offset = 0
+            while True:
+                items = bucket.list(folder, {"limit": self.LIST_PAGE_SIZE, "offset": offset,
+                                             "sortBy": {"column": "name", "order": "asc"}})
+                for item in items:
+                    # folders come back without an id
+                    if item.get('id'):
+                        yield f"{folder}/{item['name']}", parse_datetime(item.get('created_at') or '')
+                if len(items) < self.LIST_PAGE_SIZE:
+                    break
+                offset += self.LIST_PAGE_SIZE
+        else:
+            if not default_storage.exists(folder):
+                return
+            _, files = default_storage.listdir(folder)
+            for name in files:
+                path = f"{folder}/{name}"
+                yield path, default_storage.get_created_time(path)
+
+    def open_file(self, path):
+        """Binary file object with the content of a stored object, the caller closes it"""
+        if not self.local:
+            data = self.client.storage.from_(self.bucket_name).download(path)
+            return BytesIO(data)
+        return default_storage.open(path, 'rb')
 
     def get_url(self, path, expires_in=86400): #expires in 24hrs makes the engine more faster
         if not path: return None
@@ -71,4 +132,53 @@ class StorageService:
         else:
             # Return local URL: e.g., http://127.0.0
             return f"{settings.SITE_URL}/{path}"
-        
+
+
+def is_stored_path(path):
+    """'welcome' is the model default for pics/logo and never points at a stored object"""
+    return bool(path) and str(path) != "welcome"
+
+
+class DeletionQueue:
+    """
+    Collects storage paths to delete and removes them in batches on the
+    background executor, so requests never wait on the storage API.
+    Paths are only queued once the surrounding transaction commits, a rolled
+    back delete keeps its file.
+    """
+
+    def __init__(self, storage):
+        self.storage = storage
+        self._pending = []
+        self._lock = threading.Lock()
+        self._flush_scheduled = False
+
+    def add(self, path):
+        transaction.on_commit(lambda: self._enqueue(path))
+
+    def _enqueue(self, path):
+        with self._lock:
+            self._pending.append(path)
+            if self._flush_scheduled:
+                return
+            self._flush_scheduled = True
+
+        # executor is created in UserConfig.ready(), look it up at call time
+        from user.apps import executor
+        if executor is None:
+            self.flush()
+        else:
+            executor.submit(self.flush)
+
+    def flush(self):
+        with self._lock:
+            paths, self._pending = self._pending, []
+            self._flush_scheduled = False
+        if not paths:
+            return 0
+        try:
+            self.storage.delete_files(paths)
+        except Exception:
+            # anything left behind is picked up by the purge_orphan_files command
+            logger.exception("Failed to delete %d storage object(s)", len(paths))
+        return len(paths)
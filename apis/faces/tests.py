@@ -1,3 +1,68 @@
-from django.test import TestCase
+import os
+from io import StringIO
+from unittest import mock
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import transaction
+from django.test import SimpleTestCase
+from apis.testing import ApiTestCase
+from .apps import preloads_face_model
+from .models import Faces
 
-# Create your tests here.
+
+class FaceModelPreloadTests(SimpleTestCase):
+
+    def test_auto_loads_in_web_servers_only(self):
+        self.assertTrue(preloads_face_model('auto', ['/venv/bin/gunicorn', 'apis.wsgi']))
+        self.assertFalse(preloads_face_model('auto', ['manage.py', 'migrate']))
+        self.assertFalse(preloads_face_model('auto', ['/venv/lib/django/__main__.py', 'shell']))
+
+    def test_runserver_loads_in_the_serving_process(self):
+        with mock.patch.dict(os.environ, {'RUN_MAIN': 'true'}):
+            self.assertTrue(preloads_face_model('auto', ['manage.py', 'runserver']))
+        with mock.patch.dict(os.environ, clear=True):
+            self.assertFalse(preloads_face_model('auto', ['manage.py', 'runserver']))
+            self.assertTrue(preloads_face_model('auto', ['manage.py', 'runserver', '--noreload']))
+
+    def test_explicit_setting_wins(self):
+        self.assertTrue(preloads_face_model('1', ['manage.py', 'migrate']))
+        self.assertFalse(preloads_face_model('0', ['/venv/bin/gunicorn', 'apis.wsgi']))
+
+
+class StorageDeletionTests(ApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.use_temporary_media()
+        self.person = self.create_person(self.church, 'Ada', 'Obi')
+        self.face = Faces.objects.create(personId=self.person, pics=self.store('face.jpg'))
+
+    def store(self, name):
+        return default_storage.save(f'uploads/{name}', ContentFile(b'image'))
+
+    def test_image_removed_once_the_delete_commits(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.person.delete()
+        self.assertFalse(default_storage.exists(self.face.pics))
+
+    def test_rolled_back_delete_keeps_the_image(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                self.face.delete()
+                raise RuntimeError
+        self.assertEqual(callbacks, [])
+        self.assertTrue(default_storage.exists(self.face.pics))
+
+    def test_purge_orphan_files(self):
+        orphans = [self.store(f'orphan{n}.jpg') for n in range(3)]
+        out = StringIO()
+        call_command('purge_orphan_files', '--grace-minutes', '0', '--chunk-size', '2', stdout=out)
+        self.assertIn('Removed 3 orphaned file(s) out of 4 scanned', out.getvalue())
+        self.assertTrue(default_storage.exists(self.face.pics))
+        self.assertFalse(any(default_storage.exists(path) for path in orphans))
+
+    def test_young_files_are_kept(self):
+        orphan = self.store('orphan.jpg')
+        call_command('purge_orphan_files', stdout=StringIO())
+        self.assertTrue(default_storage.exists(orphan))
@@ -2,7 +2,6 @@ import os
 import tempfile
 
 from django.shortcuts import render
-from fontTools import encodings
 from rest_framework import generics
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from django_filters.rest_framework import DjangoFilterBackend
@@ -22,8 +21,10 @@ from rest_framework import status
 from .cache import FacesCache
 from attendance.models import Attendance
 from services.models import Services
+from services.schedule import ServiceSchedule, not_scheduled_message
 from capturemethod.models import CaptureMethod
 from django.utils import timezone
+from apis.refcache import ReferenceCache
 
 storage = FacesConfig.storage
 
@@ -197,12 +198,6 @@ class DeleteFaces(generics.DestroyAPIView):
     required_groups = requiredGroups(permission='delete_faces')
     name = 'delete-faces'
     lookup_field = "id"
-
-    def perform_destroy(self, instance):
-       if instance.pics:
-          storage.delete_file(str(instance.pics))
-
-       return super().perform_destroy(instance)
     
 class RecognizeFaceView(generics.GenericAPIView):
     permission_classes = [IsAuthenticated, IsInGroup]
@@ -210,30 +205,33 @@ class RecognizeFaceView(generics.GenericAPIView):
     required_groups = requiredGroups(permission='add_attendance')
 
     def capture_attendance(self, personID, services, faceMatchDistance, match= True):
+        # services is today's occurrence from ServiceSchedule
         try:
             person = Person.objects.get(id=personID)
-            capture_method = CaptureMethod.objects.get(method=CaptureMethod.METHOD_FACE)
+            capture_method = ReferenceCache.get(CaptureMethod, method=CaptureMethod.METHOD_FACE)
             
-            today = timezone.now().date()
+            # the church's day, the one the schedule accepted
+            today = services['date']
             
             # Check if already attended today
-            if Attendance.objects.filter(personId=person, attendanceDate=today, servicesId=services).exists():
+            if Attendance.objects.filter(personId=person, attendanceDate=today, servicesId_id=services['serviceId']).exists():
                 return Response({
-                    "message": f"{person.firstName} {person.lastName} has already been marked present for today's {services.eventName}"
+                    "message": f"{person.firstName} {person.lastName} has already been marked present for today's {services['eventName']}"
                 }, status=status.HTTP_200_OK)
             
             # Create attendance record
             Attendance.objects.create(
                 personId=person,
-                servicesId=services,
+                servicesId_id=services['serviceId'],
                 captureMethodId=capture_method,
-                comment = capture_method.description
+                comment = capture_method.description,
+                attendanceDate=today
             )
             
             return Response({
                 "message": f"Attendance successfully captured for {person.firstName} {person.lastName}",
                 "person": f"{person.firstName} {person.lastName}",
-                "service": services.eventName,
+                "service": services['eventName'],
                 "date": today,
                 "faceMatchDistance" :faceMatchDistance,
                 "match": match
@@ -253,12 +251,12 @@ class RecognizeFaceView(generics.GenericAPIView):
         serializer.is_valid(raise_exception=True)
         file = serializer.validated_data['pics']
         services_id = serializer.validated_data['servicesId']
-        services = Services.objects.filter(id=services_id)
-        if not services.exists():
-            return Response({"error":"this service does not exist"},status=status.HTTP_404_NOT_FOUND)
-        service = services.first()
-        if service.eventDate != timezone.now().date() and service.eventDay != timezone.now().strftime('%a').upper():
-            return Response({"message" : f"Attendance can only be captured for today's services. The event date for {services.eventName} is {services.eventDate} {services.eventDay} {services.eventTime}."})
+        service = ServiceSchedule.occurrence(services_id)
+        if service is None:
+            try:
+                return Response({"message" : not_scheduled_message(ReferenceCache.get(Services, id=services_id))})
+            except Services.DoesNotExist:
+                return Response({"error":"this service does not exist"},status=status.HTTP_404_NOT_FOUND)
 
         # Load uploaded image and get encoding and normalize it
         unknown_encoding = FacesConfig.face_handler.get_embedding(file.read())
@@ -1,5 +1,6 @@
 from django.db import models
 from auditlog.registry import auditlog
+from apis.refcache import ReferenceCache
 # Create your models here.
 class Membership(models.Model):
     status = models.TextField(blank=False)
@@ -9,5 +10,13 @@ class Membership(models.Model):
         ordering = ("status",)
     def __str__(self):
         return f'{self.status}'
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        membership = super().from_db(db, field_names, values)
+        if 'status' in membership.__dict__:
+            # attendance rollups are keyed by the status label, attendance/signals.py recounts when it is renamed
+            membership._loaded_status = membership.status
+        return membership
     
-auditlog.register(Membership)
\ No newline at end of file
+auditlog.register(Membership)
+ReferenceCache.register(Membership)
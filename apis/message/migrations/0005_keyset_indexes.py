@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('message', '0004_alter_message_recipients'),
+        ('person', '0008_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['date', 'id'], name='message_date_keyset_idx'),
+        ),
+    ]
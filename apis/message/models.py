@@ -11,6 +11,9 @@ class Message(models.Model):
 
     class Meta:
         ordering = ('date',)
+        indexes = [
+            models.Index(fields=['date', 'id'], name='message_date_keyset_idx'),
+        ]
     def __str__(self):
         return f'{self.title}'
     
@@ -1,4 +1,3 @@
-from twilio.rest import Client
 from django.conf import settings
 from django.core.exceptions import ImproperlyConfigured
 
@@ -22,6 +21,7 @@ class SMSService():
                 'TWILIO_PHONE_NUMBER must be set in settings or environment variables.'
             )
         
+        from twilio.rest import Client
         self.client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
         self.from_number = settings.TWILIO_PHONE_NUMBER
 
@@ -7,6 +7,7 @@ from .serializers import MessageSerializers
 from django.shortcuts import render
 from rest_framework import status
 from rest_framework.reverse import reverse
+from apis.pagination import MessagePagination
 from rest_framework import generics
 from rest_framework.response import Response
 from rest_framework import filters
@@ -22,6 +23,7 @@ from .email_service import EmailService
 from .sms_service import SMSService
 from person.models import Person
 from church.models import Church
+from apis.refcache import ReferenceCache
 from rest_framework.decorators import action
 from django.core.exceptions import ImproperlyConfigured
 from user.apps import executor
@@ -37,6 +39,7 @@ class MessageList(generics.ListAPIView):
     permission_classes = [IsAuthenticated, IsInGroup,]
     required_groups = requiredGroups(permission='view_message')
     name = 'message-list'
+    pagination_class = MessagePagination
 
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     
@@ -128,8 +131,7 @@ class sendEmailMSG(generics.CreateAPIView):
             person = Person.objects.get(email=recipient)
             if person:
                 username.append(person.firstName + " " + person.lastName)
-        church = Church.objects.get(
-                id=Person.objects.get(id=self.request.user.personId.id).churchId.id)
+        church = ReferenceCache.get(Church, id=self.request.user.personId.churchId_id)
         
         try:
             # Fire and forget: send email in a thread without blocking the main request thread
@@ -1,6 +1,7 @@
 from django.db import models
 from church.models import Church
 from auditlog.registry import auditlog
+from apis.refcache import ReferenceCache
 # Model for church departments and ministries
 class Ministries(models.Model):
     name = models.TextField(unique=True, blank=False)
@@ -13,3 +14,4 @@ class Ministries(models.Model):
         return f'{self.name}'
     
 auditlog.register(Ministries)
+ReferenceCache.register(Ministries)
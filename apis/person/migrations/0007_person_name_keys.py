@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:44
+
+from django.db import migrations, models
+
+
+def fill_name_keys(apps, schema_editor):
+    from person.util import name_key
+    Person = apps.get_model('person', 'Person')
+    batch = []
+    for person in Person.objects.only('firstName', 'middleName', 'lastName').iterator(chunk_size=2000):
+        person.nameKey = name_key(person.firstName, person.lastName)
+        person.fullNameKey = name_key(person.firstName, person.middleName, person.lastName)
+        batch.append(person)
+        if len(batch) >= 2000:
+            Person.objects.bulk_update(batch, ['nameKey', 'fullNameKey'])
+            batch = []
+    if batch:
+        Person.objects.bulk_update(batch, ['nameKey', 'fullNameKey'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('person', '0006_alter_person_churchid'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='person',
+            name='fullNameKey',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='person',
+            name='nameKey',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=255),
+        ),
+        migrations.RunPython(fill_name_keys, migrations.RunPython.noop),
+    ]
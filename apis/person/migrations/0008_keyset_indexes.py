@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-19 17:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('church', '0005_church_timezone'),
+        ('household', '0003_alter_household_name'),
+        ('membership', '0001_initial'),
+        ('person', '0007_person_name_keys'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='person',
+            index=models.Index(fields=['firstName', 'lastName', 'id'], name='person_name_keyset_idx'),
+        ),
+    ]
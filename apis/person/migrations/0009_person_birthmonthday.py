@@ -0,0 +1,31 @@
+from django.db import migrations, models
+
+
+def fill_birth_month_day(apps, schema_editor):
+    from person.util import birth_month_day
+    Person = apps.get_model('person', 'Person')
+    batch = []
+    for person in Person.objects.only('dob').iterator(chunk_size=2000):
+        person.birthMonthDay = birth_month_day(person.dob)
+        batch.append(person)
+        if len(batch) >= 2000:
+            Person.objects.bulk_update(batch, ['birthMonthDay'])
+            batch = []
+    if batch:
+        Person.objects.bulk_update(batch, ['birthMonthDay'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('person', '0008_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='person',
+            name='birthMonthDay',
+            field=models.PositiveSmallIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.RunPython(fill_birth_month_day, migrations.RunPython.noop),
+    ]
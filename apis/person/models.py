@@ -4,6 +4,7 @@ from household.models import HouseHold
 from membership.models import Membership
 from django.utils import timezone
 from auditlog.registry import auditlog
+from .util import birth_month_day, name_key, NAME_KEY_MAX_LENGTH
 
 # Create your models here.
 class Person(models.Model):
@@ -17,11 +18,36 @@ class Person(models.Model):
     phone = models.CharField(blank=False, max_length=11)
     email = models.EmailField(blank=False)
     entranceDate = models.DateTimeField(blank=False)
+    # normalized lookup keys maintained on save, see person.util.name_key
+    nameKey = models.CharField(max_length=NAME_KEY_MAX_LENGTH, blank=True, default='',
+                               editable=False, db_index=True)
+    fullNameKey = models.CharField(max_length=NAME_KEY_MAX_LENGTH, blank=True, default='',
+                                   editable=False, db_index=True)
+    # month * 100 + day of dob maintained on save, birthday lookups are index ranges (person.util.birthday_filter)
+    birthMonthDay = models.PositiveSmallIntegerField(default=0, editable=False, db_index=True)
 
     class Meta:
         ordering = ('firstName','lastName',)
+        indexes = [
+            models.Index(fields=['firstName', 'lastName', 'id'], name='person_name_keyset_idx'),
+        ]
     def __str__(self):
         return f'{self.lastName} {self.firstName}'
+    def save(self, *args, **kwargs):
+        self.nameKey = name_key(self.firstName, self.lastName)
+        self.fullNameKey = name_key(self.firstName, self.middleName, self.lastName)
+        self.birthMonthDay = birth_month_day(self.dob)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'nameKey', 'fullNameKey', 'birthMonthDay'}
+        super().save(*args, **kwargs)
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        person = super().from_db(db, field_names, values)
+        if 'membershipId_id' in person.__dict__:
+            # attendance rollups count the current membership, attendance/signals.py recounts when it changes
+            person._loaded_membershipId = person.membershipId_id
+        return person
     @property
     def age(self):
         today = timezone.now().date()
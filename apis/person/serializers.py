@@ -5,4 +5,4 @@ class PersonSerializers(serializers.ModelSerializer):
     age = serializers.ReadOnlyField() 
     class Meta:
         model = Person
-        fields = "__all__"
\ No newline at end of file
+        exclude = ('nameKey', 'fullNameKey', 'birthMonthDay')
\ No newline at end of file
@@ -1,3 +1,94 @@
-from django.test import TestCase
+from datetime import date
+from apis.testing import ApiTestCase
+from .models import Person
+from .util import (birth_month_day, birthday_filter, find_persons_by_name, name_key, normalize_name,
+                   upcoming_birthday_order)
+from .views import PersonList
 
-# Create your tests here.
+
+class PersonListTests(ApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.persons = [self.create_person(self.church, first, last)
+                        for first, last in (('Zoe', 'Adams'), ('Ann', 'Brown'), ('Ann', 'Abbot'))]
+
+    def names(self, response):
+        return [(row['firstName'], row['lastName']) for row in response.data['results']]
+
+    def test_numbered_pages_are_alphabetical(self):
+        response = self.call(PersonList)
+        self.assertEqual(response.data['count'], 4)
+        self.assertEqual(self.names(response), [('Admin', 'User'), ('Ann', 'Abbot'), ('Ann', 'Brown'),
+                                                ('Zoe', 'Adams')])
+
+    def test_cursor_pages_follow_the_id(self):
+        response = self.call(PersonList, data={'cursor': '', 'page_size': 3})
+        seen = [row['id'] for row in response.data['results']]
+        response = self.call(PersonList, path=response.data['next'])
+        seen += [row['id'] for row in response.data['results']]
+        self.assertEqual(seen, sorted([self.user.personId_id] + [person.id for person in self.persons]))
+
+
+class NameMatchTests(ApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.emile = self.create_person(self.church, 'Émile', 'Zola', middleName='Édouard Charles')
+        self.emma = self.create_person(self.church, 'Emma', 'Zola', middleName='Jane')
+
+    def matches(self, fullname):
+        return [(person.id, score) for person, score in find_persons_by_name(fullname)]
+
+    def test_keys(self):
+        self.assertEqual(normalize_name('  ÉMILE   Zola '), 'emile zola')
+        self.assertEqual(name_key('Zola', 'Émile'), 'emile zola')
+        self.assertEqual(self.emile.nameKey, 'emile zola')
+
+    def test_case_accents_and_order_are_ignored(self):
+        self.assertEqual(self.matches('emile ZOLA'), [(self.emile.id, 2.5)])
+        self.assertEqual(self.matches('Zola Emile'), [(self.emile.id, 2)])
+
+    def test_middle_names(self):
+        self.assertEqual(self.matches('Emile Edouard Charles Zola'), [(self.emile.id, 3.5)])
+        # part of the middle name
+        self.assertEqual(self.matches('Emile Charles Zola'), [(self.emile.id, 2.5)])
+        # words that are not the middle name still find the first and last name
+        self.assertEqual(self.matches('Emma Rose Zola'), [(self.emma.id, 1.5)])
+
+    def test_key_follows_renames(self):
+        self.emma.firstName = 'Emmy'
+        self.emma.save()
+        self.assertEqual(self.matches('Emma Zola'), [])
+        self.assertEqual(self.matches('Emmy Zola'), [(self.emma.id, 2.5)])
+
+
+class BirthdayTests(ApiTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        for first, dob in (('New', date(1990, 1, 2)), ('Eve', date(1985, 12, 31)), ('Leap', date(1992, 2, 29)),
+                           ('March', date(1980, 3, 1)), ('Autumn', date(1975, 10, 19))):
+            cls.create_person(cls.church, first, 'Born', dob=dob)
+
+    def celebrants(self, start, days):
+        persons = Person.objects.filter(lastName='Born')
+        return list(persons.filter(birthday_filter(start, days)).order_by(*upcoming_birthday_order(start))
+                    .values_list('firstName', flat=True))
+
+    def test_key(self):
+        self.assertEqual(birth_month_day(date(2000, 10, 19)), 1019)
+        self.assertEqual(birth_month_day(None), 0)
+        self.assertEqual(Person.objects.get(firstName='Leap').birthMonthDay, 229)
+
+    def test_window_wraps_over_the_new_year(self):
+        self.assertEqual(self.celebrants(date(2025, 12, 30), 5), ['Eve', 'New'])
+
+    def test_leap_day_is_celebrated_on_the_28th_outside_leap_years(self):
+        self.assertEqual(self.celebrants(date(2025, 2, 28), 1), ['Leap'])
+        self.assertEqual(self.celebrants(date(2024, 2, 28), 1), [])
+        self.assertEqual(self.celebrants(date(2024, 2, 29), 1), ['Leap'])
+
+    def test_whole_year_starts_from_the_day(self):
+        self.assertEqual(self.celebrants(date(2025, 10, 1), 366), ['Autumn', 'Eve', 'New', 'Leap', 'March'])
@@ -0,0 +1,101 @@
+import calendar
+import unicodedata
+from datetime import date, timedelta
+from itertools import combinations
+from django.db.models import Case, IntegerField, Q, Value, When
+
+# keys are stored in an indexed varchar column
+NAME_KEY_MAX_LENGTH = 255
+
+
+def normalize_name(value):
+    """Casefold, strip accents and collapse whitespace: '  ÉMILE  Zola' -> 'emile zola'"""
+    value = unicodedata.normalize('NFKD', str(value or ''))
+    value = ''.join(ch for ch in value if not unicodedata.combining(ch))
+    return ' '.join(value.casefold().split())
+
+
+def name_tokens(*parts):
+    tokens = []
+    for part in parts:
+        tokens.extend(normalize_name(part).split())
+    return tokens
+
+
+def name_key(*parts):
+    """Order independent key, 'Zola Émile' and 'emile zola' share the key 'emile zola'"""
+    return ' '.join(sorted(name_tokens(*parts)))[:NAME_KEY_MAX_LENGTH]
+
+
+def find_persons_by_name(fullname, queryset=None, max_tokens=6):
+    """
+    Return [(person, score), ...] best match first for a typed full name.
+    Scores: 3 complete name, 2 first and last name, 1 first and last name among
+    other words, plus 0.5 when typed in "first last" order.
+    Matching runs on the indexed Person.nameKey (first + last) and
+    Person.fullNameKey (first + middle + last) columns, so it ignores case,
+    accents, extra whitespace and name order, and a typed middle name may be
+    left out or included.
+    """
+    from .models import Person
+
+    tokens = name_tokens(fullname)[:max_tokens]
+    if not tokens:
+        return []
+    typed_key = ' '.join(sorted(tokens))
+    # the typed name may carry a middle name (or two), try every first/last pair
+    pair_keys = {' '.join(sorted(pair)) for pair in combinations(tokens, 2)} if len(tokens) > 2 else set()
+
+    if queryset is None:
+        queryset = Person.objects.all()
+    persons = queryset.filter(Q(nameKey__in={typed_key, *pair_keys}) | Q(fullNameKey=typed_key))
+
+    ranked = []
+    for person in persons:
+        if person.fullNameKey == typed_key:
+            score = 3 #every name typed, middle name included
+        elif person.nameKey == typed_key:
+            score = 2 #first and last name typed, middle name left out
+        else:
+            score = 1 #first and last name found among extra words
+            extra = set(tokens) - set(person.nameKey.split())
+            if extra and extra <= set(name_tokens(person.middleName)):
+                score += 1 #the extra words are part of the middle name
+        # typed in the natural "first last" order
+        if name_tokens(person.firstName)[:1] == tokens[:1]:
+            score += 0.5
+        ranked.append((person, score))
+    ranked.sort(key=lambda item: (-item[1], item[0].id))
+    return ranked
+
+
+def birth_month_day(dob):
+    """Month-day key of a birth date, 19 October -> 1019"""
+    return dob.month * 100 + dob.day if dob else 0
+
+
+def birthday_filter(start, days=1):
+    """
+    Q on birthMonthDay for birthdays in the days days from start on, one
+    index range, or two when the window runs over the new year.
+    Outside leap years 29 February birthdays are celebrated on the 28th.
+    """
+    if days >= 366:
+        return Q(birthMonthDay__gt=0)
+    end = start + timedelta(days=days - 1)
+    first, last = birth_month_day(start), birth_month_day(end)
+    if first <= last:
+        q = Q(birthMonthDay__gte=first, birthMonthDay__lte=last)
+    else:
+        q = Q(birthMonthDay__gte=first) | Q(birthMonthDay__lte=last)
+    for year in {start.year, end.year}:
+        if not calendar.isleap(year) and start <= date(year, 2, 28) <= end:
+            q |= Q(birthMonthDay=229)
+    return q
+
+
+def upcoming_birthday_order(start):
+    """order_by() arguments listing birthdays from start on, those after the new year last"""
+    wrapped = Case(When(birthMonthDay__lt=birth_month_day(start), then=Value(1)),
+                   default=Value(0), output_field=IntegerField())
+    return (wrapped, 'birthMonthDay', 'firstName', 'lastName', 'id')
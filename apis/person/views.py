@@ -3,6 +3,7 @@ from .serializers import PersonSerializers
 from django.shortcuts import render
 from rest_framework import status
 from rest_framework.reverse import reverse
+from apis.pagination import PersonPagination
 from rest_framework import generics
 from rest_framework.response import Response
 from rest_framework import filters
@@ -24,6 +25,7 @@ class PersonList(generics.ListAPIView):
     permission_classes = [IsAuthenticated, IsInGroup,]
     required_groups = requiredGroups(permission='view_person')
     name = 'person-list'
+    pagination_class = PersonPagination
 
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     
@@ -1,6 +1,22 @@
+import atexit
+from concurrent.futures import ThreadPoolExecutor
 from django.apps import AppConfig
+from django.conf import settings
+
+# report jobs get their own pool so a long export never holds up the
+# storage and messaging tasks queued on user.apps.executor
+executor = None
 
 
 class ReportConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'report'
+
+    def ready(self):
+        global executor
+        executor = ThreadPoolExecutor(max_workers=settings.REPORT_JOB_WORKERS, thread_name_prefix='report-job')
+        atexit.register(self.cleanup)
+
+    def cleanup(self):
+        if executor:
+            executor.shutdown(wait=False)
@@ -0,0 +1,179 @@
+import datetime
+import tempfile
+from datetime import timedelta
+from itertools import chain, islice
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+from attendance.models import Attendance
+from faces.apps import FacesConfig
+from .models import ExportDeltaFile, ExportWatermark
+from .rows import TEXT_FORMATS, column, naive, report_rows, write_export
+from .xlsx import CHUNK_SIZE, xlsx_response
+
+STORAGE_FOLDER = 'reports'
+SHEET_TITLE = 'Church Attendance'
+FILENAME = 'attendance_delta'
+# AttendanceId comes first and LastModified last, the watermark is read off the last row written.
+# Changed rows come back with the id they were exported with, consumers replace them.
+COLUMNS = (
+    column('AttendanceId', 'id'),
+    column('FirstName', 'personId__firstName'),
+    column('LastName', 'personId__lastName'),
+    column('Service', 'servicesId__eventName'),
+    column('CaptureMethod', 'captureMethodId__method'),
+    column('CheckInTimestamp', 'checkInTimestamp', naive),
+    column('CheckOutTimestamp', 'checkOutTimestamp', naive),
+    column('Remark', 'comment'),
+    column('LastModified', 'lastModified', naive),
+)
+
+
+def delta_queryset(watermark, until):
+    """Attendance changed after the watermark and no later than until, in watermark order"""
+    queryset = Attendance.objects.filter(lastModified__lte=until)
+    if watermark.lastModified is not None:
+        queryset = queryset.filter(Q(lastModified__gt=watermark.lastModified) |
+                                   Q(lastModified=watermark.lastModified, id__gt=watermark.lastId))
+    return queryset.order_by('lastModified', 'id')
+
+
+class Tracked:
+    """Passes export rows through, counting them and keeping the last one"""
+    def __init__(self, rows):
+        self.rows = rows
+        self.count = 0
+        self.last = None
+
+    def __iter__(self):
+        for row in self.rows:
+            self.count += 1
+            self.last = row
+            yield row
+
+    def position(self):
+        # naive() dropped the offset of a UTC value (USE_TZ), put it back
+        return self.last[-1].replace(tzinfo=datetime.timezone.utc), self.last[0]
+
+
+class ExportConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'Another export of this consumer finished first, export again for the rows after it.'
+    default_code = 'export_conflict'
+
+
+def export_delta(consumer, export_format, append=False, reset=False):
+    """
+    Export the attendance rows added or changed since the consumer's watermark
+    to a file of their own and move the watermark past them. append=True adds
+    the file to the consumer's series (watermark.files, the manifest), any
+    other export starts a new series, reset=True from the first row; the
+    series is downloaded as one file with series_response(). Rows
+    changed in the last EXPORT_WATERMARK_LAG seconds wait for the next export,
+    a transaction still open when the export runs may commit them with an
+    earlier timestamp. Deleted rows are not reported.
+
+    The rows are written and uploaded without holding the watermark, it is
+    only locked to be advanced. An export that finds it moved meanwhile by
+    another one throws its file away and raises ExportConflict.
+    Returns the updated ExportWatermark.
+    """
+    until = timezone.now() - timedelta(seconds=settings.EXPORT_WATERMARK_LAG)
+    storage = FacesConfig.storage
+    watermark, _ = ExportWatermark.objects.get_or_create(consumer=consumer)
+    seen = watermark.updated
+    if reset:
+        watermark.lastModified, watermark.lastId, append = None, 0, False
+    append = append and watermark.files.exists()
+    if append and watermark.exportFormat != export_format:
+        raise ValidationError({"format": f"The previous export of {consumer} is {watermark.exportFormat}, "
+                                         "append needs the same format."})
+
+    rows = iter(report_rows(delta_queryset(watermark, until), COLUMNS))
+    first = next(rows, None)
+    if first is None and append:
+        # nothing new, the series is still current
+        ExportWatermark.objects.filter(pk=watermark.pk, updated=seen).update(lastRows=0)
+        watermark.refresh_from_db()
+        return watermark
+    rows = Tracked(chain([first], rows) if first is not None else rows)
+
+    headers = [header for header, _, _ in COLUMNS]
+    with tempfile.TemporaryFile() as tmp:
+        content_type, extension = write_export(tmp, export_format, SHEET_TITLE, headers, rows)
+        tmp.seek(0)
+        artifact = File(tmp, name=f'{FILENAME}.{extension}')
+        artifact.content_type = content_type
+        path = storage.upload_file(artifact, folder=STORAGE_FOLDER)
+
+    with transaction.atomic():
+        current = ExportWatermark.objects.select_for_update().get(pk=watermark.pk)
+        moved = current.updated != seen
+        if not moved:
+            if rows.last is not None:
+                current.lastModified, current.lastId = rows.position()
+            else:
+                current.lastModified, current.lastId = watermark.lastModified, watermark.lastId
+            if not append:
+                for replaced in current.files.values_list('path', flat=True):
+                    storage.schedule_delete(replaced)
+                current.files.all().delete()
+            ExportDeltaFile.objects.create(watermark=current, path=path, contentType=content_type,
+                                           rows=rows.count, lastModified=current.lastModified,
+                                           lastId=current.lastId)
+            current.totalRows = (current.totalRows if append else 0) + rows.count
+            current.lastRows = rows.count
+            current.exportFormat = export_format
+            current.path = path
+            current.contentType = content_type
+            current.save()
+    if moved:
+        storage.schedule_delete(path)
+        raise ExportConflict()
+    return current
+
+
+def series_body(watermark):
+    """Byte chunks of a csv/ndjson series, its files read back in export order, csv keeps the first header"""
+    storage = FacesConfig.storage
+    for index, path in enumerate(watermark.files.values_list('path', flat=True)):
+        with storage.open_file(path) as file:
+            if index and watermark.exportFormat == 'csv':
+                file.readline()
+            while chunk := file.read(CHUNK_SIZE):
+                yield chunk
+
+
+def series_rows(watermark):
+    """Rows of an xlsx series, every file's sheet after its header row, in export order"""
+    # openpyxl is only loaded by processes that read a workbook
+    from openpyxl import load_workbook
+
+    storage = FacesConfig.storage
+    for path in watermark.files.values_list('path', flat=True):
+        with storage.open_file(path) as file:
+            workbook = load_workbook(file, read_only=True)
+            try:
+                yield from islice(workbook.active.iter_rows(values_only=True), 1, None)
+            finally:
+                workbook.close()
+
+
+def series_response(watermark):
+    """
+    The consumer's series (the files of the manifest) as one download: csv and
+    ndjson files are streamed one after the other, xlsx rows are written into
+    a single workbook.
+    """
+    if watermark.exportFormat in TEXT_FORMATS:
+        _, content_type = TEXT_FORMATS[watermark.exportFormat]
+        response = StreamingHttpResponse(series_body(watermark), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{FILENAME}.{watermark.exportFormat}"'
+        return response
+    headers = [header for header, _, _ in COLUMNS]
+    return xlsx_response(SHEET_TITLE, headers, series_rows(watermark), f'{FILENAME}.xlsx')
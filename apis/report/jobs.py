@@ -0,0 +1,134 @@
+import hashlib
+import json
+import logging
+import os
+import socket
+import tempfile
+import uuid
+from datetime import timedelta
+from django.conf import settings
+from django.core.files import File
+from django.db import close_old_connections, transaction
+from django.db.models import Exists, OuterRef
+from django.http import HttpRequest, QueryDict
+from django.utils import timezone
+from rest_framework.request import Request
+from faces.apps import FacesConfig
+from .models import ReportJob
+from .rows import report_rows, write_export
+
+logger = logging.getLogger(__name__)
+
+STORAGE_FOLDER = 'reports'
+# rows between two progress updates of a running job
+PROGRESS_EVERY = 2000
+# tells this run of the process apart from an earlier one that had the same pid
+BOOT_ID = uuid.uuid4().hex[:12]
+
+
+def params_key(report, export_format, params):
+    payload = json.dumps([report, export_format, params], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def report_view(view_cls, params):
+    """An instance of the report view set up as if it had received params as its query string"""
+    http_request = HttpRequest()
+    http_request.method = 'GET'
+    http_request.GET = QueryDict(mutable=True)
+    for name, value in params.items():
+        if isinstance(value, (list, tuple)):
+            http_request.GET.setlist(name, [str(v) for v in value])
+        else:
+            http_request.GET[name] = str(value)
+    return view_cls(request=Request(http_request), format_kwarg=None, args=(), kwargs={})
+
+
+def build_queryset(view):
+    return view.filter_queryset(view.get_queryset())
+
+
+def worker_id():
+    """The process jobs are queued in, forked workers each get their own"""
+    return f'{socket.gethostname()}:{os.getpid()}:{BOOT_ID}'
+
+
+def fail_stale_jobs():
+    """
+    Fail the jobs that died with their worker process (restart, crash), the
+    executor queue lives in it. A running job is dead without a heartbeat for
+    REPORT_JOB_STALE_AFTER seconds. A pending job may wait that long behind
+    long exports, it is only dead once no running job of its worker has a
+    heartbeat either: the queue only waits while the workers are busy.
+    """
+    since = timezone.now() - timedelta(seconds=settings.REPORT_JOB_STALE_AFTER)
+    stopped = {'status': ReportJob.STATUS_FAILED, 'finished': timezone.now(),
+               'error': 'The report worker stopped before the job finished, request it again'}
+    failed = (ReportJob.objects.filter(status=ReportJob.STATUS_RUNNING, heartbeat__lt=since)
+              .update(**stopped))
+    busy = ReportJob.objects.filter(worker=OuterRef('worker'), status=ReportJob.STATUS_RUNNING,
+                                    heartbeat__gte=since)
+    return failed + (ReportJob.objects.filter(status=ReportJob.STATUS_PENDING, heartbeat__lt=since)
+                     .exclude(worker=worker_id()).filter(~Exists(busy)).update(**stopped))
+
+
+def reusable_job(key):
+    """A job for the same request still within REPORT_JOB_TTL, finished or still alive"""
+    fail_stale_jobs()
+    since = timezone.now() - timedelta(seconds=settings.REPORT_JOB_TTL)
+    return (ReportJob.objects.filter(paramsKey=key, created__gte=since)
+            .exclude(status=ReportJob.STATUS_FAILED).first())
+
+
+def submit(job):
+    """Hand the job to the report workers once the row creating it is committed"""
+    from . import apps
+    transaction.on_commit(lambda: apps.executor.submit(run_job, job.id))
+
+
+def counted(rows, job_id):
+    done = 0
+    for row in rows:
+        yield row
+        done += 1
+        if done % PROGRESS_EVERY == 0:
+            ReportJob.objects.filter(pk=job_id).update(progress=done, heartbeat=timezone.now())
+
+
+def run_job(job_id):
+    from .views import REPORT_VIEWS
+    close_old_connections()
+    try:
+        # a job failed as stale while it waited in the queue has been requested again
+        if not (ReportJob.objects.filter(pk=job_id, status=ReportJob.STATUS_PENDING)
+                .update(status=ReportJob.STATUS_RUNNING, heartbeat=timezone.now())):
+            return
+        job = ReportJob.objects.get(pk=job_id)
+
+        view = report_view(REPORT_VIEWS[job.report], job.params)
+        queryset = build_queryset(view)
+        job.totalRows = queryset.count()
+        job.heartbeat = timezone.now()
+        job.save(update_fields=['totalRows', 'heartbeat'])
+
+        headers = [header for header, _, _ in view.columns]
+        rows = counted(report_rows(queryset, view.columns), job.id)
+        gzip = str(job.params.get('gzip', '')).lower() in ('true', '1')
+        with tempfile.TemporaryFile() as tmp:
+            content_type, extension = write_export(tmp, job.exportFormat, view.sheet_title, headers, rows, gzip)
+            tmp.seek(0)
+            artifact = File(tmp, name=f'{view.filename}.{extension}')
+            artifact.content_type = content_type
+            job.path = FacesConfig.storage.upload_file(artifact, folder=STORAGE_FOLDER)
+
+        job.contentType = content_type
+        job.progress = job.totalRows
+        job.status = ReportJob.STATUS_DONE
+        job.finished = timezone.now()
+        job.save(update_fields=['path', 'contentType', 'progress', 'status', 'finished'])
+    except Exception as e:
+        logger.exception("Report job %s failed", job_id)
+        ReportJob.objects.filter(pk=job_id).update(status=ReportJob.STATUS_FAILED, error=str(e),
+                                                   finished=timezone.now())
+    finally:
+        close_old_connections()
@@ -0,0 +1,26 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from faces.apps import FacesConfig
+from report.models import ReportJob
+
+
+class Command(BaseCommand):
+    """
+    Delete report jobs and their stored files once nobody can be handed them
+    any more. Meant to run periodically, e.g.
+        python manage.py purge_report_jobs --hours 24
+    """
+    help = 'Remove old report jobs and their exported files'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=24,
+                            help='keep jobs created within this many hours (links handed out stay valid)')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options['hours'])
+        jobs = ReportJob.objects.filter(created__lt=cutoff)
+        paths = [path for path in jobs.values_list('path', flat=True) if path]
+        deleted, _ = jobs.delete()
+        FacesConfig.storage.delete_files(paths)
+        self.stdout.write(self.style.SUCCESS(f'Removed {deleted} report jobs and {len(paths)} files'))
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-19 18:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('report', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('consumer', models.SlugField(max_length=64, unique=True)),
+                ('lastModified', models.DateTimeField(blank=True, null=True)),
+                ('lastId', models.BigIntegerField(default=0)),
+                ('exportFormat', models.CharField(default='xlsx', max_length=8)),
+                ('path', models.CharField(blank=True, default='', max_length=500)),
+                ('contentType', models.CharField(blank=True, default='', max_length=100)),
+                ('totalRows', models.IntegerField(default=0)),
+                ('lastRows', models.IntegerField(default=0)),
+                ('updated', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ('consumer',),
+            },
+        ),
+        migrations.CreateModel(
+            name='ExportDeltaFile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('path', models.CharField(max_length=500)),
+                ('contentType', models.CharField(blank=True, default='', max_length=100)),
+                ('rows', models.IntegerField(default=0)),
+                ('lastModified', models.DateTimeField(blank=True, null=True)),
+                ('lastId', models.BigIntegerField(default=0)),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('watermark', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='files', to='report.exportwatermark')),
+            ],
+            options={
+                'ordering': ('watermark', 'id'),
+            },
+        ),
+    ]
@@ -0,0 +1,85 @@
+from django.db import models
+from django.conf import settings
+from django.utils import timezone
+
+
+class ReportJob(models.Model):
+    """A report export built in the background, see report/jobs.py"""
+    STATUS_PENDING = 'PENDING'
+    STATUS_RUNNING = 'RUNNING'
+    STATUS_DONE = 'DONE'
+    STATUS_FAILED = 'FAILED'
+    STATUSES = [
+        (STATUS_PENDING, 'PENDING'),
+        (STATUS_RUNNING, 'RUNNING'),
+        (STATUS_DONE, 'DONE'),
+        (STATUS_FAILED, 'FAILED'),
+    ]
+    report = models.CharField(max_length=64)
+    exportFormat = models.CharField(max_length=8, default='xlsx')
+    params = models.JSONField(default=dict, blank=True)
+    # sha256 of report, format and params, identical requests share an artifact
+    paramsKey = models.CharField(max_length=64, db_index=True)
+    status = models.CharField(max_length=16, choices=STATUSES, default=STATUS_PENDING)
+    totalRows = models.IntegerField(null=True, blank=True)
+    progress = models.IntegerField(default=0)
+    path = models.CharField(max_length=500, blank=True, default='')
+    contentType = models.CharField(max_length=100, blank=True, default='')
+    error = models.TextField(blank=True, default='')
+    requestedBy = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+    created = models.DateTimeField(auto_now_add=True, db_index=True)
+    finished = models.DateTimeField(null=True, blank=True)
+    # last sign of life of a job, set when it is queued and bumped on start and with every progress update
+    heartbeat = models.DateTimeField(default=timezone.now)
+    # process whose executor the job was queued on (report.jobs.worker_id)
+    worker = models.CharField(max_length=128, blank=True, default='')
+
+    class Meta:
+        ordering = ('-created',)
+    def __str__(self):
+        return f'{self.report} {self.exportFormat} {self.status}'
+
+
+class ExportWatermark(models.Model):
+    """
+    How far one consumer (e.g. "finance") has read the attendance table with
+    delta exports, see report/delta.py. The next export returns rows whose
+    (lastModified, id) comes after (lastModified, lastId).
+    """
+    consumer = models.SlugField(max_length=64, unique=True)
+    lastModified = models.DateTimeField(null=True, blank=True)
+    lastId = models.BigIntegerField(default=0)
+    exportFormat = models.CharField(max_length=8, default='xlsx')
+    # latest delta file, every file of the series is an ExportDeltaFile
+    path = models.CharField(max_length=500, blank=True, default='')
+    contentType = models.CharField(max_length=100, blank=True, default='')
+    totalRows = models.IntegerField(default=0)
+    lastRows = models.IntegerField(default=0)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ('consumer',)
+    def __str__(self):
+        return f'{self.consumer} {self.lastModified} {self.lastId}'
+
+
+class ExportDeltaFile(models.Model):
+    """
+    One delta export of a consumer, stored as its own object. The files of a
+    watermark are its manifest: append=true exports add to it, any other
+    export starts it over. report/delta.py series_response() joins them
+    back into one download.
+    """
+    watermark = models.ForeignKey(ExportWatermark, on_delete=models.CASCADE, related_name='files')
+    path = models.CharField(max_length=500)
+    contentType = models.CharField(max_length=100, blank=True, default='')
+    rows = models.IntegerField(default=0)
+    # watermark position after the file's last row
+    lastModified = models.DateTimeField(null=True, blank=True)
+    lastId = models.BigIntegerField(default=0)
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ('watermark', 'id')
+    def __str__(self):
+        return f'{self.watermark.consumer} {self.path}'
@@ -0,0 +1,132 @@
+import csv
+import json
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from django.utils.text import compress_sequence
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from apis.renderers import CSVRenderer, NDJSONRenderer, XLSXRenderer
+from .xlsx import XLSX_CONTENT_TYPE, write_workbook, xlsx_response
+
+CHUNK_SIZE = 2000
+# rows joined into one chunk of the streamed csv/ndjson body
+LINES_PER_CHUNK = 500
+
+
+def naive(value):
+    """openpyxl cannot write aware datetimes, the reports drop the offset"""
+    return value.replace(tzinfo=None) if value is not None else None
+
+
+def report_rows(queryset, columns, chunk_size=CHUNK_SIZE):
+    """
+    Yield one list of cell values per row for columns [(header, path, convert)].
+    Every path is a values_list() lookup (related fields included), so the
+    whole report is a single query read in chunks of chunk_size rows.
+    A column with path None is the running serial number.
+    """
+    paths = [path for _, path, _ in columns if path is not None]
+    sn = 0
+    for values in queryset.values_list(*paths).iterator(chunk_size=chunk_size):
+        sn += 1
+        # union querysets append their ORDER BY columns after the requested ones
+        values = iter(values)
+        row = []
+        for _, path, convert in columns:
+            value = sn if path is None else next(values)
+            row.append(convert(value) if convert is not None else value)
+        yield row
+
+
+def column(header, path=None, convert=None):
+    return (header, path, convert)
+
+
+class Echo:
+    """File-like object handing back what csv.writer writes"""
+    def write(self, value):
+        return value
+
+
+def csv_lines(headers, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(headers)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def ndjson_lines(headers, rows):
+    for row in rows:
+        yield json.dumps(dict(zip(headers, row)), cls=DjangoJSONEncoder) + '\n'
+
+
+def chunked(lines, size=LINES_PER_CHUNK):
+    chunk = []
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) >= size:
+            yield ''.join(chunk).encode('utf-8')
+            chunk = []
+    if chunk:
+        yield ''.join(chunk).encode('utf-8')
+
+
+# ?format= -> (line generator, content type) of the formats written row by row
+TEXT_FORMATS = {
+    'csv': (csv_lines, 'text/csv; charset=utf-8'),
+    'ndjson': (ndjson_lines, 'application/x-ndjson'),
+}
+
+
+def text_body(export_format, headers, rows, gzip=False):
+    """(byte chunks, content type, file extension) of a csv/ndjson export"""
+    lines, content_type = TEXT_FORMATS[export_format]
+    body = chunked(lines(headers, rows))
+    if gzip:
+        return compress_sequence(body), 'application/gzip', f'{export_format}.gz'
+    return body, content_type, export_format
+
+
+def stream_response(export_format, headers, rows, filename, gzip=False):
+    """Stream a csv/ndjson export as a download, optionally gzip compressed on the fly"""
+    body, content_type, extension = text_body(export_format, headers, rows, gzip)
+    response = StreamingHttpResponse(body, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{extension}"'
+    return response
+
+
+def write_export(file, export_format, title, headers, rows, gzip=False):
+    """Write a whole export into file (background report jobs), returns (content type, file extension)"""
+    if export_format in TEXT_FORMATS:
+        body, content_type, extension = text_body(export_format, headers, rows, gzip)
+        for chunk in body:
+            file.write(chunk)
+        return content_type, extension
+    write_workbook(file, title, headers, rows)
+    return XLSX_CONTENT_TYPE, 'xlsx'
+
+
+class ReportExportMixin:
+    """
+    List view exporting the filtered queryset as ?format=xlsx (the default),
+    csv or ndjson. csv and ndjson are written while the query is read and
+    sent as they are produced, ?gzip=true compresses them.
+    Views set columns, sheet_title and filename (without extension).
+    """
+    columns = ()
+    sheet_title = None
+    filename = None
+    renderer_classes = [*api_settings.DEFAULT_RENDERER_CLASSES, XLSXRenderer, CSVRenderer, NDJSONRenderer]
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(queryset=self.get_queryset()) #still filter
+        headers = [header for header, _, _ in self.columns]
+        rows = report_rows(queryset, self.columns)
+        export_format = getattr(request.accepted_renderer, 'format', None)
+        gzip = request.query_params.get('gzip', '').lower() in ('true', '1')
+        try:
+            if export_format in TEXT_FORMATS:
+                return stream_response(export_format, headers, rows, self.filename, gzip)
+            return xlsx_response(self.sheet_title, headers, rows, f'{self.filename}.xlsx')
+        except Exception as e:
+            return Response({"error": str(e)}, status=500)
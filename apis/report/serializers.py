@@ -0,0 +1,55 @@
+from rest_framework import serializers
+from faces.apps import FacesConfig
+from .models import ExportDeltaFile, ExportWatermark, ReportJob
+
+
+class ReportJobRequestSerializer(serializers.Serializer):
+    report = serializers.CharField(max_length=64)
+    # query parameters of the report endpoint: filters, search, ordering, format, gzip
+    params = serializers.DictField(required=False, default=dict)
+
+
+class ReportJobSerializer(serializers.ModelSerializer):
+    download = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ReportJob
+        fields = ('id', 'report', 'exportFormat', 'params', 'status', 'totalRows', 'progress',
+                  'error', 'created', 'finished', 'heartbeat', 'download')
+
+    def get_download(self, obj):
+        if obj.status != ReportJob.STATUS_DONE:
+            return None
+        return FacesConfig.storage.get_url(obj.path)
+
+
+class AttendanceDeltaRequestSerializer(serializers.Serializer):
+    consumer = serializers.SlugField(max_length=64)
+    format = serializers.ChoiceField(choices=['xlsx', 'csv', 'ndjson'], default='xlsx')
+    append = serializers.BooleanField(default=False)
+    reset = serializers.BooleanField(default=False)
+
+
+class ExportDeltaFileSerializer(serializers.ModelSerializer):
+    download = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ExportDeltaFile
+        fields = ('rows', 'lastModified', 'lastId', 'created', 'download')
+
+    def get_download(self, obj):
+        return FacesConfig.storage.get_url(obj.path)
+
+
+class ExportWatermarkSerializer(serializers.ModelSerializer):
+    download = serializers.SerializerMethodField()
+    # the manifest, every file of the series in export order
+    files = ExportDeltaFileSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = ExportWatermark
+        fields = ('consumer', 'exportFormat', 'lastModified', 'lastId', 'totalRows', 'lastRows',
+                  'updated', 'download', 'files')
+
+    def get_download(self, obj):
+        return FacesConfig.storage.get_url(obj.path)
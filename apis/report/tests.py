@@ -1,3 +1,249 @@
-from django.test import TestCase
+import datetime
+import gzip
+import json
+from io import BytesIO
+from unittest import mock
+from django.conf import settings
+from django.test import SimpleTestCase, override_settings
+from django.utils import timezone
+from openpyxl import load_workbook
+from rest_framework.test import APIRequestFactory, force_authenticate
+from attendance.models import Attendance
+from contact.models import Contact
+from faces.apps import FacesConfig
+from household.models import HouseHold
+from user.models import User
+from apis.testing import ApiTestCase
+from .delta import ExportConflict, export_delta
+from .jobs import run_job
+from .models import ExportWatermark, ReportJob
+from .xlsx import XLSX_CONTENT_TYPE, column_widths, xlsx_response
+from .views import (AttendanceList, ContactList, HouseHoldList, PersonList, UserList, CreateReportJob, ReportJobDetail,
+                    AttendanceDeltaDownload)
 
-# Create your tests here.
+ROWS = 25
+
+
+class ReportQueryCountTests(ApiTestCase):
+    """Every export costs the same few queries whatever the number of rows"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        # ROWS persons with a household, contact, check-in and user on top of the fixture's admin
+        for n in range(ROWS):
+            household = HouseHold.objects.create(name=f'House {n}', address='1 Main St')
+            person = cls.create_person(cls.church, f'First{n}', f'Last{n}', householdId=household,
+                                       email=f'p{n}@example.com')
+            Contact.objects.create(personId=person, householdId=household, phone='0800000000',
+                                   email=f'p{n}@example.com', address='1 Main St', state='Lagos',
+                                   country='Nigeria', ethnicity='Yoruba')
+            Attendance.objects.create(personId=person, servicesId=cls.service, captureMethodId=cls.form,
+                                      comment=cls.form.description)
+            User.objects.create(username=f'user{n}', email=f'u{n}@example.com', roleId=cls.role, personId=person)
+
+    def export(self, view, query=''):
+        request = APIRequestFactory().get('/' + query)
+        force_authenticate(request, user=self.user)
+        response = view.as_view()(request)
+        self.assertEqual(response.status_code, 200)
+        if query:
+            return b''.join(response.streaming_content)
+        return load_workbook(BytesIO(b''.join(response.streaming_content))).active
+
+    def assertExport(self, view, row, rows=ROWS):
+        # one query for the group permission check, one for the rows
+        with self.assertNumQueries(2):
+            sheet = self.export(view)
+        self.assertEqual(sheet.max_row, rows + 1)
+        # the running serial number aside
+        self.assertIn(row, [list(values[1:len(row) + 1]) for values in sheet.iter_rows(min_row=2, values_only=True)])
+
+    def test_attendance_report(self):
+        self.assertExport(AttendanceList, ['First0', 'Last0', 'Sunday Service', 'FORM'])
+
+    def test_person_report(self):
+        self.assertExport(PersonList, ['Grace', 'House 0', 'member', 'First0'], ROWS + 1)
+
+    def test_contact_report(self):
+        self.assertExport(ContactList, ['First0', 'Last0', '1 Main St', 'House 0'])
+
+    def test_user_report(self):
+        self.assertExport(UserList, ['First0', 'Last0', 'user0', 'u0@example.com', 'admin'], ROWS + 1)
+
+    def test_household_report(self):
+        self.assertExport(HouseHoldList, ['House 0', '1 Main St'])
+
+    def test_csv_export(self):
+        with self.assertNumQueries(2):
+            body = self.export(PersonList, '?format=csv&gzip=true')
+        lines = gzip.decompress(body).decode().splitlines()
+        self.assertEqual(len(lines), ROWS + 2)
+        self.assertIn('Grace,House 0,member,First0', lines[2])
+
+    def test_ndjson_export(self):
+        with self.assertNumQueries(2):
+            body = self.export(AttendanceList, '?format=ndjson')
+        rows = [json.loads(line) for line in body.decode().splitlines()]
+        self.assertEqual(len(rows), ROWS)
+        self.assertEqual(rows[0]['FirstName'], 'First0')
+
+
+class XlsxTests(SimpleTestCase):
+
+    def test_column_widths_follow_the_sample(self):
+        self.assertEqual(column_widths(['Id', 'Name'], [[1, 'Ada'], [22, None], [3, 'x' * 100]]), [4, 60])
+
+    def test_rows_past_the_sample_are_written(self):
+        rows = ([n, f'Name{n}'] for n in range(450))
+        response = xlsx_response('Persons', ['Id', 'Name'], rows, 'persons.xlsx')
+        self.assertEqual(response['Content-Type'], XLSX_CONTENT_TYPE)
+        self.assertIn('attachment; filename="persons.xlsx"', response['Content-Disposition'])
+        sheet = load_workbook(BytesIO(b''.join(response.streaming_content)))['Persons']
+        self.assertEqual(sheet.max_row, 451)
+        self.assertEqual([cell.value for cell in sheet[451]], [449, 'Name449'])
+        self.assertTrue(sheet['A1'].font.bold)
+        self.assertEqual(sheet.column_dimensions['B'].width, 9)
+
+
+class ReportJobTests(ApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.use_temporary_media()
+        for patcher in (mock.patch('report.apps.executor', mock.Mock(submit=lambda fn, *args: fn(*args))),
+                        mock.patch('report.jobs.close_old_connections')):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.body = {'report': 'person-report', 'params': {'format': 'csv'}}
+
+    def request_job(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.call(CreateReportJob, 'post', self.body)
+
+    def test_job_is_built_and_reused(self):
+        response = self.request_job()
+        self.assertEqual(response.status_code, 202)
+        job = ReportJob.objects.get(pk=response.data['id'])
+        self.assertEqual((job.status, job.totalRows, job.progress), (ReportJob.STATUS_DONE, 1, 1))
+        response = self.request_job()
+        self.assertEqual((response.status_code, response.data['id']), (200, job.id))
+
+    def queued_job(self, **fields):
+        with mock.patch('report.views.submit'):
+            job = self.call(CreateReportJob, 'post', self.body).data['id']
+        ReportJob.objects.filter(pk=job).update(**fields)
+        return job
+
+    def status(self, job):
+        return self.call(ReportJobDetail, id=job).data['status']
+
+    def test_stale_job_is_failed_and_not_reused(self):
+        # the worker running it was restarted
+        first = self.queued_job(status=ReportJob.STATUS_RUNNING, worker='web-1:41:a',
+                                heartbeat=timezone.now() - datetime.timedelta(hours=1))
+        self.assertEqual(self.status(first), ReportJob.STATUS_FAILED)
+        response = self.request_job()
+        self.assertEqual(response.status_code, 202)
+        self.assertNotEqual(response.data['id'], first)
+
+    def test_queued_job_waits_behind_long_exports(self):
+        an_hour_ago = timezone.now() - datetime.timedelta(hours=1)
+        running = self.queued_job(status=ReportJob.STATUS_RUNNING, worker='web-1:41:a')
+        self.body['params']['format'] = 'ndjson'
+        queued = self.queued_job(worker='web-1:41:a', heartbeat=an_hour_ago)
+        self.assertEqual(self.status(queued), ReportJob.STATUS_PENDING)
+        # its worker stopped too
+        ReportJob.objects.filter(pk=running).update(heartbeat=an_hour_ago)
+        self.assertEqual(self.status(queued), ReportJob.STATUS_FAILED)
+
+    def test_jobs_queued_in_this_process_are_alive(self):
+        queued = self.queued_job(heartbeat=timezone.now() - datetime.timedelta(hours=1))
+        self.assertEqual(self.status(queued), ReportJob.STATUS_PENDING)
+
+    def test_failed_job_is_not_run(self):
+        with mock.patch('report.views.submit'):
+            job = ReportJob.objects.get(pk=self.call(CreateReportJob, 'post', self.body).data['id'])
+        ReportJob.objects.filter(pk=job.pk).update(status=ReportJob.STATUS_FAILED)
+        run_job(job.pk)
+        self.assertEqual(ReportJob.objects.get(pk=job.pk).status, ReportJob.STATUS_FAILED)
+
+
+@override_settings(EXPORT_WATERMARK_LAG=0)
+class DeltaExportTests(ApiTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.use_temporary_media()
+        self.persons = [self.create_person(self.church, f'First{n}', f'Last{n}') for n in range(3)]
+        self.rows = [Attendance.objects.create(personId=person, servicesId=self.service, captureMethodId=self.form)
+                     for person in self.persons[:2]]
+
+    def exported_ids(self, watermark):
+        with open(f'{settings.MEDIA_ROOT}/{watermark.path}') as file:
+            return [int(line.split(',')[0]) for line in file.read().splitlines()[1:]]
+
+    def test_only_new_and_changed_rows(self):
+        watermark = export_delta('finance', 'csv')
+        self.assertEqual(self.exported_ids(watermark), [row.id for row in self.rows])
+        self.assertEqual((watermark.lastId, watermark.totalRows), (self.rows[1].id, 2))
+
+        added = Attendance.objects.create(personId=self.persons[2], servicesId=self.service,
+                                          captureMethodId=self.form)
+        self.rows[0].comment = 'late'
+        self.rows[0].save()
+        watermark = export_delta('finance', 'csv')
+        self.assertEqual(self.exported_ids(watermark), [added.id, self.rows[0].id])
+        self.assertEqual(watermark.files.count(), 1)
+
+    def test_append_keeps_each_delta_as_its_own_file(self):
+        first = export_delta('finance', 'csv').path
+        Attendance.objects.create(personId=self.persons[2], servicesId=self.service, captureMethodId=self.form)
+        watermark = export_delta('finance', 'csv', append=True)
+        self.assertEqual(list(watermark.files.values_list('path', 'rows')), [(first, 2), (watermark.path, 1)])
+        self.assertEqual((watermark.totalRows, watermark.lastRows), (3, 1))
+        # nothing new
+        watermark = export_delta('finance', 'csv', append=True)
+        self.assertEqual((watermark.files.count(), watermark.lastRows), (2, 0))
+        watermark = export_delta('finance', 'csv', reset=True)
+        self.assertEqual((watermark.files.count(), watermark.totalRows), (1, 3))
+
+    def download(self, consumer='finance'):
+        return self.call(AttendanceDeltaDownload, consumer=consumer)
+
+    def test_appended_series_downloads_as_one_file(self):
+        export_delta('finance', 'csv')
+        added = Attendance.objects.create(personId=self.persons[2], servicesId=self.service,
+                                          captureMethodId=self.form)
+        export_delta('finance', 'csv', append=True)
+        lines = b''.join(self.download().streaming_content).decode().splitlines()
+        self.assertEqual(lines[0].split(',')[0], 'AttendanceId')
+        self.assertEqual([int(line.split(',')[0]) for line in lines[1:]], [*(row.id for row in self.rows), added.id])
+
+    def test_xlsx_series_downloads_as_one_sheet(self):
+        export_delta('finance', 'xlsx')
+        added = Attendance.objects.create(personId=self.persons[2], servicesId=self.service,
+                                          captureMethodId=self.form)
+        export_delta('finance', 'xlsx', append=True)
+        response = self.download()
+        self.assertEqual(response['Content-Type'], XLSX_CONTENT_TYPE)
+        sheet = load_workbook(BytesIO(b''.join(response.streaming_content))).active
+        ids = [row[0] for row in sheet.iter_rows(values_only=True)]
+        self.assertEqual(ids, ['AttendanceId', *(row.id for row in self.rows), added.id])
+
+    def test_download_before_the_first_export(self):
+        self.assertEqual(self.download('payroll').status_code, 404)
+
+    def test_export_overtaken_by_another(self):
+        export_delta('finance', 'csv')
+        Attendance.objects.create(personId=self.persons[2], servicesId=self.service, captureMethodId=self.form)
+        upload = FacesConfig.storage.upload_file
+
+        def upload_while_another_export_finishes(*args, **kwargs):
+            ExportWatermark.objects.get(consumer='finance').save()
+            return upload(*args, **kwargs)
+
+        with mock.patch.object(FacesConfig.storage, 'upload_file', upload_while_another_export_finishes):
+            with self.assertRaises(ExportConflict):
+                export_delta('finance', 'csv', append=True)
+        self.assertEqual(ExportWatermark.objects.get(consumer='finance').files.count(), 1)
@@ -23,4 +23,8 @@ urlpatterns = [
     path('contacts-report/', ContactList.as_view(), name='contacts-report'),
     path('persons-report/', PersonList.as_view(), name='person-report'),
     path('users-report/', UserList.as_view(), name='user-report'),
+    path('report-jobs/', CreateReportJob.as_view(), name='create-report-job'),
+    path('report-jobs/<int:id>/', ReportJobDetail.as_view(), name='report-job'),
+    path('attendance-delta/', AttendanceDeltaExport.as_view(), name='attendance-delta-export'),
+    path('attendance-delta/<slug:consumer>/', AttendanceDeltaDownload.as_view(), name='attendance-delta-download'),
 ]
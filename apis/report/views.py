@@ -1,6 +1,7 @@
 from user.models import User
 from user.serializers import UserSerializers
 from attendance.models import Attendance
+from attendance.archive import ArchiveRangeMixin
 from contact.models import Contact
 from contact.serializers import ContactSerializers
 from church.models import Church
@@ -28,42 +29,22 @@ from django.http import HttpResponse
 from role.util import requiredGroups
 from user.permissions import IsInGroup
 from django.http import HttpResponse
-from openpyxl import Workbook
-from openpyxl.styles import Alignment, Font
-from io import BytesIO
-
-
-def addStyles(ws):
-    bold_font = Font(bold=True)
-    for row in ws.iter_rows():
-        for cell in row:
-           cell.alignment = Alignment(wrap_text=True)
-           # Assign the bold_font object to the cell's font attribute
-           cell.font = bold_font
-def adjustWidth(ws):
-        # Iterate over all columns to adjust their widths
-        for col in ws.columns:
-          max_length = 0
-          column_letter = col[0].column_letter # Get the column letter (e.g., 'A', 'B')
-          for cell in col:
-            try:
-            # Check the length of the cell's value
-               if len(str(cell.value)) > max_length:
-                max_length = len(str(cell.value))
-            except TypeError: # Handle cases where cell.value might be None
-              pass
-            # Calculate adjusted width (add a small buffer for visual spacing)
-            adjusted_width = (max_length + 2)
-            # Set the column width
-            ws.column_dimensions[column_letter].width = adjusted_width
+from .rows import ReportExportMixin, TEXT_FORMATS, column, naive
+from .jobs import build_queryset, fail_stale_jobs, params_key, report_view, reusable_job, submit, worker_id
+from .delta import export_delta, series_response
+from .models import ExportWatermark, ReportJob
+from .serializers import (AttendanceDeltaRequestSerializer, ExportWatermarkSerializer,
+                          ReportJobRequestSerializer, ReportJobSerializer)
+
 
 #this generic class will handle GET method to be used by the admin alone
-class AttendanceList(generics.ListAPIView):
+class AttendanceList(ReportExportMixin, ArchiveRangeMixin, generics.ListAPIView):
     queryset = Attendance.objects.all()
     serializer_class = attendanceSerializers
     permission_classes = [IsAuthenticated,IsInGroup]
     required_groups = requiredGroups(permission='view_attendance')
     name = 'attendance-report'
+    ordering = ('comment','attendanceDate')
 
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     
@@ -79,67 +60,23 @@ class AttendanceList(generics.ListAPIView):
     ordering_fields = ('comment','checkInTimestamp','checkOutTimestamp',
                         'personId__id','servicesId__id','captureMethodId__id', 'attendanceDate') 
     
-    def list(self, request, *args, **kwargs):
-        queryset = self.filter_queryset(queryset=self.get_queryset()) #still filter
-        customQueryset = self.getCustomQueryset(queryset)
-        try:
-             # 3. Create an Excel workbook
-              wb = Workbook()
-              ws = wb.active
-              ws.title = "Church Attendance"
-              # Add headers (using serializer field names or custom names)
-              headers =  [
-                 'SN','FirstName','LastName', 'Service','CaptureMethod',
-                 'CheckInTimestamp','CheckOutTimestamp','Remark',
-              ]
-              ws.append(headers)
-              # Add data rows
-              for item in customQueryset:
-                   row_values = [item.get(header) for header in headers] # Or customize based on item keys
-                   ws.append(row_values)
-              #add styles
-              addStyles(ws)
-              adjustWidth(ws)
-              # 4. Save the workbook to a BytesIO buffer
-              excel_buffer = BytesIO()
-              wb.save(excel_buffer)
-              excel_buffer.seek(0) # Rewind the buffer to the beginning
-              # 5. Create an HttpResponse with appropriate headers
-              response = HttpResponse(
-                 excel_buffer.getvalue(),
-                 content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-              )
-              response['Content-Disposition'] = 'attachment; filename="church_attendance.xlsx"'
-              return response
-        except Exception as e:
-            return Response({"error": str(e)}, status=500)
-
-    def getCustomQueryset(self, queryset):
-         data = []
-         count = 1
-         for obj in queryset:
-             capturemethod = CaptureMethod.objects.get(id=obj.captureMethodId.id)
-             person = Person.objects.get(pk=obj.personId.id)
-             service = Services.objects.get(id=obj.servicesId.id)
-             checkout = None
-             if obj.checkOutTimestamp is not None:
-                checkout = obj.checkOutTimestamp.replace(tzinfo=None)
-
-             newObj = {
-                 'SN':count,'FirstName':person.firstName,
-                 'LastName':person.lastName, 'Service': service.eventName,
-                 'CaptureMethod': capturemethod.method,
-                 'CheckInTimestamp': obj.checkInTimestamp.replace(tzinfo=None),
-                 'CheckOutTimestamp': checkout,
-                 'Remark': obj.comment,
-             }
-             data.append(newObj)
-             count = count + 1
-         return data
-    
-
-
-class HouseHoldList(generics.ListAPIView):
+    # one values_list() query for the whole export, ?format=xlsx|csv|ndjson, see report/rows.py
+    sheet_title = "Church Attendance"
+    filename = "church_attendance"
+    columns = (
+        column('SN'),
+        column('FirstName', 'personId__firstName'),
+        column('LastName', 'personId__lastName'),
+        column('Service', 'servicesId__eventName'),
+        column('CaptureMethod', 'captureMethodId__method'),
+        column('CheckInTimestamp', 'checkInTimestamp', naive),
+        column('CheckOutTimestamp', 'checkOutTimestamp', naive),
+        column('Remark', 'comment'),
+    )
+
+
+
+class HouseHoldList(ReportExportMixin, generics.ListAPIView):
     queryset = HouseHold.objects.all()
     serializer_class = HouseHoldSerializers
     permission_classes = [IsAuthenticated,IsInGroup]
@@ -157,57 +94,22 @@ class HouseHoldList(generics.ListAPIView):
     #you can order using the "ordering" keyword
     ordering_fields = ('name','address','head','spouse','children','count') 
 
-    def list(self, request, *args, **kwargs):
-        queryset = self.filter_queryset(queryset=self.get_queryset()) #still filter
-        customQueryset = self.getCustomQueryset(queryset)
-        try:
-             # 3. Create an Excel workbook
-              wb = Workbook()
-              ws = wb.active
-              ws.title = "Church Families"
-              # Add headers (using serializer field names or custom names)
-              headers =  [
-                 'SN','Name','Address', 'Count','Head',
-                 'Spouse','Children',
-              ]
-              ws.append(headers)
-              # Add data rows
-              for item in customQueryset:
-                   row_values = [item.get(header) for header in headers] # Or customize based on item keys
-                   ws.append(row_values)
-              #add styles
-              addStyles(ws)
-              adjustWidth(ws)
-              # 4. Save the workbook to a BytesIO buffer
-              excel_buffer = BytesIO()
-              wb.save(excel_buffer)
-              excel_buffer.seek(0) # Rewind the buffer to the beginning
-              # 5. Create an HttpResponse with appropriate headers
-              response = HttpResponse(
-                 excel_buffer.getvalue(),
-                 content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-              )
-              response['Content-Disposition'] = 'attachment; filename="household_report.xlsx"'
-              return response
-        except Exception as e:
-            return Response({"error": str(e)}, status=500)
-
-    def getCustomQueryset(self, queryset):
-         data = []
-         count = 1
-         for obj in queryset:
-             newObj = {
-                 'SN':count,'Name':obj.name,
-                 'Address':obj.address, 'Count':obj.count,'Head':obj.head,
-                 'Spouse':obj.spouse,'Children':obj.children,
-             }
-             data.append(newObj)
-             count = count + 1
-         return data
-    
+    # one values_list() query for the whole export, ?format=xlsx|csv|ndjson, see report/rows.py
+    sheet_title = "Church Families"
+    filename = "household_report"
+    columns = (
+        column('SN'),
+        column('Name', 'name'),
+        column('Address', 'address'),
+        column('Count', 'count'),
+        column('Head', 'head'),
+        column('Spouse', 'spouse'),
+        column('Children', 'children'),
+    )
 
 
-class UserList(generics.ListAPIView):
+
+class UserList(ReportExportMixin, generics.ListAPIView):
     queryset = User.objects.all()
     serializer_class = UserSerializers
     permission_classes = [IsAuthenticated,IsInGroup]
@@ -225,68 +127,21 @@ class UserList(generics.ListAPIView):
     #you can order using the "ordering" keyword
     ordering_fields =  ('username','email','personId__id','roleId__id') 
 
-    def list(self, request, *args, **kwargs):
-        queryset = self.filter_queryset(queryset=self.get_queryset()) #still filter
-        customQueryset = self.getCustomQueryset(queryset)
-        try:
-             # 3. Create an Excel workbook
-              wb = Workbook()
-              ws = wb.active
-              ws.title = "Users Accounts"
-              # Add headers (using serializer field names or custom names)
-              headers =  [
-                 'SN','FirstName','LastName', 'Username','Email',
-                 'Role',
-              ]
-              ws.append(headers)
-              # Add data rows
-              for item in customQueryset:
-                   row_values = [item.get(header) for header in headers] # Or customize based on item keys
-                   ws.append(row_values)
-              #add styles
-              addStyles(ws)
-              adjustWidth(ws)
-              # 4. Save the workbook to a BytesIO buffer
-              excel_buffer = BytesIO()
-              wb.save(excel_buffer)
-              excel_buffer.seek(0) # Rewind the buffer to the beginning
-              # 5. Create an HttpResponse with appropriate headers
-              response = HttpResponse(
-                 excel_buffer.getvalue(),
-                 content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-              )
-              response['Content-Disposition'] = 'attachment; filename="user_report.xlsx"'
-              return response
-        except Exception as e:
-            return Response({"error": str(e)}, status=500)
-
-    def getCustomQueryset(self, queryset):
-         data = []
-         count = 1
-         for obj in queryset:
-             lastName = None
-             FirstName = None
-             role = None
-             if(obj.personId.id is not None):
-                 person = Person.objects.get(id=obj.personId.id)
-                 lastName = person.lastName
-                 FirstName = person.firstName
-            
-             if(obj.roleId.id is not None):
-                 role = Role.objects.get(id=obj.roleId.id).name
-
-             newObj = {
-                 'SN':count,'FirstName':FirstName,
-                 'LastName':lastName, 'Username':obj.username,
-                 'Email':obj.email, 'Role': role,
-             }
-             data.append(newObj)
-             count = count + 1
-         return data
-
-
-
-class PersonList(generics.ListAPIView):
+    # one values_list() query for the whole export, ?format=xlsx|csv|ndjson, see report/rows.py
+    sheet_title = "Users Accounts"
+    filename = "user_report"
+    columns = (
+        column('SN'),
+        column('FirstName', 'personId__firstName'),
+        column('LastName', 'personId__lastName'),
+        column('Username', 'username'),
+        column('Email', 'email'),
+        column('Role', 'roleId__name'),
+    )
+
+
+
+class PersonList(ReportExportMixin, generics.ListAPIView):
     queryset = Person.objects.all()
     serializer_class = PersonSerializers
     permission_classes = [IsAuthenticated,IsInGroup]
@@ -311,75 +166,26 @@ class PersonList(generics.ListAPIView):
                         'email','entranceDate') 
     
 
-    def list(self, request, *args, **kwargs):
-        queryset = self.filter_queryset(queryset=self.get_queryset()) #still filter
-        customQueryset = self.getCustomQueryset(queryset)
-        try:
-             # 3. Create an Excel workbook
-              wb = Workbook()
-              ws = wb.active
-              ws.title = "Church Members"
-              # Add headers (using serializer field names or custom names)
-              headers =  [
-                 'SN','Church','Household','Membership Status',
-                        'FirstName','LastName','MiddleName','DOB','Phone',
-                        'Email','EntranceDate'
-              ]
-              ws.append(headers)
-              # Add data rows
-              for item in customQueryset:
-                   row_values = [item.get(header) for header in headers] # Or customize based on item keys
-                   ws.append(row_values)
-              #add styles
-              addStyles(ws)
-              adjustWidth(ws)
-              # 4. Save the workbook to a BytesIO buffer
-              excel_buffer = BytesIO()
-              wb.save(excel_buffer)
-              excel_buffer.seek(0) # Rewind the buffer to the beginning
-              # 5. Create an HttpResponse with appropriate headers
-              response = HttpResponse(
-                 excel_buffer.getvalue(),
-                 content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-              )
-              response['Content-Disposition'] = 'attachment; filename="members_report.xlsx"'
-              return response
-        except Exception as e:
-            return Response({"error": str(e)}, status=500)
-
-    def getCustomQueryset(self, queryset):
-         data = []
-         count = 1
-         for obj in queryset:
-             status = None
-             if(obj.membershipId.id is not None):
-                 status = Membership.objects.get(id=obj.membershipId.id).status
-             church = Church.objects.get(id=obj.churchId.id)
-             household = HouseHold.objects.get(id=obj.householdId.id)
-
-             dob = None
-             if obj.dob is not None:
-                dob = obj.dob
-
-             entranceDate = None
-             if obj.entranceDate is not None:
-                entranceDate = obj.entranceDate.replace(tzinfo=None)
-
-             newObj = {
-                 'SN':count,'Church':church.name,
-                 'Household':household.name, 'Membership Status':status,
-                 'FirstName':obj.firstName,
-                 'LastName':obj.lastName, 'MiddleName':obj.middleName,
-                 'DOB':dob, 'Phone':obj.phone,
-                 'Email':obj.email, 'EntranceDate':entranceDate
-             }
-             data.append(newObj)
-             count = count + 1
-         return data
-    
-
-
-class ContactList(generics.ListAPIView):
+    # one values_list() query for the whole export, ?format=xlsx|csv|ndjson, see report/rows.py
+    sheet_title = "Church Members"
+    filename = "members_report"
+    columns = (
+        column('SN'),
+        column('Church', 'churchId__name'),
+        column('Household', 'householdId__name'),
+        column('Membership Status', 'membershipId__status'),
+        column('FirstName', 'firstName'),
+        column('LastName', 'lastName'),
+        column('MiddleName', 'middleName'),
+        column('DOB', 'dob'),
+        column('Phone', 'phone'),
+        column('Email', 'email'),
+        column('EntranceDate', 'entranceDate', naive),
+    )
+
+
+
+class ContactList(ReportExportMixin, generics.ListAPIView):
     queryset = Contact.objects.all()
     serializer_class = ContactSerializers
     permission_classes = [IsAuthenticated,IsInGroup]
@@ -399,57 +205,150 @@ class ContactList(generics.ListAPIView):
     #you can order using the "ordering" keyword
     ordering_fields = ('personId__id','address','householdId__id','email','phone','socialMedia','gender',
                         'ethnicity','state','occupation', 'country','marital_status')
-    def list(self, request, *args, **kwargs):
-        queryset = self.filter_queryset(queryset=self.get_queryset()) #still filter
-        customQueryset = self.getCustomQueryset(queryset)
-        try:
-             # 3. Create an Excel workbook
-              wb = Workbook()
-              ws = wb.active
-              ws.title = "Members Contacts"
-              # Add headers (using serializer field names or custom names)
-              headers =  [
-                 'SN','FirstName','LastName','Address','Household','Email','Phone','SocialMedia','Gender',
-                        'Ethnicity','State','Occupation', 'Country','Marital_Status'
-              ]
-              ws.append(headers)
-              # Add data rows
-              for item in customQueryset:
-                   row_values = [item.get(header) for header in headers] # Or customize based on item keys
-                   ws.append(row_values)
-              #add styles
-              addStyles(ws)
-              adjustWidth(ws)
-              # 4. Save the workbook to a BytesIO buffer
-              excel_buffer = BytesIO()
-              wb.save(excel_buffer)
-              excel_buffer.seek(0) # Rewind the buffer to the beginning
-              # 5. Create an HttpResponse with appropriate headers
-              response = HttpResponse(
-                 excel_buffer.getvalue(),
-                 content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-              )
-              response['Content-Disposition'] = 'attachment; filename="members_contacts.xlsx"'
-              return response
-        except Exception as e:
-            return Response({"error": str(e)}, status=500)
-
-    def getCustomQueryset(self, queryset):
-         data = []
-         count = 1
-         for obj in queryset:
-             person = Person.objects.get(id=obj.personId.id)
-             household = HouseHold.objects.get(id=obj.householdId.id)
-
-             newObj = {
-                 'SN': count, 'FirstName': person.firstName,
-                 'LastName': person.lastName, 'Phone': obj.phone,
-                 'Email': obj.email, 'Address': obj.address,
-                 'Household': household.name, 'SocialMedia': obj.socialMedia,
-                 'Gender': obj.gender, 'Ethnicity': obj.ethnicity,
-                 'State': obj.state, 'Occupation': obj.occupation,
-                 'Country': obj.country, 'Marital_Status': obj.marital_status
-             }
-             data.append(newObj)
-             count = count + 1
-         return data
\ No newline at end of file
+    # one values_list() query for the whole export, ?format=xlsx|csv|ndjson, see report/rows.py
+    sheet_title = "Members Contacts"
+    filename = "members_contacts"
+    columns = (
+        column('SN'),
+        column('FirstName', 'personId__firstName'),
+        column('LastName', 'personId__lastName'),
+        column('Address', 'address'),
+        column('Household', 'householdId__name'),
+        column('Email', 'email'),
+        column('Phone', 'phone'),
+        column('SocialMedia', 'socialMedia'),
+        column('Gender', 'gender'),
+        column('Ethnicity', 'ethnicity'),
+        column('State', 'state'),
+        column('Occupation', 'occupation'),
+        column('Country', 'country'),
+        column('Marital_Status', 'marital_status'),
+    )
+
+
+REPORT_VIEWS = {view.name: view for view in (AttendanceList, HouseHoldList, UserList, PersonList, ContactList)}
+
+
+def check_report_permissions(request, view_cls):
+    """The permissions the report endpoint itself asks for"""
+    view = view_cls()
+    for permission in view.get_permissions():
+        if not permission.has_permission(request, view):
+            raise PermissionDenied()
+
+
+class CreateReportJob(generics.GenericAPIView):
+    """
+    Build a report in the background instead of inside the request.
+
+    Request body:
+    {
+        "report": "attendance-report",
+        "params": {"format": "csv", "gzip": "true", "dateFrom": "2025-01-01"}
+    }
+    report is the name of a report endpoint, params the query parameters it
+    would take (filters, search, ordering, format, gzip).
+    Answers 202 with the new job, or 200 with an identical job submitted in
+    the last REPORT_JOB_TTL seconds whose file is reused.
+    Poll report-jobs/<id>/ for progress and the download link.
+    """
+    serializer_class = ReportJobRequestSerializer
+    permission_classes = [IsAuthenticated]
+    name = 'create-report-job'
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        report = serializer.validated_data['report']
+        view_cls = REPORT_VIEWS.get(report)
+        if view_cls is None:
+            return Response({"error": f"report must be one of {', '.join(REPORT_VIEWS)}"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        check_report_permissions(request, view_cls)
+
+        params = dict(serializer.validated_data['params'])
+        export_format = str(params.pop('format', 'xlsx')).lower()
+        if export_format not in ('xlsx', *TEXT_FORMATS):
+            return Response({"error": f"format must be one of xlsx, {', '.join(TEXT_FORMATS)}"},
+                            status=status.HTTP_400_BAD_REQUEST)
+        # surface bad filters now rather than as a failed job
+        build_queryset(report_view(view_cls, params))
+
+        key = params_key(report, export_format, params)
+        job = reusable_job(key)
+        if job is not None:
+            return Response(ReportJobSerializer(job).data, status=status.HTTP_200_OK)
+
+        job = ReportJob.objects.create(report=report, exportFormat=export_format, params=params,
+                                       paramsKey=key, requestedBy=request.user, worker=worker_id())
+        submit(job)
+        return Response(ReportJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+
+class ReportJobDetail(generics.RetrieveAPIView):
+    """Status, progress (rows written of totalRows) and, once done, the download link of a report job"""
+    queryset = ReportJob.objects.all()
+    serializer_class = ReportJobSerializer
+    permission_classes = [IsAuthenticated]
+    name = 'report-job'
+    lookup_field = 'id'
+
+    def get_object(self):
+        fail_stale_jobs()
+        job = super().get_object()
+        # jobs are shared between identical requests, gate on the report's own permission
+        check_report_permissions(self.request, REPORT_VIEWS[job.report])
+        return job
+
+
+
+class AttendanceDeltaExport(generics.GenericAPIView):
+    """
+    Incremental attendance export: only the rows added or changed since the
+    consumer's previous export, so a weekly export reads one week of rows.
+
+    Request body:
+    {
+        "consumer": "finance",
+        "format": "csv",
+        "append": true,
+        "reset": false
+    }
+    consumer names the reader the watermark is kept for. Every export writes
+    the new rows to a file of its own. append keeps the consumer's previous
+    files (same format) in the series, otherwise the series starts over;
+    reset starts over from the first attendance row.
+    Rows carry AttendanceId and LastModified, a changed row comes back with
+    the id it was first exported with.
+    Answers with the moved watermark, the download link of the new file and
+    files, the manifest of the series. The whole series is downloaded as one
+    file from attendance-delta/<consumer>/. 409 when another export of the
+    consumer finished in the meantime.
+    """
+    serializer_class = AttendanceDeltaRequestSerializer
+    permission_classes = [IsAuthenticated,IsInGroup]
+    required_groups = requiredGroups(permission='view_attendance')
+    name = 'attendance-delta-export'
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        watermark = export_delta(data['consumer'], data['format'], append=data['append'], reset=data['reset'])
+        return Response(ExportWatermarkSerializer(watermark).data, status=status.HTTP_200_OK)
+
+
+class AttendanceDeltaDownload(generics.GenericAPIView):
+    """
+    The consumer's series of delta exports as one file in the series' format:
+    csv with a single header row, ndjson lines, or one xlsx sheet.
+    404 before the consumer's first export.
+    """
+    queryset = ExportWatermark.objects.filter(files__isnull=False).distinct()
+    permission_classes = [IsAuthenticated,IsInGroup]
+    required_groups = requiredGroups(permission='view_attendance')
+    name = 'attendance-delta-download'
+    lookup_field = 'consumer'
+
+    def get(self, request, *args, **kwargs):
+        return series_response(self.get_object())
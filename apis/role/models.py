@@ -1,5 +1,6 @@
 from django.db import models
 from auditlog.registry import auditlog
+from apis.refcache import ReferenceCache
 # Create your models here.
 class Role(models.Model):
     name = models.TextField(blank=False, unique=True)
@@ -11,4 +12,5 @@ class Role(models.Model):
     def __str__(self):
         return f"{self.name}"
 
-auditlog.register(Role)
\ No newline at end of file
+auditlog.register(Role)
+ReferenceCache.register(Role)
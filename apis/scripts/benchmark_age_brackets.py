@@ -0,0 +1,116 @@
+"""
+Compare the old per-row age bracket loop of analytics.views.Analytics with a
+vectorised pandas computation of the same AGE_BRACKETS (analytics/ages.py).
+The view itself now has the database count the brackets (bracket_filters).
+
+    python scripts/benchmark_age_brackets.py --rows 50000
+
+Rows are synthetic persons (dob, marital_status), no database is needed.
+Both versions must produce the same counts, the script stops if they do not.
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import date, datetime
+
+# Ensure project root (folder containing manage.py) is on sys.path
+proj_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if proj_root not in sys.path:
+    sys.path.insert(0, proj_root)
+
+import numpy as np
+import pandas as pd
+
+from analytics.ages import AGE_BRACKETS
+
+STATUSES = np.array(['SINGLE', 'MARRIED', 'SEPARATED', 'DIVORCED'])
+
+
+def ages_on(dob, today):
+    """
+    Whole years of age on today for a column of birth dates, computed on
+    datetime64 values in one vectorised pass. Missing or unparsable dates
+    come back as NaN and match no comparison.
+    """
+    dob = pd.to_datetime(dob, errors='coerce')
+    month, day = dob.dt.month.to_numpy(), dob.dt.day.to_numpy()
+    # not yet had this year's birthday
+    before_birthday = (month > today.month) | ((month == today.month) & (day > today.day))
+    return today.year - dob.dt.year.to_numpy() - before_birthday
+
+
+def bracket_counts(ages, mask=None, brackets=AGE_BRACKETS):
+    """Number of ages (where mask is set) in each bracket, {name: count}"""
+    ages = np.asarray(ages, dtype=float)
+    selected = np.ones(ages.shape, dtype=bool) if mask is None else np.asarray(mask, dtype=bool)
+    counts = {}
+    for name, lower, upper in brackets:
+        inside = selected.copy()
+        if lower is not None:
+            inside &= ages > lower
+        if upper is not None:
+            inside &= ages < upper
+        counts[name] = int(np.count_nonzero(inside))
+    return counts
+
+
+def synthetic_persons(count, seed=1):
+    rng = np.random.default_rng(seed)
+    start = np.datetime64('1940-01-01')
+    dob = start + rng.integers(0, 85 * 365, count).astype('timedelta64[D]')
+    return pd.DataFrame({'dob': pd.Series(dob).dt.date,
+                         'marital_status': STATUSES[rng.integers(0, len(STATUSES), count)]})
+
+
+def legacy_age(today, birthdate):
+    dob = datetime.strptime(str(birthdate), '%Y-%m-%d')
+    age = today.year - dob.year
+    if (today.month, today.day) < (dob.month, dob.day):
+        age -= 1
+    return age
+
+
+def legacy_brackets(df, today):
+    """What Analytics.get did before: itertuples and up to four strptime calls per row"""
+    youths = teens = children = 0
+    for row in df.itertuples(index=False):
+        youths += 1 if (row.marital_status == 'SINGLE' and legacy_age(today, row.dob) > 19) else 0
+        teens += 1 if (row.marital_status == 'SINGLE' and (legacy_age(today, row.dob) > 12 and
+                                                            legacy_age(today, row.dob) < 19)) else 0
+        children += 1 if (row.marital_status == 'SINGLE' and legacy_age(today, row.dob) < 12) else 0
+    return {'youths': youths, 'teens': teens, 'children': children}
+
+
+def vectorised_brackets(df, today):
+    ages = ages_on(df['dob'], today)
+    return bracket_counts(ages, mask=(df['marital_status'] == 'SINGLE').to_numpy())
+
+
+def measure(name, brackets, df, today, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        counts = brackets(df, today)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    print(f'{name:<11} {len(df):>8} rows  {best * 1000:10.1f} ms  {counts}')
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--repeat', type=int, default=3, help='best of this many runs')
+    args = parser.parse_args()
+
+    df = synthetic_persons(args.rows)
+    today = date.today()
+    vectorised = measure('vectorised', vectorised_brackets, df, today, args.repeat)
+    legacy = measure('legacy', legacy_brackets, df, today, args.repeat)
+    if vectorised != legacy:
+        sys.exit('counts differ')
+
+
+if __name__ == '__main__':
+    main()
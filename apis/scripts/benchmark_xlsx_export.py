@@ -0,0 +1,94 @@
+"""
+Compare the old in-memory XLSX report build with the write-only export in report/xlsx.py.
+
+    python scripts/benchmark_xlsx_export.py --rows 100000
+
+Rows are synthetic attendance-report rows, no database is needed.
+--memory reports peak Python allocations with tracemalloc, which slows both runs down
+considerably, so compare timings from runs without it.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from io import BytesIO
+
+# Ensure project root (folder containing manage.py) is on sys.path
+proj_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if proj_root not in sys.path:
+    sys.path.insert(0, proj_root)
+
+from openpyxl import Workbook
+from openpyxl.styles import Alignment, Font
+
+from report.xlsx import write_workbook
+
+HEADERS = ['SN', 'FirstName', 'LastName', 'Service', 'CaptureMethod',
+           'CheckInTimestamp', 'CheckOutTimestamp', 'Remark']
+
+
+def synthetic_rows(count):
+    start = datetime(2025, 1, 5, 9, 0)
+    for n in range(1, count + 1):
+        checkin = start + timedelta(minutes=n % 600, days=7 * (n // 2000))
+        yield [n, f'First{n % 5000}', f'Last{n % 3000}', 'Sunday Service',
+               'FACE' if n % 3 else 'FORM', checkin, None, 'Face Attendance Capture']
+
+
+def legacy_export(rows):
+    """What report.views did before: full workbook, style and size every cell, copy out of BytesIO"""
+    wb = Workbook()
+    ws = wb.active
+    ws.append(HEADERS)
+    for row in rows:
+        ws.append(row)
+    bold_font = Font(bold=True)
+    for row in ws.iter_rows():
+        for cell in row:
+            cell.alignment = Alignment(wrap_text=True)
+            cell.font = bold_font
+    for col in ws.columns:
+        max_length = max(len(str(cell.value)) for cell in col)
+        ws.column_dimensions[col[0].column_letter].width = max_length + 2
+    buffer = BytesIO()
+    wb.save(buffer)
+    return len(buffer.getvalue())
+
+
+def streaming_export(rows):
+    with tempfile.TemporaryFile() as file:
+        write_workbook(file, 'Church Attendance', HEADERS, rows)
+        return file.tell()
+
+
+def measure(name, export, count, memory=False):
+    if memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    size = export(synthetic_rows(count))
+    elapsed = time.perf_counter() - started
+    line = f'{name:<10} {count:>8} rows  {elapsed:8.2f} s  file {size / 2**20:6.1f} MiB'
+    if memory:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        line += f'  peak {peak / 2**20:8.1f} MiB'
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--skip-legacy', action='store_true', help='only run the write-only export')
+    parser.add_argument('--memory', action='store_true', help='also report peak memory (slow)')
+    args = parser.parse_args()
+
+    measure('streaming', streaming_export, args.rows, args.memory)
+    if not args.skip_legacy:
+        measure('legacy', legacy_export, args.rows, args.memory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""
+Import-time budget of the API. Runs a fresh interpreter with -X importtime
+that sets Django up and loads the URL conf, which is what every worker and
+management command pays on boot, and reports the slowest imports.
+
+    python scripts/check_import_time.py --budget-ms 2000
+
+Exits 1 when the total goes over the budget, or when one of the HEAVY
+libraries is imported on the way: those must stay behind their accessors
+(FacesConfig.face_handler, imports inside the functions using them).
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+# folder containing manage.py, the boot runs from there
+proj_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# optional libraries only the code paths needing them may load
+HEAVY = ('cv2', 'insightface', 'onnxruntime', 'pandas', 'scipy', 'openpyxl',
+         'twilio', 'supabase', 'fontTools')
+
+BOOT = ('import django; django.setup(); '
+        'from django.urls import get_resolver; get_resolver().url_patterns')
+
+
+def measure():
+    """[(module, self us, cumulative us, depth)] of every import made while booting"""
+    env = dict(os.environ)
+    env.setdefault('DJANGO_SETTINGS_MODULE', 'apis.settings')
+    # a -c interpreter counts as a web server, the preloaded model would show up as a boot import
+    env['FACE_MODEL_PRELOAD'] = '0'
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', BOOT],
+                            cwd=proj_root, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        sys.exit(f'Booting the project failed:\n{result.stderr[-2000:]}')
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        # nested imports are indented by two spaces per level
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        imports.append((name.strip(), int(own), int(cumulative), depth))
+    return imports
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--budget-ms', type=int, default=int(os.environ.get('IMPORT_TIME_BUDGET_MS', '2000')),
+                        help='most milliseconds booting may spend importing')
+    parser.add_argument('--top', type=int, default=15, help='slowest top-level imports to list')
+    args = parser.parse_args()
+
+    imports = measure()
+    top_level = [entry for entry in imports if entry[3] == 0]
+    total_ms = sum(cumulative for _, _, cumulative, _ in top_level) / 1000
+
+    print(f'Import time while booting: {total_ms:.0f} ms (budget {args.budget_ms} ms)')
+    for name, _, cumulative, _ in sorted(top_level, key=lambda entry: -entry[2])[:args.top]:
+        print(f'  {cumulative / 1000:8.1f} ms  {name}')
+
+    heavy = sorted({name.split('.')[0] for name, _, _, _ in imports} & set(HEAVY))
+    failed = False
+    if heavy:
+        failed = True
+        print('Heavy optional libraries imported at boot: ' + ', '.join(heavy))
+    if total_ms > args.budget_ms:
+        failed = True
+        print(f'Over the import budget by {total_ms - args.budget_ms:.0f} ms')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
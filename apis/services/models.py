@@ -2,6 +2,7 @@ from django.db import models
 from church.models import Church
 from ministries.models import Ministries
 from auditlog.registry import auditlog
+from apis.refcache import ReferenceCache
 
 # Create your models here.
 class Services(models.Model):
@@ -37,4 +38,5 @@ class Services(models.Model):
     def __str__(self):
         return f'{self.eventName}'
     
-auditlog.register(Services)
\ No newline at end of file
+auditlog.register(Services)
+ReferenceCache.register(Services)
@@ -0,0 +1,134 @@
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from apis.refcache import ReferenceCache
+from church.models import Church
+from .models import Services
+
+# date.weekday() -> Services.eventDay
+EVENT_DAYS = (Services.MONDAY, Services.TUESDAY, Services.WEDNESDAY, Services.THURSDAY,
+              Services.FRIDAY, Services.SATURDAY, Services.SUNDAY)
+
+
+def church_zone(name):
+    try:
+        return ZoneInfo(name or settings.TIME_ZONE)
+    except (ZoneInfoNotFoundError, ValueError):
+        return ZoneInfo(settings.TIME_ZONE)
+
+
+def occurs_on(service, day):
+    """
+    Recurring services happen every week on eventDay, one-off services on eventDate.
+    A one-off service without an eventDate falls back to its eventDay.
+    Works with model instances and .values() dicts alike.
+    """
+    get = service.get if isinstance(service, dict) else lambda field: getattr(service, field)
+    if get('isReoccuring') or get('eventDate') is None:
+        return get('eventDay') == EVENT_DAYS[day.weekday()]
+    return get('eventDate') == day
+
+
+def church_date(church_id, moment=None):
+    """Calendar day of moment (default now) in the church's time zone, the day check-ins are filed under"""
+    try:
+        name = ReferenceCache.get(Church, id=church_id).timezone
+    except Church.DoesNotExist:
+        name = None
+    return (moment or timezone.now()).astimezone(church_zone(name)).date()
+
+
+def not_scheduled_message(service):
+    return (f"Attendance can only be captured for today's services. The event date for "
+            f"{service.eventName} is {service.eventDate} {service.eventDay} {service.eventTime}.")
+
+
+class ServiceSchedule:
+    """
+    Index of today's service occurrences per church, so check-in validation
+    and kiosks never have to load and compare Services rows.
+
+    A church's index holds the services held on its current day, each with
+    its start time and check-in window in the church's time zone. It is
+    cached under that day and a version stamp, so it lasts until the
+    church's midnight, and saving or deleting a Services or Church row bumps
+    the stamp (services/signals.py) the way ReferenceCache does. Other
+    workers see the bump when CACHES points at a shared backend.
+    """
+
+    CACHE_KEY = 'services:schedule:{church}:{day}:{version}'
+    VERSION_KEY = 'services:schedule:version'
+    FIELDS = ('id', 'churchId_id', 'eventName', 'eventDate', 'eventTime', 'eventDay',
+              'location', 'isReoccuring')
+
+    @classmethod
+    def church_index(cls, church):
+        """{serviceId: occurrence} of the church's services held on its current day"""
+        zone = church_zone(church.timezone)
+        now = timezone.now()
+        today = now.astimezone(zone).date()
+        key = cls.CACHE_KEY.format(church=church.id, day=today.isoformat(), version=cache.get(cls.VERSION_KEY, 0))
+        occurrences = cache.get(key)
+        if occurrences is None:
+            occurrences = cls.build(church.id, zone, today)
+            midnight = datetime.combine(today + timedelta(days=1), datetime.min.time(), tzinfo=zone)
+            cache.set(key, occurrences, max(1, int((midnight - now).total_seconds())))
+        return occurrences
+
+    @classmethod
+    def build(cls, church_id, zone, today):
+        opens_before = timedelta(minutes=settings.SERVICE_CHECKIN_OPENS_BEFORE)
+        closes_after = timedelta(minutes=settings.SERVICE_CHECKIN_CLOSES_AFTER)
+        occurrences = {}
+        for service in Services.objects.filter(churchId=church_id).values(*cls.FIELDS):
+            if not occurs_on(service, today):
+                continue
+            start = datetime.combine(today, service['eventTime'], tzinfo=zone)
+            occurrences[service['id']] = {
+                'serviceId': service['id'],
+                'churchId': service['churchId_id'],
+                'eventName': service['eventName'],
+                'location': service['location'],
+                'isReoccuring': service['isReoccuring'],
+                'date': today,
+                'start': start,
+                'opensAt': start - opens_before,
+                'closesAt': start + closes_after,
+            }
+        return occurrences
+
+    @classmethod
+    def invalidate(cls):
+        try:
+            cache.incr(cls.VERSION_KEY)
+        except ValueError:
+            cache.set(cls.VERSION_KEY, 1, None)
+
+    @classmethod
+    def today(cls, church_id=None):
+        if church_id is None:
+            churches = ReferenceCache.all(Church)
+        else:
+            try:
+                churches = [ReferenceCache.get(Church, id=church_id)]
+            except Church.DoesNotExist:
+                churches = []
+        occurrences = [occ for church in churches for occ in cls.church_index(church).values()]
+        return sorted(occurrences, key=lambda occ: occ['start'])
+
+    @classmethod
+    def occurrence(cls, service_id):
+        """Today's occurrence of the service or None when it is not held today (or does not exist)"""
+        try:
+            service = ReferenceCache.get(Services, id=service_id)
+            church = ReferenceCache.get(Church, id=service.churchId_id)
+        except (Services.DoesNotExist, Church.DoesNotExist):
+            return None
+        return cls.church_index(church).get(service_id)
+
+    @classmethod
+    def open_now(cls, church_id=None):
+        now = timezone.now()
+        return [occ for occ in cls.today(church_id) if occ['opensAt'] <= now <= occ['closesAt']]
@@ -0,0 +1,17 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from church.models import Church
+from .models import Services
+from .schedule import ServiceSchedule
+
+
+@receiver(post_save, sender=Services)
+@receiver(post_delete, sender=Services)
+@receiver(post_save, sender=Church)
+@receiver(post_delete, sender=Church)
+def invalidate_schedule(sender, instance, **kwargs):
+    """Move the schedule index to a new version after a service or church (time zone) changes"""
+    ServiceSchedule.invalidate()
+    # a request between now and commit may rebuild from the old rows, drop it again once committed
+    transaction.on_commit(ServiceSchedule.invalidate)
@@ -1,3 +1,91 @@
-from django.test import TestCase
+import datetime
+from unittest import mock
+from django.utils import timezone
+from apis.testing import ApiTestCase
+from attendance.models import Attendance
+from attendance.views import BulkCreateAttendance
+from church.models import Church
+from .models import Services
+from .schedule import EVENT_DAYS, ServiceSchedule, church_date, occurs_on
+from .views import OpenServices
 
-# Create your tests here.
+
+class ServiceScheduleTests(ApiTestCase):
+
+    def test_occurs_on(self):
+        sunday = datetime.date(2026, 10, 18)
+        self.assertTrue(occurs_on({'isReoccuring': True, 'eventDay': 'SUN', 'eventDate': None}, sunday))
+        self.assertFalse(occurs_on({'isReoccuring': True, 'eventDay': 'MON', 'eventDate': None}, sunday))
+        self.assertTrue(occurs_on({'isReoccuring': False, 'eventDay': 'MON', 'eventDate': sunday}, sunday))
+        # a one-off service without a date falls back to its day
+        self.assertTrue(occurs_on({'isReoccuring': False, 'eventDay': 'SUN', 'eventDate': None}, sunday))
+
+    def test_today(self):
+        tomorrow = EVENT_DAYS[(timezone.localdate().weekday() + 1) % 7]
+        self.create_service(self.church, eventName='Midweek', eventDay=tomorrow)
+        self.assertEqual([occ['serviceId'] for occ in ServiceSchedule.today(self.church.id)], [self.service.id])
+        self.assertIsNone(ServiceSchedule.occurrence(99999))
+
+    def test_saved_service_is_seen_at_once(self):
+        ServiceSchedule.today()
+        added = self.create_service(self.church, eventName='Evening')
+        self.assertIsNotNone(ServiceSchedule.occurrence(added.id))
+
+    def add_elsewhere(self, name):
+        # bulk_create sends no post_save, the version stays where it was
+        return Services.objects.bulk_create([Services(churchId=self.church, eventName=name, location='Hall',
+                                                      eventTime=datetime.time(18), isReoccuring=True,
+                                                      eventDay=self.service.eventDay)])[0]
+
+    def test_index_is_kept_until_the_version_moves(self):
+        ServiceSchedule.occurrence(self.service.id)
+        with self.assertNumQueries(0):
+            self.assertIsNotNone(ServiceSchedule.occurrence(self.service.id))
+        added = self.add_elsewhere('Evening')
+        self.assertIsNone(ServiceSchedule.occurrence(added.id))
+        ServiceSchedule.invalidate()
+        self.assertIsNotNone(ServiceSchedule.occurrence(added.id))
+
+    def test_index_ends_with_the_church_day(self):
+        self.assertIsNotNone(ServiceSchedule.occurrence(self.service.id))
+        tomorrow = timezone.now() + datetime.timedelta(days=1)
+        with mock.patch('services.schedule.timezone.now', return_value=tomorrow):
+            self.assertIsNone(ServiceSchedule.occurrence(self.service.id))
+
+    def test_open_services(self):
+        response = self.call(OpenServices, data={'all': 'true', 'churchId': self.church.id})
+        self.assertEqual([occ['serviceId'] for occ in response.data['services']], [self.service.id])
+        self.assertEqual(self.call(OpenServices, data={'churchId': 'x'}).status_code, 400)
+
+
+class ChurchDayTests(ApiTestCase):
+    """Check-ins are filed under the church's calendar day, the one the schedule accepted them for"""
+
+    def setUp(self):
+        super().setUp()
+        # UTC+14, its day differs from the server's for most of the day
+        self.far_east = Church.objects.create(name='Line Islands', address='a', description='d',
+                                              timezone='Pacific/Kiritimati')
+        self.person = self.create_person(self.far_east, 'Teuea', 'Toatu')
+
+    def test_church_date(self):
+        moment = datetime.datetime(2026, 1, 1, 20, tzinfo=datetime.timezone.utc)
+        self.assertEqual(church_date(self.far_east.id, moment), datetime.date(2026, 1, 2))
+        self.assertEqual(church_date(self.church.id, moment), datetime.date(2026, 1, 1))
+
+    def test_save_files_under_the_church_day(self):
+        service = self.create_service(self.far_east)
+        attendance = Attendance.objects.create(personId=self.person, servicesId=service, captureMethodId=self.form,
+                                               checkInTimestamp=datetime.datetime(2026, 1, 1, 20,
+                                                                                  tzinfo=datetime.timezone.utc))
+        self.assertEqual(attendance.attendanceDate, datetime.date(2026, 1, 2))
+
+    def test_check_in_uses_the_schedule_day(self):
+        today = church_date(self.far_east.id)
+        service = self.create_service(self.far_east, eventDay=EVENT_DAYS[today.weekday()])
+        response = self.call(BulkCreateAttendance, 'post', {'servicesId': service.id, 'personIds': [self.person.id]})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Attendance.objects.get(personId=self.person).attendanceDate, today)
+        # the duplicate check looks at the same day
+        response = self.call(BulkCreateAttendance, 'post', {'servicesId': service.id, 'personIds': [self.person.id]})
+        self.assertEqual(response.data['summary']['already_marked'], 1)
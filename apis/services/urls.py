@@ -22,4 +22,5 @@ urlpatterns = [
     path('new-service/', CreateServices.as_view(), name='create-services'),
     path('remove-service/<int:id>/', DeleteServices.as_view(), name='delete-services'),
     path('modify-service/<int:id>/', UpdateServices.as_view(), name='services-update'),
+    path('open-services/', OpenServices.as_view(), name='open-services'),
 ]
@@ -1,5 +1,6 @@
 from .models import Services
 from .serializers import ServicesSerializers
+from .schedule import ServiceSchedule
 from django.shortcuts import render
 from rest_framework import status
 from rest_framework.reverse import reverse
@@ -62,4 +63,27 @@ class CreateServices(generics.CreateAPIView):
     permission_classes = [IsAuthenticated, IsInGroup,]
     required_groups = requiredGroups(permission='add_services')
     name = 'create-services'
-    
\ No newline at end of file
+
+
+class OpenServices(APIView):
+    """
+    Services a kiosk can check people into right now, served from the
+    schedule index without touching the Services table.
+    ?churchId=<id> limits the list to one church, ?all=true returns every
+    occurrence of today instead of only the open ones.
+    """
+    permission_classes = [IsAuthenticated]
+    name = 'open-services'
+
+    def get(self, request):
+        church_id = request.query_params.get('churchId')
+        try:
+            church_id = int(church_id) if church_id else None
+        except ValueError:
+            return Response({"error": "churchId must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if request.query_params.get('all', '').lower() in ('true', '1'):
+            occurrences = ServiceSchedule.today(church_id)
+        else:
+            occurrences = ServiceSchedule.open_now(church_id)
+        return Response({"services": occurrences}, status=status.HTTP_200_OK)